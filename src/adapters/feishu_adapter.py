@@ -5,10 +5,12 @@
 
 import asyncio
 import json
+import re
 import uuid
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional, Tuple
 import time
+import threading
 
 # 飞书SDK导入
 import lark_oapi as lark
@@ -19,6 +21,7 @@ from lark_oapi.api.im.v1.model import P2ImMessageReceiveV1
 from src.core.workflow import build_pr_review_graph
 from src.utils.config import CONFIG
 from src.utils.concurrency_manager import get_concurrency_manager
+from src.utils.helpers import PR_SIZE_PRIORITY, classify_pr_size
 from src.utils.thread_safe_logger import log_info, log_error, log_warning
 
 
@@ -135,9 +138,7 @@ class PRReviewManager:
                 log_info(f"[审查进度] {chunk.get('current_stage', 'unknown')}")
             return final_state
         except Exception as e:
-            log_error(f"[错误] PR审查失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            log_error(f"[错误] PR审查失败: {str(e)}", exc_info=True)
             return None
 
 
@@ -235,9 +236,7 @@ def send_text_message(user_id: str, text: str):
             return response
             
     except Exception as e:
-        log_error(f"[错误] 发送消息异常: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log_error(f"[错误] 发送消息异常: {str(e)}", exc_info=True)
 
 
 def process_pr_request_sync(message: str, sender_id: str):
@@ -279,33 +278,36 @@ def get_user_name(open_id: str) -> str:
             short_id = open_id[-8:] if len(open_id) > 8 else open_id
             return f"User_{short_id}"
     except Exception as e:
-        log_error(f"[错误] 获取用户名异常: {str(e)}")
-        import traceback
-        log_error(traceback.format_exc())
+        log_error(f"[错误] 获取用户名异常: {str(e)}", exc_info=True)
         # 返回ID后8位作为fallback
         short_id = open_id[-8:] if len(open_id) > 8 else open_id
         return f"User_{short_id}"
 
 
+# 审查请求消息格式："分支名 merge 目标分支"
+_MERGE_REQUEST_PATTERN = re.compile(r'(\S+)\s+merge\s+(\S+)', re.IGNORECASE)
+
+
+def _parse_merge_request(message: str) -> Optional[Tuple[str, str]]:
+    """从消息中解析 (源分支, 目标分支)，格式不符时返回None
+    
+    提交前的优先级估算和审查本身都用它解析，保证两者看到的分支一致
+    """
+    match = _MERGE_REQUEST_PATTERN.search(message)
+    if not match:
+        return None
+    return match.group(1), match.group(2)
+
+
 async def process_pr_request(message: str, sender_id: str):
     """处理PR审查请求（异步函数）"""
-    import re
-    
     # 获取用户名
     user_name = get_user_name(sender_id)
     log_info(f"[用户] {user_name} ({sender_id})")
     
-    # 解析消息格式："分支名 merge 目标分支" 或 "分支名"
-    source_branch = None
-    target_branch = GIT_BASE_BRANCH
-    
-    # 尝试匹配 "分支名 merge 目标分支" 格式
-    match = re.search(r'(\S+)\s+merge\s+(\S+)', message, re.IGNORECASE)
-    if match:
-        source_branch = match.group(1)
-        target_branch = match.group(2)
-    
-    if not source_branch:
+    # 解析消息格式："分支名 merge 目标分支"
+    branches = _parse_merge_request(message)
+    if branches is None:
         send_text_message(sender_id, 
             "❌ 无法解析消息\n\n"
             "请使用以下格式之一：\n"
@@ -313,6 +315,7 @@ async def process_pr_request(message: str, sender_id: str):
             "示例：feature/login-fix merge main"
         )
         return
+    source_branch, target_branch = branches
     
     review_id = review_manager.add_review({
         'feishu_user_id': sender_id,
@@ -368,6 +371,71 @@ async def process_pr_request(message: str, sender_id: str):
             send_text_message(admin_id, error_report)
 
 
+def _estimate_task_priority(message: str):
+    """根据分支间的变更规模估算任务调度优先级（小PR优先），无法估算时返回None"""
+    branches = _parse_merge_request(message)
+    if branches is None:
+        return None
+    
+    try:
+        from src.adapters.git_adapter import get_git_adapter
+        stats = get_git_adapter().get_diff_shortstat(*branches)
+    except Exception as e:
+        log_warning(f"[并发控制] 估算PR规模失败: {str(e)}")
+        return None
+    if stats is None:
+        return None
+    
+    pr_size = classify_pr_size(stats['files_count'], stats['additions'] + stats['deletions'])
+    return PR_SIZE_PRIORITY[pr_size]
+
+
+def _submit_review_request(text: str, sender_id: str):
+    """按PR规模估算优先级后提交审查任务，并通知用户排队或拒绝情况（在后台线程中执行）"""
+    try:
+        # 使用并发控制管理器提交任务
+        manager = get_concurrency_manager()
+        success, msg = manager.submit_task(
+            process_pr_request_sync,
+            text,
+            sender_id,
+            task_name=f"PR_Review_{sender_id[:8]}",
+            task_priority=_estimate_task_priority(text)
+        )
+        
+        if not success:
+            # 队列已满，通知用户稍后再试
+            stats = manager.get_stats()
+            reject_message = (
+                f"⚠️ 系统繁忙，请稍后再试\n\n"
+                f"当前状态：\n"
+                f"🔄 正在处理: {stats['current_processing']}\n"
+                f"⏳ 队列等待: {stats['current_queued']}\n\n"
+                f"请稍后再试"
+            )
+            send_text_message(sender_id, reject_message)
+            log_warning(f"[并发控制] 已拒绝用户 {sender_id} 的请求 - {msg}")
+        else:
+            # 任务已加入队列，通知用户
+            stats = manager.get_stats()
+        
+            # 只有当有任务在排队时才通知（排除立即处理的情况）
+            if stats['current_queued'] > 0:
+                queue_message = (
+                    f"✅ 请求已接受\n\n"
+                    f"📊 当前系统状态：\n"
+                    f"🔄 正在处理: {stats['current_processing']} 个任务\n"
+                    f"⏳ 队列等待: {stats['current_queued']} 个任务\n\n"
+                    f"您的请求已加入队列（第 {stats['current_queued']} 位），\n"
+                    f"请耐心等待，处理完成后会通知您。"
+                )
+                send_text_message(sender_id, queue_message)
+        
+            log_info(f"[并发控制] 已接受用户 {sender_id} 的请求 - {msg}")
+    except Exception as e:
+        log_error(f"[错误] 提交审查任务失败: {str(e)}", exc_info=True)
+
+
 def do_im_message_receive_v1(data: P2ImMessageReceiveV1) -> None:
     """处理消息接收事件"""
     try:
@@ -401,49 +469,17 @@ def do_im_message_receive_v1(data: P2ImMessageReceiveV1) -> None:
                     log_warning(f"[用户节流] 已拒绝用户 {sender_id} 的重复请求")
                     return
                 
-                # 使用并发控制管理器提交任务
-                manager = get_concurrency_manager()
-                success, msg = manager.submit_task(
-                    process_pr_request_sync,
-                    text,
-                    sender_id,
-                    task_name=f"PR_Review_{sender_id[:8]}"
-                )
-                
-                if not success:
-                    # 队列已满，通知用户稍后再试
-                    stats = manager.get_stats()
-                    reject_message = (
-                        f"⚠️ 系统繁忙，请稍后再试\n\n"
-                        f"当前状态：\n"
-                        f"🔄 正在处理: {stats['current_processing']}\n"
-                        f"⏳ 队列等待: {stats['current_queued']}\n\n"
-                        f"请稍后再试"
-                    )
-                    send_text_message(sender_id, reject_message)
-                    log_warning(f"[并发控制] 已拒绝用户 {sender_id} 的请求 - {msg}")
-                else:
-                    # 任务已加入队列，通知用户
-                    stats = manager.get_stats()
-                    
-                    # 只有当有任务在排队时才通知（排除立即处理的情况）
-                    if stats['current_queued'] > 0:
-                        queue_message = (
-                            f"✅ 请求已接受\n\n"
-                            f"📊 当前系统状态：\n"
-                            f"🔄 正在处理: {stats['current_processing']} 个任务\n"
-                            f"⏳ 队列等待: {stats['current_queued']} 个任务\n\n"
-                            f"您的请求已加入队列（第 {stats['current_queued']} 位），\n"
-                            f"请耐心等待，处理完成后会通知您。"
-                        )
-                        send_text_message(sender_id, queue_message)
-                    
-                    log_info(f"[并发控制] 已接受用户 {sender_id} 的请求 - {msg}")
+                # 估算PR规模（需要执行git命令）和提交任务（队列满时可能等待）都放到后台线程，
+                # 不阻塞飞书事件回调
+                threading.Thread(
+                    target=_submit_review_request,
+                    args=(text, sender_id),
+                    name=f"Submit_{sender_id[:8]}",
+                    daemon=True
+                ).start()
     
     except Exception as e:
-        log_error(f"[错误] 处理消息失败: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log_error(f"[错误] 处理消息失败: {str(e)}", exc_info=True)
 
 
 def start_feishu_bot():
@@ -374,6 +374,64 @@ class NativeGitAdapter:
         except Exception as e:
             print(f"[ERROR] 获取文件内容失败 {filepath}: {str(e)}")
             return ""
+    
+    def _is_valid_branch(self, branch_name: str, timeout: int = 10) -> bool:
+        """校验外部传入的分支名：不能以-开头（会被git当作选项），且必须指向本地已有的提交"""
+        if not branch_name or branch_name.startswith('-'):
+            return False
+        # 分支不存在是预期结果，不经过_run_git_command（它会把失败当作错误打印）
+        try:
+            result = subprocess.run(
+                ["git", "rev-parse", "--verify", "--quiet", "--end-of-options", f"{branch_name}^{{commit}}"],
+                cwd=self.repo_path,
+                capture_output=True,
+                timeout=timeout
+            )
+        except (subprocess.TimeoutExpired, OSError):
+            return False
+        return result.returncode == 0
+    
+    def get_diff_shortstat(self, source_branch: str, target_branch: str,
+                           timeout: int = 10) -> Optional[Dict[str, int]]:
+        """
+        快速获取两个分支之间的变更规模（git diff --shortstat，不读取diff内容）
+        
+        Args:
+            source_branch: 源分支
+            target_branch: 目标分支
+            timeout: 命令超时时间（秒）
+            
+        Returns:
+            {'files_count', 'additions', 'deletions'}，分支名不合法、分支不存在或命令失败返回None
+        """
+        # 分支名来自聊天消息：先校验再拼进命令，避免被当作git选项
+        if not (self._is_valid_branch(source_branch, timeout) and
+                self._is_valid_branch(target_branch, timeout)):
+            return None
+        
+        try:
+            output = self._run_git_command([
+                "diff",
+                "--shortstat",
+                "--end-of-options",
+                f"{target_branch}...{source_branch}"
+            ], timeout=timeout)
+        except Exception:
+            return None
+        
+        # 输出形如 " 3 files changed, 10 insertions(+), 2 deletions(-)"，没有变更时为空
+        stats = {'files_count': 0, 'additions': 0, 'deletions': 0}
+        for part in output.split(','):
+            fields = part.split()
+            if len(fields) < 2 or not fields[0].isdigit():
+                continue
+            if fields[1].startswith('file'):
+                stats['files_count'] = int(fields[0])
+            elif fields[1].startswith('insertion'):
+                stats['additions'] = int(fields[0])
+            elif fields[1].startswith('deletion'):
+                stats['deletions'] = int(fields[0])
+        return stats
 
 
 # 创建全局实例（从配置文件加载）
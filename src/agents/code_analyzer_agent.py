@@ -5,7 +5,7 @@
 """
 
 from langgraph.config import get_stream_writer
-from src.core.state import PRReviewState
+from src.core.state import PRReviewState, as_ast_cache
 from langchain_core.messages import SystemMessage, HumanMessage
 from src.utils.llm import llm, parser
 from src.analyzers.project_analyzer import ASTParser, AST_AVAILABLE
@@ -41,7 +41,7 @@ async def code_analyzer_node(state: PRReviewState) -> PRReviewState:
     
     # AST解析：只在首轮解析changed_files
     repo_path = CONFIG['git_repo']['repo_path']
-    ast_cache = state.get("ast_cache", {})
+    ast_cache = as_ast_cache(state.get("ast_cache"))
     updated_ast_cache = ast_cache
     
     if iteration_count == 0:
@@ -416,7 +416,8 @@ def _extract_ast_context(changed_files: List[str], repo_path: str, pr_size: str,
     
     parser = ASTParser()
     ast_info = []
-    updated_cache = dict(ast_cache)
+    # 缓存只属于当前审查流程，原地更新，不整体复制
+    updated_cache = as_ast_cache(ast_cache)
     
     print(f"[AST解析] 🌳 首轮解析 {len(changed_files)} 个变更文件...")
     
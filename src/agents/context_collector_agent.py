@@ -4,7 +4,7 @@
 使用 Ripgrep搜索 + AST代码块提取
 """
 
-from src.core.state import PRReviewState
+from src.core.state import PRReviewState, as_ast_cache
 from src.utils.config import CONFIG
 from src.analyzers.project_analyzer.fast_file_searcher import FastFileSearcher
 import os
@@ -57,7 +57,7 @@ async def context_collector_node(state: PRReviewState) -> PRReviewState:
     file_searcher = FastFileSearcher()
     
     # 获取AST缓存
-    ast_cache = state.get("ast_cache", {})
+    ast_cache = as_ast_cache(state.get("ast_cache"))
     
     # 显示功能状态
     print(f"[上下文收集] 🛠️ 功能状态:")
@@ -98,7 +98,7 @@ async def context_collector_node(state: PRReviewState) -> PRReviewState:
     updated_ast_cache = ast_cache
     if items_to_search:
         print(f"[上下文收集] 🚀 批量搜索 {len(items_to_search)} 个新项...")
-        dependencies, updated_ast_cache = _ripgrep_ast_search(
+        dependencies, updated_ast_cache = await _ripgrep_ast_search(
             items_to_search,
             file_searcher,
             config,
@@ -208,7 +208,8 @@ def _extract_code_context(repo_path: str, matches_dict: Dict[str, List[Dict]], a
         (code_snippets, updated_ast_cache)
     """
     code_snippets = []
-    updated_cache = dict(ast_cache) 
+    # 缓存只属于当前审查流程，原地更新，不整体复制
+    updated_cache = as_ast_cache(ast_cache)
     
     # 初始化AST解析器（如果可用）
     ast_parser = None
@@ -421,7 +422,7 @@ def _find_enclosing_function(lines: List[str], line_num: int) -> str:
     return "未知函数"
 
 
-def _ripgrep_ast_search(
+async def _ripgrep_ast_search(
     items_to_search: List[Dict],
     file_searcher: FastFileSearcher,
     config: Dict,
@@ -466,7 +467,7 @@ def _ripgrep_ast_search(
             item_pattern_map[pattern_key].append(item)
     
     # 执行批量搜索
-    batch_results = file_searcher.batch_search(repo_path, batch_patterns)
+    batch_results = await file_searcher.batch_search_async(repo_path, batch_patterns)
     
     # 整理搜索结果
     for item in items_to_search:
@@ -1,6 +1,13 @@
 from langgraph.config import get_stream_writer
 from src.core.state import PRReviewState
 
+# 配置文件识别标记（匹配小写文件路径）
+_CONFIG_FILE_MARKERS = ('.yaml', '.yml', '.json', '.env', '.config')
+
+# 管理员报告中文件类型的固定输出顺序
+_EXT_ORDER = ('py', 'cpp', 'h', 'hpp', 'c', 'java', 'go', 'js', 'ts', 'yaml', 'yml', 'json', 'md', 'other')
+_EXT_ORDER_SET = frozenset(_EXT_ORDER)
+
 
 def _add_change_analysis(report_lines: list, state: PRReviewState, analysis_conclusion: dict):
     """添加详细的变更分析到报告中"""
@@ -9,10 +16,17 @@ def _add_change_analysis(report_lines: list, state: PRReviewState, analysis_conc
     all_collected_context = state.get('all_collected_context', {})
     impact_chain = state.get('impact_chain', [])
     
-    # 分析diff中的变更类型
-    lines = pr_diff.split('\n')
-    deletions = [l for l in lines if l.startswith('-') and not l.startswith('---')]
-    additions = [l for l in lines if l.startswith('+') and not l.startswith('+++')]
+    # 分析diff中的变更类型（一次遍历，按首字符分派；只有+/-行才需要排除文件头）
+    deletions = []
+    additions = []
+    for l in pr_diff.split('\n'):
+        c0 = l[:1]
+        if c0 == '-':
+            if not l.startswith('---'):
+                deletions.append(l)
+        elif c0 == '+':
+            if not l.startswith('+++'):
+                additions.append(l)
     
     # 识别删除的类/函数/变量
     deleted_items = []
@@ -135,7 +149,7 @@ def _add_change_analysis(report_lines: list, state: PRReviewState, analysis_conc
             
             # 显示本轮搜索的项目及发现
             if search_items:
-                report_lines.append(f"    搜索项: {', '.join([item.get('name', '') for item in search_items[:]])}")
+                report_lines.append(f"    搜索项: {', '.join(item.get('name', '') for item in search_items)}")
                 
         # 显示最终分析结论
         if analysis_conclusion:
@@ -323,9 +337,17 @@ def _generate_admin_feedback(state: PRReviewState, code_passed: bool, rule_passe
     additions = pr_stats.get('additions', 0)
     deletions = pr_stats.get('deletions', 0)
     
-    # 分类定义变更
-    added_defs = [d for d in changed_definitions if d.get('change_type') == 'added/modified']
-    deleted_defs = [d for d in changed_definitions if d.get('change_type') == 'deleted']
+    # 分类定义变更（单次遍历完成新增/删除/修改分组）
+    added_defs, deleted_defs, modified_defs = [], [], []
+    defs_by_change_type = {
+        'added/modified': added_defs,
+        'deleted': deleted_defs,
+        'modified': modified_defs,
+    }
+    for d in changed_definitions:
+        bucket = defs_by_change_type.get(d.get('change_type'))
+        if bucket is not None:
+            bucket.append(d)
     
     # 审查状态
     all_passed = code_passed and rule_passed
@@ -347,16 +369,18 @@ def _generate_admin_feedback(state: PRReviewState, code_passed: bool, rule_passe
     # 文件变更详情
     if changed_files:
         report_lines.append("修改的文件：")
-        # 按文件类型分组
+        # 按文件类型分组（常见扩展名按固定顺序输出，其余扩展名排在其后）
         file_types = {}
-        for f in changed_files[:]:
+        for f in changed_files:
             ext = f.split('.')[-1] if '.' in f else 'other'
-            if ext not in file_types:
-                file_types[ext] = []
-            file_types[ext].append(f)
+            file_types.setdefault(ext, []).append(f)
+        
+        ordered_exts = [ext for ext in _EXT_ORDER if ext in file_types]
+        if len(ordered_exts) < len(file_types):
+            ordered_exts.extend(sorted(ext for ext in file_types if ext not in _EXT_ORDER_SET))
         
-        for ext, files in sorted(file_types.items()):
-            report_lines.append(f"  [{ext}] {', '.join(files[:])}")
+        for ext in ordered_exts:
+            report_lines.append(f"  [{ext}] {', '.join(file_types[ext])}")
     
     # 定义变更详情
     if added_defs or deleted_defs:
@@ -467,7 +491,6 @@ def _generate_admin_feedback(state: PRReviewState, code_passed: bool, rule_passe
     if pr_size in ['large', 'xlarge']:
         risk_indicators.append(f"规模风险：{pr_size.upper()}级别变更，可能影响多个模块")
     
-    modified_defs = [d for d in changed_definitions if d.get('change_type') == 'modified']
     if modified_defs:
         risk_indicators.append(f"接口变更风险：修改了{len(modified_defs)}个定义，需检查调用方兼容性")
     
@@ -496,7 +519,6 @@ def _generate_admin_feedback(state: PRReviewState, code_passed: bool, rule_passe
         if key_deletions:
             suggestions.append(f"  重点关注删除的定义：{', '.join(key_deletions)}")
     
-    modified_defs = [d for d in changed_definitions if d.get('change_type') == 'modified']
     if modified_defs:
         suggestions.append(f"包含{len(modified_defs)}个定义修改，需验证调用方兼容性")
     
@@ -508,11 +530,12 @@ def _generate_admin_feedback(state: PRReviewState, code_passed: bool, rule_passe
         suggestions.append(f"存在{len(impact_chains)}条影响链，需验证影响范围")
     
     # 3. 特殊文件检查
-    config_files = [f for f in changed_files if any(ext in f.lower() for ext in ['.yaml', '.yml', '.json', '.env', '.config'])]
+    lowered_files = [f.lower() for f in changed_files]
+    config_files = [fl for fl in lowered_files if any(ext in fl for ext in _CONFIG_FILE_MARKERS)]
     if config_files:
         suggestions.append(f"修改了{len(config_files)}个配置文件，需验证配置正确性")
     
-    test_files = [f for f in changed_files if 'test' in f.lower()]
+    test_files = [fl for fl in lowered_files if 'test' in fl]
     if test_files:
         suggestions.append(f"修改了{len(test_files)}个测试文件，建议运行完整测试")
     elif deleted_defs or modified_defs:
@@ -1,6 +1,11 @@
 from langgraph.config import get_stream_writer
 from src.core.state import PRReviewState
 
+# 分隔线（模块级常量，避免每次调用重复构造）
+_SEPARATOR = '=' * 60
+_DIVIDER = '-' * 60
+
+
 def feishu_feedback_node(state: PRReviewState) -> PRReviewState:
     """飞书反馈智能体 - 发送双重反馈"""
     print("=== 飞书反馈智能体 ===")
@@ -12,18 +17,18 @@ def feishu_feedback_node(state: PRReviewState) -> PRReviewState:
     admin_feedback = state.get("admin_feedback", "")
     
     # 发送提交者反馈
-    print(f"\n{'='*60}")
+    print(f"\n{_SEPARATOR}")
     print(f"📤 发送提交者反馈给用户 {feishu_user_id}:")
-    print(f"{'-'*60}")
+    print(f"{_DIVIDER}")
     print(submitter_feedback)
-    print(f"{'='*60}\n")
+    print(f"{_SEPARATOR}\n")
     
     # 发送管理员反馈（在这里打印，实际发送由飞书适配器完成）
-    print(f"\n{'='*60}")
+    print(f"\n{_SEPARATOR}")
     print(f"📤 生成管理员反馈:")
-    print(f"{'-'*60}")
+    print(f"{_DIVIDER}")
     print(admin_feedback)
-    print(f"{'='*60}\n")
+    print(f"{_SEPARATOR}\n")
     
     writer({
         "feishu_message_sent": True, 
@@ -1,10 +1,56 @@
 import re
 import json
+import asyncio
+import hashlib
 from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.config import get_stream_writer
 from src.core.state import PRReviewState
 from src.utils.config import load_code_rules, CONFIG
 from src.utils.llm import llm
+from src.utils.cache import ResultCache
+
+
+# 快速规则检查的常见问题模式：(分组名, 问题名称, 正则)，仅作用于新增行
+_QUICK_RULES = [
+    ('print', 'print语句', r'\bprint\s*\('),
+    ('log', 'console.log', r'\bconsole\.log\s*\('),
+    ('todo', 'TODO标记', r'\b(?:TODO|FIXME|XXX)\b'),
+    ('secret', '硬编码密码', r'(?:password|secret|key)\s*=\s*["\'][^"\']+["\']'),
+    ('debug', '调试断点', r'(?:debugger|breakpoint)'),
+]
+
+# 单条规则的预编译模式（用于逐行判断，如显著片段抽取）
+_QUICK_PATTERNS = {
+    issue_name: re.compile(pattern, re.IGNORECASE)
+    for _, issue_name, pattern in _QUICK_RULES
+}
+
+# 所有规则合并为一个正则，整段文本只扫描一遍：
+# 首个前瞻过滤掉不命中任何规则的行，其后每条规则一个可选前瞻命名分组，
+# 一行同时命中多条规则时各自计数，与逐条规则匹配的结果一致
+_QUICK_COMBINED = re.compile(
+    r'^(?=.*?(?:' + '|'.join(pattern for _, _, pattern in _QUICK_RULES) + r'))'
+    + ''.join(rf'(?=(?P<{group}>.*?{pattern}))?' for group, _, pattern in _QUICK_RULES),
+    re.MULTILINE | re.IGNORECASE
+)
+
+# 超过该大小的diff将快速规则检查放到线程中执行，避免阻塞事件循环
+_QUICK_CHECK_OFFLOAD_BYTES = 200 * 1024
+
+# 新增定义（函数/类）的识别模式，用于估算变更的信号密度
+_NEW_DEFINITION_PATTERN = re.compile(
+    r'^\+\s*(?:(?:async\s+)?def|class|function|struct|interface)\s+\w+',
+    re.MULTILINE
+)
+
+# 新增行（不含 +++ 文件头），整段diff上直接匹配，不切分出全部行
+_ADDED_LINE_PATTERN = re.compile(r'^\+(?!\+\+).*', re.MULTILINE)
+
+# 显著片段抽取时，命中行前后保留的上下文行数
+_SALIENT_CONTEXT_LINES = 10
+
+# LLM规范检查结果缓存：相同规范+相同diff的重复审查（重试、重跑、重新打开的PR）直接复用结果
+_review_cache = ResultCache('git_review', maxsize=128, ttl=CONFIG.get('llm', {}).get('cache_ttl', 86400))
 
 async def git_review_node(state: PRReviewState) -> PRReviewState:
     """Git规范检查智能体
@@ -46,17 +92,37 @@ async def git_review_node(state: PRReviewState) -> PRReviewState:
         pr_size in ['xlarge'] or 
         pr_stats.get('diff_size', 0) > skip_llm_diff_size
     )
+    skip_reason = f"PR规模较大（{pr_size}）"
+    
+    # 信号密度过低（如纯格式调整）时同样跳过LLM；阈值为0表示不启用
+    min_signal_density = git_check_config.get('min_signal_density', 0)
+    if not should_skip_llm and min_signal_density > 0:
+        density = _signal_density(pr_diff, pr_stats)
+        if density < min_signal_density:
+            should_skip_llm = True
+            skip_reason = f"变更信号密度较低（{density:.2e} < {min_signal_density:.2e}）"
+    
+    # 预匹配短路（需配置开启）：快速规则检查已足以得出结论时不再调用LLM
+    prematch_violations = None
+    if not should_skip_llm and git_check_config.get('enable_prematch_skip', False):
+        prematch_violations = _prematch_verdict(pr_diff, pr_stats, git_check_config)
     
     if should_skip_llm:
-        print(f"[步骤1] ⚠️ PR规模较大（{pr_size}），跳过LLM规范检查")
+        print(f"[步骤1] ⚠️ {skip_reason}，跳过LLM规范检查")
         print(f"[步骤1] 使用快速规则检查代替")
         
-        quick_violations = _quick_rule_check(pr_diff)
+        quick_violations = await _run_quick_rule_check(pr_diff)
         if quick_violations:
             violations.extend(quick_violations)
             print(f"[步骤1] ✓ 快速检查发现 {len(quick_violations)} 个潜在问题")
         else:
             print("[步骤1] ✓ 快速检查未发现明显问题")
+    elif prematch_violations is not None:
+        violations.extend(prematch_violations)
+        if prematch_violations:
+            print(f"[步骤1] ✓ 快速检查发现 {len(prematch_violations)} 类大量问题，跳过LLM规范检查")
+        else:
+            print("[步骤1] ✓ 小型变更且快速检查未发现问题，跳过LLM规范检查")
     else:
         # 加载代码规范配置
         rules = load_code_rules()
@@ -68,19 +134,29 @@ async def git_review_node(state: PRReviewState) -> PRReviewState:
                 for i, rule in enumerate(rules, 1)
             ])
             
+            # diff超过阈值时只发送最可能违规的片段，缩短提示词长度
+            llm_max_diff_bytes = git_check_config.get('llm_max_diff_bytes', 15000)
+            diff_sample = pr_diff
+            truncate_note = ""
+            if pr_stats.get('diff_size', len(pr_diff)) > llm_max_diff_bytes:
+                diff_sample = _salient_diff_slice(pr_diff, llm_max_diff_bytes)
+                truncate_note = (
+                    f"\n\n（注：diff共 {len(pr_diff)} 字节，已截取可能违规的片段 "
+                    f"{len(diff_sample)} 字节，请仅针对以上片段检查）"
+                )
+                print(f"[步骤1] diff较大（{len(pr_diff)} 字节），截取显著片段 {len(diff_sample)} 字节发送给LLM")
+            
+            # 要求LLM以JSON格式输出检查结果
             system_prompt = f"""你是代码规范检查专家。检查以下代码变更是否违反规范：
 
-                                {rules_text}
+{rules_text}
 
-                                要求：
-                                1. 仔细检查每一项规范
-                                2. 发现违规直接输出："规范名称: 具体问题描述"
-                                3. 无违规输出："通过"
+请以JSON格式输出检查结果，格式如下：
+{{"passed": true/false, "violations": ["违规描述1", "违规描述2", ...]}}
 
-                                只输出检查结果，不要解释。"""
-            
-            diff_sample = pr_diff
-            truncate_note = ""
+如果代码符合规范，violations为空数组。
+如果发现违规，在violations中列出所有问题，格式："规范名称: 具体问题描述"
+"""
             
             prompts = [
                 SystemMessage(content=system_prompt),
@@ -92,23 +168,6 @@ async def git_review_node(state: PRReviewState) -> PRReviewState:
             from src.utils.llm import llm, parser
             
             try:
-                # 修改system_prompt，要求输出JSON格式
-                system_prompt = f"""你是代码规范检查专家。检查以下代码变更是否违反规范：
-
-{rules_text}
-
-请以JSON格式输出检查结果，格式如下：
-{{
-    "passed": true/false,
-    "violations": ["违规描述1", "违规描述2", ...]
-}}
-
-如果代码符合规范，violations为空数组。
-如果发现违规，在violations中列出所有问题，格式："规范名称: 具体问题描述"
-"""
-                
-                prompts[0] = SystemMessage(content=system_prompt)
-                
                 # 使用JSON格式的LLM（从配置读取重试和超时）
                 expected_schema = {
                     "passed": bool,
@@ -120,14 +179,27 @@ async def git_review_node(state: PRReviewState) -> PRReviewState:
                 max_retries = llm_retry_config.get('git_review', 2)
                 timeout = llm_timeout_config.get('git_review', 300)
                 
-                print(f"[步骤2] 🤖 调用大模型进行规范检查（JSON格式，重试{max_retries}次，超时{timeout}秒）...")
-                result = await parser.parse_json_with_retry(
-                    conversation=prompts,
-                    expected_schema=expected_schema,
-                    max_retries=max_retries,
-                    parser_name="git_review",
-                    timeout=timeout
-                )
+                # xlarge的PR不缓存，避免键值过大
+                cache_key = None
+                if pr_size != 'xlarge':
+                    cache_key = _review_cache_key(system_prompt, diff_sample, expected_schema)
+                result = _review_cache.get(cache_key) if cache_key else None
+                
+                if result is not None:
+                    print("[步骤2] ✓ 命中规范检查缓存，跳过LLM调用")
+                else:
+                    print(f"[步骤2] 🤖 调用大模型进行规范检查（JSON格式，重试{max_retries}次，超时{timeout}秒）...")
+                    result = await parser.parse_json_with_retry(
+                        conversation=prompts,
+                        expected_schema=expected_schema,
+                        max_retries=max_retries,
+                        parser_name="git_review",
+                        timeout=timeout
+                    )
+                    if result and cache_key:
+                        _review_cache.set(cache_key, result)
+                
+                writer({"git_review_cache": _review_cache.stats()})
                 
                 if result:
                     is_passed = result.get("passed", True)
@@ -143,7 +215,7 @@ async def git_review_node(state: PRReviewState) -> PRReviewState:
                 else:
                     # JSON解析失败，降级到快速检查
                     print(f"[步骤2] ⚠️ LLM返回格式错误，降级使用快速规则检查")
-                    quick_violations = _quick_rule_check(pr_diff)
+                    quick_violations = await _run_quick_rule_check(pr_diff)
                     if quick_violations:
                         violations.extend(quick_violations)
                         print(f"[步骤2] ✓ 快速检查发现 {len(quick_violations)} 个潜在问题")
@@ -153,7 +225,7 @@ async def git_review_node(state: PRReviewState) -> PRReviewState:
             except Exception as e:
                 print(f"[步骤2] ⚠️ LLM调用失败: {str(e)[:100]}")
                 print(f"[步骤2] 降级使用快速规则检查")
-                quick_violations = _quick_rule_check(pr_diff)
+                quick_violations = await _run_quick_rule_check(pr_diff)
                 if quick_violations:
                     violations.extend(quick_violations)
                     print(f"[步骤2] ✓ 快速检查发现 {len(quick_violations)} 个潜在问题")
@@ -195,22 +267,156 @@ async def git_review_node(state: PRReviewState) -> PRReviewState:
         "current_stage": "code_analysis"
     }
 
+def _review_cache_key(system_prompt: str, pr_diff: str, expected_schema: dict) -> str:
+    """生成规范检查缓存键：system_prompt已包含规范内容，规范变化时键随之变化"""
+    key_source = json.dumps({
+        'prompt': system_prompt,
+        'diff': pr_diff,
+        'schema': {name: t.__name__ for name, t in expected_schema.items()},
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+
+def _salient_diff_slice(pr_diff: str, max_bytes: int) -> str:
+    """截取diff中最可能违规的片段
+    
+    按hunk扫描新增行，保留命中快速检查规则的行及其前后上下文，
+    连同文件头和hunk头拼接，UTF-8编码后的总字节数不超过max_bytes。
+    没有命中任何规则时退化为截取diff开头部分（在max_bytes内的最后一个换行处截断，不截断半行）。
+    """
+    parts = []
+    total = 0
+    file_header = []
+    header_emitted = False
+    hunk = []
+    
+    def flush_hunk():
+        nonlocal total, header_emitted
+        if len(hunk) < 2:
+            return
+        body = hunk[1:]
+        hit_indexes = [
+            idx for idx, line in enumerate(body)
+            if line.startswith('+') and any(p.search(line[1:]) for p in _QUICK_PATTERNS.values())
+        ]
+        if not hit_indexes:
+            return
+        
+        # 合并各命中行的上下文窗口
+        keep = set()
+        for idx in hit_indexes:
+            keep.update(range(max(0, idx - _SALIENT_CONTEXT_LINES),
+                              min(len(body), idx + _SALIENT_CONTEXT_LINES + 1)))
+        
+        chunk_lines = [] if header_emitted else list(file_header)
+        chunk_lines.append(hunk[0])
+        prev = None
+        for idx in sorted(keep):
+            if prev is not None and idx != prev + 1:
+                chunk_lines.append(' ...')
+            chunk_lines.append(body[idx])
+            prev = idx
+        chunk = '\n'.join(chunk_lines) + '\n'
+        chunk_bytes = len(chunk.encode('utf-8'))
+        
+        if total + chunk_bytes > max_bytes:
+            return
+        parts.append(chunk)
+        total += chunk_bytes
+        header_emitted = True
+    
+    for line in pr_diff.split('\n'):
+        if line.startswith('diff --git'):
+            flush_hunk()
+            hunk = []
+            file_header = [line]
+            header_emitted = False
+        elif line.startswith('@@'):
+            flush_hunk()
+            hunk = [line]
+        elif hunk:
+            hunk.append(line)
+        else:
+            file_header.append(line)
+        if total >= max_bytes:
+            break
+    flush_hunk()
+    
+    if not parts:
+        return _diff_head(pr_diff, max_bytes)
+    return ''.join(parts)
+
+
+def _diff_head(pr_diff: str, max_bytes: int) -> str:
+    """截取diff开头不超过max_bytes字节的完整行（第一行就超长时按字节截断）"""
+    # 每个字符至少占1字节，只需编码前max_bytes个字符
+    prefix = pr_diff[:max_bytes]
+    encoded = prefix.encode('utf-8')
+    if len(prefix) == len(pr_diff) and len(encoded) <= max_bytes:
+        return pr_diff
+    head = encoded[:max_bytes]
+    cut = head.rfind(b'\n')
+    if cut != -1:
+        head = head[:cut + 1]
+    return head.decode('utf-8', errors='ignore')
+
+
+def _signal_density(pr_diff: str, pr_stats: dict) -> float:
+    """估算变更的信号密度：(快速检查命中数 + 新增定义数) / diff字节数"""
+    diff_size = pr_stats.get('diff_size') or len(pr_diff)
+    if not diff_size:
+        return 0.0
+    quick_hits = sum(_quick_rule_counts(pr_diff).values())
+    new_definitions = len(_NEW_DEFINITION_PATTERN.findall(pr_diff))
+    return (quick_hits + new_definitions) / diff_size
+
+
+def _prematch_verdict(pr_diff: str, pr_stats: dict, git_check_config: dict):
+    """预匹配判定：用快速规则检查决定是否可以跳过LLM
+    
+    Returns:
+        - []: diff很小且无任何命中，判定为通过
+        - 违规列表: 命中总数达到阈值，直接返回快速检查结果
+        - None: 无法判定，需要调用LLM
+    """
+    trivial_diff_size = git_check_config.get('trivial_diff_size', 2000)
+    overwhelming_hits = git_check_config.get('prematch_overwhelming_hits', 20)
+    
+    counts = _quick_rule_counts(pr_diff)
+    if not counts and pr_stats.get('diff_size', len(pr_diff)) < trivial_diff_size:
+        return []
+    if counts and sum(counts.values()) >= overwhelming_hits:
+        return [f"[低] 发现{issue_name}：{count}处" for issue_name, count in counts.items()]
+    return None
+
+
+async def _run_quick_rule_check(pr_diff: str) -> list:
+    """执行快速规则检查：大diff放到线程中执行，小diff直接在当前协程中执行"""
+    if len(pr_diff) > _QUICK_CHECK_OFFLOAD_BYTES:
+        return await asyncio.to_thread(_quick_rule_check, pr_diff)
+    return _quick_rule_check(pr_diff)
+
+
 def _quick_rule_check(pr_diff: str) -> list:
     """快速规则检查 - 使用正则表达式，不依赖LLM"""
-    violations = []
+    return [
+        f"[低] 发现{issue_name}：{count}处"
+        for issue_name, count in _quick_rule_counts(pr_diff).items()
+    ]
+
+
+def _quick_rule_counts(pr_diff: str) -> dict:
+    """统计新增行中各快速检查规则的命中行数（只返回命中的规则）"""
+    counts = {}
     
-    # 常见问题模式
-    quick_patterns = {
-        'print语句': r'^\+.*\bprint\s*\(',
-        'console.log': r'^\+.*\bconsole\.log\s*\(',
-        'TODO标记': r'^\+.*\b(TODO|FIXME|XXX)\b',
-        '硬编码密码': r'^\+.*(password|secret|key)\s*=\s*["\'][^"\']+["\']',
-        '调试断点': r'^\+.*(debugger|breakpoint)',
-    }
+    # 只提取一次新增行（不含 +++ 文件头），各规则在同一段文本上匹配
+    added_text = '\n'.join(_ADDED_LINE_PATTERN.findall(pr_diff))
     
-    for issue_name, pattern in quick_patterns.items():
-        matches = re.findall(pattern, pr_diff, re.MULTILINE | re.IGNORECASE)
-        if matches:
-            violations.append(f"[低] 发现{issue_name}：{len(matches)}处")
+    # findall返回每个命中行的分组元组，未命中的规则对应空字符串
+    hit_rows = _QUICK_COMBINED.findall(added_text)
+    for column, (_, issue_name, _) in enumerate(_QUICK_RULES):
+        count = sum(1 for row in hit_rows if row[column])
+        if count:
+            counts[issue_name] = count
     
-    return violations
+    return counts
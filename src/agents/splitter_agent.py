@@ -4,12 +4,52 @@ PR拆分智能体
 
 import re
 import json
+import hashlib
+import heapq
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Set, Tuple
 from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.config import get_stream_writer
 from src.core.state import PRReviewState
 from src.utils.helpers import calculate_pr_size
 from src.utils.config import CONFIG
+from src.utils.cache import ResultCache
+
+
+# 预编译的正则表达式（模块级缓存，避免每次调用重复编译）
+_DIFF_GIT_HEADER = re.compile(r'^diff --git .*? b/(.+)$')
+
+_FUNC_PATTERNS = [
+    re.compile(r'^[-+]\s*(?:virtual\s+)?(?:static\s+)?(\w+)\s+(\w+)\s*\([^)]*\)'),
+    re.compile(r'^[-+]\s*def\s+(\w+)\s*\('),
+    re.compile(r'^[-+]\s*function\s+(\w+)\s*\('),
+]
+
+_CLASS_PATTERNS = [
+    re.compile(r'^[-+]\s*class\s+(\w+)'),
+    re.compile(r'^[-+]\s*struct\s+(\w+)'),
+]
+
+_CONTROL_KEYWORDS = frozenset(['if', 'while', 'for', 'switch', 'catch', 'return'])
+
+# 标识符（完整单词）：定义名以完整单词出现，等价于文本的标识符集合中包含该名称
+_IDENT_RE = re.compile(r'\w+')
+
+# 文件数超过该值时，依赖扫描使用线程池并行（文件较少时线程启动开销得不偿失）
+_PARALLEL_SCAN_MIN_FILES = 16
+
+# 不参与依赖分析的文件：锁文件、压缩产物、第三方/构建目录（diff体积大但没有有效定义）
+_SKIP_PATHS = re.compile(
+    r'(?:^|/)(?:package-lock\.json|yarn\.lock|Pipfile\.lock|poetry\.lock'
+    r'|[^/]*\.min\.(?:js|css)$'
+    r'|(?:vendor|node_modules|dist|build)/)'
+)
+
+# 依赖分析结果缓存：相同diff的重放（重试、重跑）直接复用分组结果
+_DEPENDENCY_CACHE_MAX_DIFF_BYTES = 2 * 1024 * 1024  # 超过2MB的diff不缓存
+_dependency_cache = ResultCache('splitter', maxsize=64)
 
 
 async def pr_splitter_node(state: PRReviewState) -> PRReviewState:
@@ -95,7 +135,10 @@ async def pr_splitter_node(state: PRReviewState) -> PRReviewState:
     print("[步骤3] ⚠️ PR规模较大，需要拆分")
     print("\n[步骤4] 执行智能拆分...")
     
-    sub_prs = await _split_pr_by_modules(pr_diff, pr_files, pr_stats)
+    # diff只解析一遍，后续拆分、依赖分析均复用解析结果
+    parsed_diff = _parse_diff_once(pr_diff)
+    diff_hash = _hash_diff(pr_diff)
+    sub_prs = await _split_pr_by_modules(parsed_diff, pr_files, pr_stats, diff_hash)
     
     if not sub_prs or len(sub_prs) <= 1:
         print("[步骤4] ⚠️ 拆分失败或拆分后仍为单个PR，使用原始PR")
@@ -154,7 +197,7 @@ def _should_split_pr(pr_size: str, pr_stats: Dict, pr_files: List) -> bool:
     return False
 
 
-async def _split_pr_by_modules(pr_diff: str, pr_files: List[Dict], pr_stats: Dict) -> List[Dict]:
+async def _split_pr_by_modules(parsed_diff: Dict[str, Dict[str, List[str]]], pr_files: List[Dict], pr_stats: Dict, diff_hash: str = None) -> List[Dict]:
     """使用依赖关系感知的智能拆分
     
     策略：
@@ -179,19 +222,24 @@ async def _split_pr_by_modules(pr_diff: str, pr_files: List[Dict], pr_stats: Dic
         if file_path:
             file_paths.append(file_path)
     
-    # 按文件拆分diff
-    file_diffs = _split_diff_by_file(pr_diff)
+    # 按文件拆分diff，并一次性计算各文件diff的字节数（后续分组统计直接查表）
+    file_diffs = _split_diff_by_file(parsed_diff)
+    file_sizes = {f: _diff_byte_size(d) for f, d in file_diffs.items()}
     
     # 步骤0: 分析依赖关系
     dependency_groups = []
     if enable_dependency_analysis:
         print("[依赖分析] 🔍 分析文件间依赖关系...")
-        dependency_groups = _analyze_and_group_dependencies(file_paths, file_diffs)
+        # 锁文件、生成文件、二进制文件不参与分析，后续作为独立文件处理
+        analyze_paths = [f for f in file_paths if not _should_skip_dependency_analysis(f, parsed_diff)]
+        if len(analyze_paths) < len(file_paths):
+            print(f"[依赖分析] ℹ️ 跳过 {len(file_paths) - len(analyze_paths)} 个锁文件/生成文件/二进制文件")
+        dependency_groups = _cached_dependency_groups(diff_hash, analyze_paths, parsed_diff)
         
         if dependency_groups:
             print(f"[依赖分析] ✓ 发现 {len(dependency_groups)} 个依赖组")
             for i, group in enumerate(dependency_groups, 1):
-                group_size = sum(len(file_diffs.get(f, '').encode('utf-8')) for f in group)
+                group_size = sum(file_sizes.get(f, 0) for f in group)
                 print(f"        - 依赖组 {i}: {len(group)} 个文件, {group_size} bytes")
                 for f in group[:3]:
                     print(f"          • {f}")
@@ -218,7 +266,7 @@ async def _split_pr_by_modules(pr_diff: str, pr_files: List[Dict], pr_stats: Dic
     # 策略1: 优先按依赖组拆分（保证依赖完整性）
     if len(dependency_groups) > 1:
         print(f"[拆分策略] ✓ 发现多个依赖组，直接按依赖组拆分（共 {len(dependency_groups)} 组）")
-        return _split_by_dependency_groups(dependency_groups, file_diffs)
+        return _split_by_dependency_groups(dependency_groups, file_diffs, file_sizes)
     
     # 策略2: 按目录分组（保持依赖组完整）
     print("[拆分策略] 只有1个依赖组，尝试按目录分组...")
@@ -257,30 +305,74 @@ async def _split_pr_by_modules(pr_diff: str, pr_files: List[Dict], pr_stats: Dic
     print(f"[拆分策略] ✓ 均分完成，共 {len(sub_prs)} 个子PR")
     return sub_prs
 
-def _split_diff_by_file(pr_diff: str) -> Dict:
-    """将diff按文件分割"""
-    file_diffs = {}
-    current_file = None
-    current_content = []
+def _parse_diff_once(pr_diff: str) -> Dict[str, Dict[str, List[str]]]:
+    """单次遍历diff，按文件解析出全部行、变更行和新增行
+    
+    Returns:
+        {文件路径: {'all_lines': 该文件的全部diff行,
+                    'changed': 新增和删除行（不含 +++/--- 文件头）,
+                    'added': 新增行（不含 +++ 文件头）}}
+    """
+    parsed_diff = {}
+    current = None
     
     for line in pr_diff.split('\n'):
-        if line.startswith('diff --git'):
-            if current_file:
-                file_diffs[current_file] = '\n'.join(current_content)
+        # 按首字符分派：大多数行是上下文行，只需一次切片比较
+        c0 = line[:1]
+        if c0 == 'd' and line.startswith('diff --git'):
             # 提取文件名
-            match = re.search(r'b/(.+)$', line)
-            current_file = match.group(1) if match else 'unknown'
-            current_content = [line]
-        elif current_file:
-            current_content.append(line)
-    
-    if current_file:
-        file_diffs[current_file] = '\n'.join(current_content)
-    
-    return file_diffs
+            match = _DIFF_GIT_HEADER.match(line)
+            current = {'all_lines': [line], 'changed': [], 'added': []}
+            parsed_diff[match.group(1) if match else 'unknown'] = current
+        elif current is not None:
+            current['all_lines'].append(line)
+            if c0 == '+':
+                if not line.startswith('+++'):
+                    current['changed'].append(line)
+                    current['added'].append(line)
+            elif c0 == '-' and not line.startswith('---'):
+                current['changed'].append(line)
+    
+    return parsed_diff
+
+
+def _diff_byte_size(diff: str) -> int:
+    """计算diff的UTF-8字节数（纯ASCII时字符数即字节数，无需编码）"""
+    return len(diff) if diff.isascii() else len(diff.encode('utf-8'))
 
 
-def _analyze_and_group_dependencies(file_paths: List[str], file_diffs: Dict) -> List[List[str]]:
+def _joined_size(files: List[str], file_sizes: Dict[str, int]) -> int:
+    """计算多个文件diff以换行拼接后的字节数"""
+    if not files:
+        return 0
+    return sum(file_sizes.get(f, 0) for f in files) + len(files) - 1
+
+
+def _split_diff_by_file(parsed_diff: Dict[str, Dict[str, List[str]]]) -> Dict:
+    """将diff按文件分割"""
+    return {
+        file_path: '\n'.join(parsed['all_lines'])
+        for file_path, parsed in parsed_diff.items()
+    }
+
+
+def _should_skip_dependency_analysis(file_path: str, parsed_diff: Dict[str, Dict[str, List[str]]]) -> bool:
+    """判断文件是否跳过依赖分析（锁文件、压缩/第三方/构建产物、二进制文件）"""
+    if _SKIP_PATHS.search(file_path):
+        return True
+    parsed = parsed_diff.get(file_path)
+    if not parsed:
+        return False
+    # 二进制文件的diff没有hunk，只有文件头中的 "Binary files ... differ"
+    for line in parsed['all_lines']:
+        if line.startswith('@@'):
+            return False
+        if line.startswith('Binary files'):
+            return True
+    return False
+
+
+def _analyze_and_group_dependencies(file_paths: List[str], parsed_diff: Dict[str, Dict[str, List[str]]]) -> List[List[str]]:
     """分析文件间依赖关系并构建依赖组
     
     使用并查集（Union-Find）将有依赖的文件分组
@@ -288,86 +380,137 @@ def _analyze_and_group_dependencies(file_paths: List[str], file_diffs: Dict) ->
     # 步骤1: 提取每个文件中变更的定义
     file_definitions = {}
     for file_path in file_paths:
-        diff = file_diffs.get(file_path, '')
-        definitions = _extract_changed_definitions_from_diff(diff)
+        parsed = parsed_diff.get(file_path)
+        if not parsed:
+            continue
+        # 定义模式只匹配 +/- 开头的行，上下文行和文件头无需参与匹配
+        definitions = _extract_changed_definitions_from_diff(parsed['changed'])
         if definitions:
             file_definitions[file_path] = definitions
     
     if not file_definitions:
         return []
     
-    # 步骤2: 构建依赖图
-    dependencies = {}
-    for file_path in file_paths:
-        diff = file_diffs.get(file_path, '')
+    # 步骤2: 构建依赖图（每个文件的新增行只提取一遍标识符集合，定义名查找为集合运算）
+    name_owners = {}  # {定义名: [(所在文件, 定义类型)]}
+    for owner_file, defs in file_definitions.items():
+        for def_name, def_type in defs:
+            name_owners.setdefault(def_name, []).append((owner_file, def_type))
+    
+    def scan_one_file(file_path: str) -> Tuple[Set[str], List[str]]:
+        """扫描单个文件的新增行，返回(依赖的文件集合, 依赖日志)"""
+        parsed = parsed_diff.get(file_path)
+        if not parsed:
+            return set(), []
+        identifiers = set(_IDENT_RE.findall('\n'.join(parsed['added'])))
         deps = set()
+        logs = []
         
-        for other_file, defs in file_definitions.items():
-            if other_file == file_path:
-                continue
-            
-            for def_name, def_type in defs:
-                if _has_reference_in_diff(diff, def_name, def_type):
-                    deps.add(other_file)
-                    print(f"        [依赖] {file_path} → {other_file} (使用了 {def_type}: {def_name})")
+        for def_name in sorted(identifiers.intersection(name_owners)):
+            for other_file, def_type in name_owners[def_name]:
+                if other_file == file_path:
+                    continue
+                deps.add(other_file)
+                logs.append(f"        [依赖] {file_path} → {other_file} (使用了 {def_type}: {def_name})")
         
+        return deps, logs
+    
+    # 各文件的扫描相互独立，文件较多时并行扫描；结果按file_paths顺序汇总，并查集合并仍在当前线程
+    if len(file_paths) > _PARALLEL_SCAN_MIN_FILES:
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+            scan_results = list(executor.map(scan_one_file, file_paths))
+    else:
+        scan_results = [scan_one_file(file_path) for file_path in file_paths]
+    
+    dependencies = {}
+    for file_path, (deps, logs) in zip(file_paths, scan_results):
+        for log in logs:
+            print(log)
         if deps:
             dependencies[file_path] = list(deps)
     
     # 步骤3: 使用并查集构建依赖组
     parent = {f: f for f in file_paths}
+    rank = {f: 0 for f in file_paths}
     
     def find(x):
-        if parent[x] != x:
-            parent[x] = find(parent[x])
-        return parent[x]
+        # 迭代实现：先找到根，再把路径上的节点直接挂到根上（避免递归深度限制）
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
     
     def union(x, y):
         px, py = find(x), find(y)
-        if px != py:
-            parent[px] = py
+        if px == py:
+            return
+        # 按秩合并：矮树挂到高树下，保持树高平衡
+        if rank[px] < rank[py]:
+            px, py = py, px
+        parent[py] = px
+        if rank[px] == rank[py]:
+            rank[px] += 1
     
     for file_a, dep_files in dependencies.items():
         for file_b in dep_files:
             union(file_a, file_b)
     
-    groups_dict = {}
+    groups_dict = defaultdict(list)
     for file_path in file_paths:
-        root = find(file_path)
-        if root not in groups_dict:
-            groups_dict[root] = []
-        groups_dict[root].append(file_path)
+        groups_dict[find(file_path)].append(file_path)
     
     dependency_groups = [group for group in groups_dict.values() if len(group) > 1]
     return dependency_groups
 
 
-def _extract_changed_definitions_from_diff(diff: str) -> List[Tuple[str, str]]:
-    """从diff中提取被修改或新增的定义"""
-    definitions = []
+def _hash_diff(pr_diff: str) -> str:
+    """计算diff内容哈希，作为依赖分析缓存的键
+    
+    超过大小上限的diff返回None，表示不缓存
+    """
+    diff_bytes = pr_diff.encode('utf-8')
+    if len(diff_bytes) > _DEPENDENCY_CACHE_MAX_DIFF_BYTES:
+        return None
+    return hashlib.blake2b(diff_bytes, digest_size=16).hexdigest()
+
+
+def _cached_dependency_groups(diff_hash: str, file_paths: List[str], parsed_diff: Dict[str, Dict[str, List[str]]]) -> List[List[str]]:
+    """带缓存的依赖分析
     
-    func_patterns = [
-        r'^[-+]\s*(?:virtual\s+)?(?:static\s+)?(\w+)\s+(\w+)\s*\([^)]*\)',
-        r'^[-+]\s*def\s+(\w+)\s*\(',
-        r'^[-+]\s*function\s+(\w+)\s*\(',
-    ]
+    依赖分析是diff的纯函数，以(diff哈希, 文件路径)为键缓存结果：
+    先查内存LRU，再查磁盘缓存（diskcache可用时），都未命中才重新分析。
+    """
+    if not diff_hash:
+        return _analyze_and_group_dependencies(file_paths, parsed_diff)
+    
+    cache_key = (diff_hash, tuple(file_paths))
+    cached = _dependency_cache.get(cache_key)
+    if cached is not None:
+        print("[依赖分析] ✓ 命中缓存，复用依赖分组结果")
+        return [list(group) for group in cached]
     
-    class_patterns = [
-        r'^[-+]\s*class\s+(\w+)',
-        r'^[-+]\s*struct\s+(\w+)',
-    ]
+    groups = _analyze_and_group_dependencies(file_paths, parsed_diff)
+    _dependency_cache.set(cache_key, [list(group) for group in groups])
+    return groups
+
+
+def _extract_changed_definitions_from_diff(diff_lines: List[str]) -> List[Tuple[str, str]]:
+    """从diff行中提取被修改或新增的定义"""
+    definitions = []
     
-    for line in diff.split('\n'):
-        for pattern in func_patterns:
-            match = re.search(pattern, line)
+    for line in diff_lines:
+        for pattern in _FUNC_PATTERNS:
+            match = pattern.search(line)
             if match:
                 func_name = match.group(2) if len(match.groups()) > 1 else match.group(1)
-                if func_name not in ['if', 'while', 'for', 'switch', 'catch', 'return']:
+                if func_name not in _CONTROL_KEYWORDS:
                     definitions.append((func_name, 'function'))
                     break
         
-        for pattern in class_patterns:
-            match = re.search(pattern, line)
+        for pattern in _CLASS_PATTERNS:
+            match = pattern.search(line)
             if match:
                 definitions.append((match.group(1), 'class'))
                 break
@@ -375,34 +518,7 @@ def _extract_changed_definitions_from_diff(diff: str) -> List[Tuple[str, str]]:
     return list(set(definitions))
 
 
-def _has_reference_in_diff(diff: str, name: str, def_type: str) -> bool:
-    """检查diff中是否引用了指定的定义"""
-    escaped_name = re.escape(name)
-    added_lines = [line for line in diff.split('\n') if line.startswith('+') and not line.startswith('+++')]
-    
-    if def_type == 'function':
-        patterns = [
-            rf'\b{escaped_name}\s*\(',
-            rf'::{escaped_name}\s*\(',
-            rf'\b{escaped_name}\b',
-        ]
-    elif def_type == 'class':
-        patterns = [
-            rf'\b{escaped_name}\b',
-            rf'\b{escaped_name}\s*\(',
-            rf'\b{escaped_name}\s*[*&]',
-        ]
-    else:
-        patterns = [rf'\b{escaped_name}\b']
-    
-    for line in added_lines:
-        for pattern in patterns:
-            if re.search(pattern, line):
-                return True
-    return False
-
-
-def _split_by_dependency_groups(dependency_groups: List[List[str]], file_diffs: Dict) -> List[Dict]:
+def _split_by_dependency_groups(dependency_groups: List[List[str]], file_diffs: Dict, file_sizes: Dict[str, int]) -> List[Dict]:
     """直接按依赖组拆分为子PR
     
     策略：
@@ -428,7 +544,7 @@ def _split_by_dependency_groups(dependency_groups: List[List[str]], file_diffs:
     for group in dependency_groups_only:
         dep_group_count += 1
         group_diff = "\n".join([file_diffs.get(f, "") for f in group])
-        group_size = len(group_diff.encode('utf-8'))
+        group_size = _joined_size(group, file_sizes)
         
         sub_pr = {
             "title": f"[子PR] 依赖组 {dep_group_count} ({len(group)}个相互依赖的文件)",
@@ -442,9 +558,7 @@ def _split_by_dependency_groups(dependency_groups: List[List[str]], file_diffs:
     # 处理独立文件
     if independent_files:
         # 计算独立文件总代码量
-        total_independent_size = sum(
-            len(file_diffs.get(f, "").encode('utf-8')) for f in independent_files
-        )
+        total_independent_size = sum(file_sizes.get(f, 0) for f in independent_files)
         
         # 使用target_diff_size作为每组目标大小
         splitting_config = CONFIG.get('pr_review', {}).get('splitting', {})
@@ -464,11 +578,11 @@ def _split_by_dependency_groups(dependency_groups: List[List[str]], file_diffs:
             print(f"        [合并] {len(independent_files)}个独立文件合并为1个子PR (总计 {total_independent_size} bytes)")
         else:
             # 代码量较大，使用贪心算法分组（每组尽量接近target_size）
-            grouped_files = _group_independent_files_by_size(independent_files, file_diffs, target_size)
+            grouped_files = _group_independent_files_by_size(independent_files, file_sizes, target_size)
             
             for i, group_files in enumerate(grouped_files, 1):
                 group_diff = "\n".join([file_diffs.get(f, "") for f in group_files])
-                group_size = len(group_diff.encode('utf-8'))
+                group_size = _joined_size(group_files, file_sizes)
                 
                 if len(group_files) == 1:
                     title = f"[子PR] 独立文件 {i}"
@@ -486,40 +600,38 @@ def _split_by_dependency_groups(dependency_groups: List[List[str]], file_diffs:
             
             print(f"        [智能分组] {len(independent_files)}个独立文件分为{len(grouped_files)}组 (总计 {total_independent_size} bytes)")
             for i, group_files in enumerate(grouped_files, 1):
-                group_size = sum(len(file_diffs.get(f, "").encode('utf-8')) for f in group_files)
+                group_size = sum(file_sizes.get(f, 0) for f in group_files)
                 print(f"            - 组{i}: {len(group_files)}个文件, {group_size} bytes")
     
     return sub_prs
 
 
-def _group_independent_files_by_size(independent_files: List[str], file_diffs: Dict, target_size: int) -> List[List[str]]:
+def _group_independent_files_by_size(independent_files: List[str], file_sizes: Dict[str, int], target_size: int) -> List[List[str]]:
     """使用贪心算法将独立文件按大小分组
     
     策略：
     1. 按文件大小降序排列
-    2. 使用First Fit Decreasing算法，将文件分配到尽量接近target_size的组中
+    2. 用最大堆维护各组剩余容量，每个文件尝试放入剩余容量最大的组，放不下则新建组（O(N log N)）
     3. 尽量避免单文件一组（除非文件本身超过target_size）
     """
-    # 计算每个文件的大小
-    file_sizes = [(f, len(file_diffs.get(f, "").encode('utf-8'))) for f in independent_files]
     # 按大小降序排列
-    file_sizes.sort(key=lambda x: x[1], reverse=True)
+    sorted_files = sorted(
+        ((f, file_sizes.get(f, 0)) for f in independent_files),
+        key=lambda x: x[1], reverse=True
+    )
     
     groups = []
-    
-    for file_path, file_size in file_sizes:
-        # 尝试找到一个合适的组加入（总大小不超过target_size）
-        placed = False
-        for group in groups:
-            group_size = sum(len(file_diffs.get(f, "").encode('utf-8')) for f in group)
-            if group_size + file_size <= target_size:
-                group.append(file_path)
-                placed = True
-                break
-        
-        # 如果没有合适的组，创建新组
-        if not placed:
+    heap = []  # (-剩余容量, 组序号)，堆顶为剩余容量最大的组
+    
+    for file_path, file_size in sorted_files:
+        # 剩余容量最大的组都放不下时，其他组也放不下
+        if heap and -heap[0][0] >= file_size:
+            neg_remaining, group_idx = heapq.heappop(heap)
+            groups[group_idx].append(file_path)
+            heapq.heappush(heap, (neg_remaining + file_size, group_idx))
+        else:
             groups.append([file_path])
+            heapq.heappush(heap, (-(target_size - file_size), len(groups) - 1))
     
     return groups
 
@@ -529,32 +641,30 @@ def _group_dependency_aware_by_directory(dependency_groups: List[List[str]], fil
     
     将依赖组按目录分组，但确保每个依赖组完整性
     """
-    dir_groups = {}
+    dir_groups = defaultdict(lambda: {'files': [], 'diff_parts': []})
     
     for dep_group in dependency_groups:
-        # 找到这个依赖组的主要目录（出现最多的目录）
-        dir_counts = {}
-        for file_path in dep_group:
-            parts = file_path.split('/')
-            dir_name = parts[0] if len(parts) > 1 else "根目录"
-            dir_counts[dir_name] = dir_counts.get(dir_name, 0) + 1
-        
-        # 选择文件最多的目录
-        main_dir = max(dir_counts, key=dir_counts.get)
-        
-        if main_dir not in dir_groups:
-            dir_groups[main_dir] = {
-                'files': [],
-                'diff': ""
-            }
+        # 找到这个依赖组的主要目录（出现最多的目录，数量相同时取先出现的）
+        dir_counts = Counter(
+            file_path.split('/', 1)[0] if '/' in file_path else "根目录"
+            for file_path in dep_group
+        )
+        main_dir = dir_counts.most_common(1)[0][0]
         
         # 将整个依赖组加入该目录
+        group_entry = dir_groups[main_dir]
         for file_path in dep_group:
-            dir_groups[main_dir]['files'].append({"path": file_path})
-            if file_path in file_diffs:
-                dir_groups[main_dir]['diff'] += file_diffs[file_path] + "\n"
+            group_entry['files'].append({"path": file_path})
+            file_diff = file_diffs.get(file_path)
+            if file_diff is not None:
+                group_entry['diff_parts'].append(file_diff)
     
     # 过滤掉太小的组
     filtered = {k: v for k, v in dir_groups.items() if len(v['files']) >= 2}
+    selected = filtered if len(filtered) > 1 else dir_groups
     
-    return filtered if len(filtered) > 1 else dir_groups
+    # 每组的diff只在最后拼接一次（每个文件diff后跟一个换行）
+    return {
+        k: {'files': v['files'], 'diff': ''.join(f"{part}\n" for part in v['diff_parts'])}
+        for k, v in selected.items()
+    }
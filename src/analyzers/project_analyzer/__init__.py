@@ -8,13 +8,14 @@ from .fast_file_searcher import FastFileSearcher
 
 # AST解析器
 try:
-    from .ast_parser import ASTParser, ASTNode, CodeParser
+    from .ast_parser import ASTParser, ASTNode, ASTNodeTable, CodeParser
     AST_AVAILABLE = True
 except ImportError:
     from .code_parser import CodeParser
     AST_AVAILABLE = False
     ASTParser = None
     ASTNode = None
+    ASTNodeTable = None
 
 
 # 导入追踪系统
@@ -42,6 +43,7 @@ __all__ = [
     'FastFileSearcher',
     'ASTParser',
     'ASTNode',
+    'ASTNodeTable',
     'AST_AVAILABLE',
     'ImportParser',
     'ModuleResolver',
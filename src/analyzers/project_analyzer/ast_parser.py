@@ -4,15 +4,27 @@
 """
 
 import os
+import re
+import sys
+import hashlib
+import sqlite3
+import threading
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Optional, Dict, Set
-from dataclasses import dataclass, asdict
+from typing import List, Optional, Dict, Set, Tuple, Union
+from dataclasses import dataclass, asdict, field
 from typing import Any
 import json
 
 # Tree-sitter导入（可选依赖）
 try:
     import tree_sitter_languages
+    from tree_sitter_languages import get_parser as _ts_get_parser, get_language as _ts_get_language
     TREE_SITTER_AVAILABLE = True
     print(f"[AST解析器] ✓ tree-sitter可用 (版本: {tree_sitter_languages.__version__})")
 except ImportError:
@@ -23,7 +35,7 @@ except Exception as e:
     print(f"[AST解析器] ⚠️ tree-sitter加载失败: {e}")
 
 
-@dataclass
+@dataclass(slots=True)
 class ASTNode:
     """AST节点信息"""
     name: str
@@ -54,6 +66,60 @@ class ASTNode:
 
 
 @dataclass
+class ASTNodeTable:
+    """AST节点的列式存储
+    
+    各字段按列保存在并行的列表/数组中，遍历时无需逐个对象取属性；
+    类型字符串做intern，行号使用array('I')
+    """
+    names: List[str] = field(default_factory=list)
+    types: List[str] = field(default_factory=list)
+    line_numbers: array = field(default_factory=lambda: array('I'))
+    end_lines: array = field(default_factory=lambda: array('I'))
+    line_contents: List[str] = field(default_factory=list)
+    file_paths: List[str] = field(default_factory=list)
+    parents: List[Optional[str]] = field(default_factory=list)
+    params: List[Optional[List[str]]] = field(default_factory=list)
+    return_types: List[Optional[str]] = field(default_factory=list)
+    docstrings: List[Optional[str]] = field(default_factory=list)
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def append(self, node: ASTNode):
+        """追加一个节点"""
+        self.names.append(node.name)
+        self.types.append(sys.intern(node.type))
+        self.line_numbers.append(node.line_number)
+        self.end_lines.append(node.end_line)
+        self.line_contents.append(node.line_content)
+        self.file_paths.append(node.file_path)
+        self.parents.append(node.parent)
+        self.params.append(node.params)
+        self.return_types.append(node.return_type)
+        self.docstrings.append(node.docstring)
+    
+    @classmethod
+    def from_nodes(cls, nodes: List[ASTNode]) -> "ASTNodeTable":
+        """由节点列表构建列式表"""
+        table = cls()
+        for node in nodes:
+            table.append(node)
+        return table
+    
+    def to_nodes(self) -> List[ASTNode]:
+        """还原为节点列表"""
+        return [
+            ASTNode(*row)
+            for row in zip(
+                self.names, self.types, self.line_numbers, self.end_lines,
+                self.line_contents, self.file_paths, self.parents,
+                self.params, self.return_types, self.docstrings
+            )
+        ]
+
+
+@dataclass(slots=True)
 class ImportInfo:
     """导入语句信息"""
     source_file: str          # 导入所在文件
@@ -68,6 +134,153 @@ class ImportInfo:
         return asdict(self)
 
 
+class _ASTCacheDB:
+    """
+    AST解析结果的持久化缓存（SQLite）
+    以文件绝对路径为键保存解析出的节点列表及对应内容的SHA-256，文件内容变化后自动失效；
+    每个路径只保留最近一次写入的记录，缓存文件大小随文件数而不是修改次数增长
+    """
+    
+    # 提取逻辑变化时递增版本号，旧版本的缓存表不再被读取
+    SCHEMA_VERSION = 7
+    DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.prmanger_cache', 'ast.sqlite')
+    
+    def __init__(self, db_path: str = DEFAULT_PATH):
+        self._lock = threading.Lock()
+        self._table = f"ast_v{self.SCHEMA_VERSION}"
+        self._conn = None
+        try:
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            conn = sqlite3.connect(db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._table} "
+                f"(path TEXT PRIMARY KEY, sha BLOB, json BLOB)"
+            )
+            # 旧版本的表不会再被读取，直接删除以回收空间
+            stale_tables = [
+                name for (name,) in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'ast_v%'"
+                )
+                if name != self._table
+            ]
+            for name in stale_tables:
+                conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            conn.commit()
+            self._conn = conn
+        except (sqlite3.Error, OSError) as e:
+            print(f"[AST解析器] ⚠️ AST缓存不可用，将每次重新解析: {e}")
+        
+        self._select_sql = f"SELECT json FROM {self._table} WHERE path = ? AND sha = ?"
+        self._upsert_sql = f"INSERT OR REPLACE INTO {self._table} (path, sha, json) VALUES (?, ?, ?)"
+    
+    def get(self, path: str, sha: bytes) -> Optional[List[Dict]]:
+        """读取缓存的节点字典列表，未命中返回None"""
+        if self._conn is None:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute(self._select_sql, (path, sha)).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row else None
+    
+    def put(self, path: str, sha: bytes, nodes: List[Dict]):
+        """写入节点字典列表（覆盖同一路径之前的记录）"""
+        if self._conn is None:
+            return
+        payload = json.dumps(nodes, ensure_ascii=False).encode('utf-8')
+        try:
+            with self._lock:
+                self._conn.execute(self._upsert_sql, (path, sha, payload))
+                self._conn.commit()
+        except sqlite3.Error:
+            pass
+
+
+def _read_file_bytes(filepath: str) -> bytes:
+    """按文件大小一次性读取全部字节（绕过缓冲IO层，小文件通常只需一次系统调用）"""
+    fd = os.open(filepath, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        size = os.fstat(fd).st_size
+        chunks = []
+        while True:
+            # 文件可能在读取过程中增长，读到EOF为止
+            chunk = os.read(fd, max(size, 65536))
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b''.join(chunks) if len(chunks) != 1 else chunks[0]
+    finally:
+        os.close(fd)
+
+
+_ast_cache_db = None
+_ast_cache_db_lock = threading.Lock()
+
+
+def _get_ast_cache_db() -> _ASTCacheDB:
+    """懒加载进程内共享的AST缓存"""
+    global _ast_cache_db
+    if _ast_cache_db is None:
+        with _ast_cache_db_lock:
+            if _ast_cache_db is None:
+                _ast_cache_db = _ASTCacheDB()
+    return _ast_cache_db
+
+
+class _SourceLines:
+    """按需解码的源码行视图
+    
+    只记录每行起始字节偏移，按行号访问时才解码对应的一行，
+    行的划分与 source.decode().split('\\n') 一致
+    """
+    
+    __slots__ = ('_source', '_starts')
+    
+    def __init__(self, source: bytes):
+        self._source = source
+        starts = [0]
+        find = source.find
+        pos = find(b'\n')
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = find(b'\n', pos + 1)
+        self._starts = starts
+    
+    def __len__(self) -> int:
+        return len(self._starts)
+    
+    def __getitem__(self, index: int) -> str:
+        return self.raw(index).decode('utf-8', errors='replace')
+    
+    def raw(self, index: int) -> bytes:
+        """返回第index行的原始字节（不含换行符，不解码）"""
+        count = len(self._starts)
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError(index)
+        start = self._starts[index]
+        end = self._starts[index + 1] - 1 if index + 1 < count else len(self._source)
+        return self._source[start:end]
+
+
+# 参数扫描用的字节集合
+_PARAM_WS = frozenset(b' \t\r\n')
+_PARAM_OPEN = frozenset(b'([{')
+_PARAM_CLOSE = frozenset(b')]}')
+# 泛型参数用<>括起的语言才把<>当作括号（Python等语言中<>是比较运算符，如默认值 a=x<y）
+_GENERIC_PARAM_OPEN = _PARAM_OPEN | frozenset(b'<')
+_GENERIC_PARAM_CLOSE = _PARAM_CLOSE | frozenset(b'>')
+_ANGLE_GENERIC_LANGUAGES = frozenset({'typescript', 'java', 'cpp', 'c_sharp'})
+_PARAM_QUOTES = frozenset(b'"\'`')
+_BACKSLASH = ord('\\')
+_COMMA = ord(',')
+_LPAREN = ord('(')
+_RPAREN = ord(')')
+
+
 class ASTParser:
     """
     基于Tree-sitter的AST解析器
@@ -100,6 +313,8 @@ class ASTParser:
     }
     
     # 各语言的定义查询模式
+    # 每种语言的所有模式（类/函数/方法/接口等）写在同一个字符串中，编译为一个组合查询，
+    # 一次查询即可在同一遍遍历中匹配全部模式，不要按定义类型拆成多个查询分别执行
     QUERIES = {
         'python': """
             (class_definition
@@ -152,9 +367,9 @@ class ASTParser:
                 name: (identifier) @interface.name) @interface.def
             
             (method_declaration
+                type: (_) @method.return
                 name: (identifier) @method.name
-                parameters: (formal_parameters) @method.params
-                type: (_) @method.return) @method.def
+                parameters: (formal_parameters) @method.params) @method.def
         """,
         
         'go': """
@@ -199,8 +414,29 @@ class ASTParser:
         """,
     }
     
+    # 函数/方法定义节点类型（仅签名模式下跳过这些节点的函数体）
+    FUNCTION_NODE_TYPES = frozenset({
+        'function_definition', 'function_declaration', 'generator_function_declaration',
+        'method_definition', 'method_declaration', 'constructor_declaration',
+        'function_item',
+    })
+    
+    # 已编译的查询缓存 {语言: (Language, Query)}
+    # 类级别共享：解析器实例通常按次创建，查询编译只需在进程内做一次
+    _query_cache: Dict[str, Tuple[Any, Any]] = {}
+    
+    # 各查询模式对应的捕获名 {语言: [(def_type, def捕获, name捕获, params捕获, return捕获), ...]}
+    # 按模式序号排列，供Query.matches按pattern_index直接取对应捕获
+    _pattern_captures_cache: Dict[str, List[Tuple[str, str, str, str, str]]] = {}
+    
+    # 目录遍历结果缓存 {目录绝对路径: ({子目录绝对路径: mtime_ns}, [相对源文件路径])}
+    # 目录增删文件/子目录时其mtime会变化，所有子目录mtime不变即可复用文件列表
+    _dir_listing_cache: Dict[str, Tuple[Dict[str, int], List[str]]] = {}
+    _dir_listing_lock = threading.Lock()
+    
     def __init__(self):
-        self.parsers = {}  # 缓存各语言的parser
+        # 各语言parser按线程缓存（tree-sitter的Parser对象不能在线程间共享）
+        self._tls = threading.local()
         self.available = TREE_SITTER_AVAILABLE
         
         if not self.available:
@@ -211,40 +447,139 @@ class ASTParser:
         if not self.available:
             return None
         
-        if language not in self.parsers:
+        parsers = getattr(self._tls, 'parsers', None)
+        if parsers is None:
+            parsers = self._tls.parsers = {}
+        
+        if language not in parsers:
             try:
-                # 直接导入特定语言的parser（新版API）
-                if language == 'python':
-                    from tree_sitter_languages import get_parser
-                    self.parsers[language] = get_parser('python')
-                elif language == 'javascript':
-                    from tree_sitter_languages import get_parser
-                    self.parsers[language] = get_parser('javascript')
-                elif language == 'typescript':
-                    from tree_sitter_languages import get_parser
-                    self.parsers[language] = get_parser('typescript')
-                else:
-                    from tree_sitter_languages import get_parser
-                    self.parsers[language] = get_parser(language)
+                parsers[language] = _ts_get_parser(language)
             except Exception as e:
                 print(f"[AST解析器] ⚠️ 无法加载语言 {language}: {e}")
                 import traceback
                 traceback.print_exc()
                 return None
         
-        return self.parsers[language]
+        return parsers[language]
+    
+    def _get_language_and_query(self, language: str) -> Tuple[Any, Any]:
+        """获取指定语言的Language对象和已编译查询（缓存）
+        
+        Returns:
+            (Language, Query)，该语言没有查询模式时返回(None, None)
+        """
+        cached = ASTParser._query_cache.get(language)
+        if cached is not None:
+            return cached
+        
+        query_str = self.QUERIES.get(language)
+        if not query_str:
+            return None, None
+        
+        lang = _ts_get_language(language)
+        cached = (lang, lang.query(query_str))
+        ASTParser._query_cache[language] = cached
+        return cached
+    
+    def _get_pattern_captures(self, language: str) -> List[Tuple[str, str, str, str, str]]:
+        """按模式序号列出每个查询模式的定义类型及其捕获名（缓存）
+        
+        每个顶层模式恰好有一个 @<def_type>.def 捕获，按出现顺序即为模式序号
+        """
+        cached = ASTParser._pattern_captures_cache.get(language)
+        if cached is None:
+            cached = [
+                (def_type, f'{def_type}.def', f'{def_type}.name', f'{def_type}.params', f'{def_type}.return')
+                for def_type in re.findall(r'@(\w+)\.def\b', self.QUERIES.get(language, ''))
+            ]
+            ASTParser._pattern_captures_cache[language] = cached
+        return cached
+    
+    def _function_bodies(self, tree) -> Tuple[List[int], List[int]]:
+        """找出所有最外层函数体的字节范围（函数体内部不再继续查找）
+        
+        Returns:
+            (起始字节列表, 结束字节列表)，按起始字节升序
+        """
+        bodies = []
+        stack = [tree.root_node]
+        while stack:
+            node = stack.pop()
+            for child in node.children:
+                if child.type in self.FUNCTION_NODE_TYPES:
+                    body = child.child_by_field_name('body')
+                    if body is not None:
+                        bodies.append((body.start_byte, body.end_byte))
+                        continue
+                if child.child_count:
+                    stack.append(child)
+        
+        bodies.sort()
+        return [start for start, _ in bodies], [end for _, end in bodies]
+    
+    @staticmethod
+    def _outside_bodies(def_entries: List[Tuple], body_starts: List[int], body_ends: List[int]) -> List[Tuple]:
+        """过滤掉起始位置落在函数体内的定义（嵌套函数/局部类等）"""
+        if not body_starts:
+            return def_entries
+        kept = []
+        for entry in def_entries:
+            start = entry[2].start_byte
+            index = bisect_right(body_starts, start) - 1
+            if index >= 0 and start < body_ends[index]:
+                continue
+            kept.append(entry)
+        return kept
+    
+    @staticmethod
+    def _node_key(node) -> Tuple[int, int, str]:
+        """节点键：同一棵树中(起止字节, 类型)可唯一标识节点"""
+        return (node.start_byte, node.end_byte, node.type)
+    
+    def _map_owner_defs(self, root, def_nodes: Dict, target_keys: Set) -> Dict:
+        """一次深度优先遍历，求每个目标节点的最近祖先定义节点
+        
+        Args:
+            root: 语法树根节点
+            def_nodes: {节点键: (def_type, def_node)}
+            target_keys: 需要查找归属的节点键（name/params/return捕获）
+            
+        Returns:
+            {目标节点键: (最近的定义节点键, {def_type: 该类型最近的定义节点键})}
+        """
+        owners = {}
+        stack = [(root, None, {})]
+        while stack:
+            node, nearest_key, nearest_by_type = stack.pop()
+            if not node.child_count:
+                continue
+            
+            # 当前节点是定义时，它成为子树内所有节点的最近定义
+            node_key = self._node_key(node)
+            owner = def_nodes.get(node_key)
+            if owner is not None:
+                nearest_key = node_key
+                nearest_by_type = {**nearest_by_type, owner[0]: node_key}
+            
+            for child in node.children:
+                child_key = self._node_key(child)
+                if child_key in target_keys:
+                    owners[child_key] = (nearest_key, nearest_by_type)
+                stack.append((child, nearest_key, nearest_by_type))
+        return owners
     
     def get_language_from_file(self, filepath: str) -> Optional[str]:
         """根据文件扩展名判断语言"""
         ext = Path(filepath).suffix.lower()
         return self.LANGUAGE_MAP.get(ext)
     
-    def parse_file(self, filepath: str) -> List[ASTNode]:
+    def parse_file(self, filepath: str, signatures_only: bool = False) -> List[ASTNode]:
         """
         解析文件并提取所有定义
         
         Args:
             filepath: 文件路径
+            signatures_only: 仅提取签名：函数体内的嵌套定义不再提取
             
         Returns:
             AST节点列表
@@ -259,228 +594,355 @@ class ASTParser:
         
         # 读取文件内容
         try:
-            with open(filepath, 'rb') as f:
-                source_code = f.read()
+            source_code = _read_file_bytes(filepath)
         except (FileNotFoundError, PermissionError):
             return []
         
+        # 没有查询模式的语言无需解析
+        if not self.QUERIES.get(language):
+            return []
+        
+        # 内容未变化的文件直接复用缓存的解析结果
+        cache_db = _get_ast_cache_db()
+        cache_path = os.path.abspath(filepath)
+        if signatures_only:
+            cache_path += '::signatures'
+        content_sha = hashlib.sha256(source_code).digest()
+        cached = cache_db.get(cache_path, content_sha)
+        if cached is not None:
+            return [ASTNode(**dict(item, file_path=filepath)) for item in cached]
+        
+        nodes = self._parse_source(filepath, source_code, language, parser, signatures_only)
+        if nodes is not None:
+            cache_db.put(cache_path, content_sha, [node.to_dict() for node in nodes])
+        return nodes or []
+    
+    def _parse_source(
+        self,
+        filepath: str,
+        source_code: bytes,
+        language: str,
+        parser,
+        signatures_only: bool = False
+    ) -> Optional[List[ASTNode]]:
+        """解析源码并提取定义（查询失败返回None，不写入缓存）"""
         # 解析为AST
         tree = parser.parse(source_code)
         
-        # 获取查询模式
-        query_str = self.QUERIES.get(language)
-        if not query_str:
-            return []
-        
-        # 执行查询
+        # 执行查询（查询按语言编译一次后复用）
+        # Query.matches直接按模式返回分组好的捕获；旧版绑定没有matches时退回扁平captures
         try:
-            from tree_sitter_languages import get_language
-            lang = get_language(language)
-            query = lang.query(query_str)
-            captures = query.captures(tree.root_node)
+            _, query = self._get_language_and_query(language)
+            if hasattr(query, 'matches'):
+                def_entries = self._definitions_from_matches(
+                    query.matches(tree.root_node), self._get_pattern_captures(language), language
+                )
+            else:
+                def_entries = self._definitions_from_captures(
+                    query.captures(tree.root_node), tree.root_node, language
+                )
         except Exception as e:
             print(f"[AST解析器] ⚠️ 查询失败 {filepath}: {e}")
             import traceback
             traceback.print_exc()
-            return []
+            return None
+        
+        # 仅签名模式：跳过函数体内的定义
+        # 不能排除函数体后用included_ranges重新解析：JS/TS等语法缺少函数体（含花括号）时
+        # 整段签名会被解析成ERROR节点，方法和顶层函数都会丢失
+        if signatures_only:
+            def_entries = self._outside_bodies(def_entries, *self._function_bodies(tree))
         
         # 提取节点信息
         nodes = []
-        source_lines = source_code.decode('utf-8').split('\n')
-        
-        # 按类型组织captures - 先建立.def节点到.name的映射
-        def_to_name = {}  # {def_node_id: (def_type, name, def_node)}
-        name_to_info = {}  # {(def_type, name): {params, return_type}}
-        
-        # 第一遍：收集所有节点信息
-        for node, capture_name in captures:
-            parts = capture_name.split('.')
-            def_type = parts[0]  # 'class', 'function', etc.
-            
-            if len(parts) == 2:
-                if parts[1] == 'def':
-                    # 完整定义节点 - 查找其中的name节点
-                    for child_node, child_capture in captures:
-                        if child_capture == f"{def_type}.name":
-                            # 检查name节点是否是def节点的后代
-                            temp = child_node
-                            while temp:
-                                if temp == node:
-                                    # 找到了，记录映射
-                                    name = child_node.text.decode('utf-8')
-                                    def_to_name[id(node)] = (def_type, name, node)
-                                    break
-                                temp = temp.parent
-                
-                elif parts[1] == 'params':
-                    # 参数列表 - 找到所属的name
-                    parent = node.parent
-                    while parent:
-                        if id(parent) in def_to_name:
-                            def_type_p, name_p, _ = def_to_name[id(parent)]
-                            key = (def_type_p, name_p)
-                            if key not in name_to_info:
-                                name_to_info[key] = {}
-                            name_to_info[key]['params'] = self._extract_params(node, language)
-                            break
-                        parent = parent.parent
-                
-                elif parts[1] == 'return':
-                    # 返回类型
-                    parent = node.parent
-                    while parent:
-                        if id(parent) in def_to_name:
-                            def_type_p, name_p, _ = def_to_name[id(parent)]
-                            key = (def_type_p, name_p)
-                            if key not in name_to_info:
-                                name_to_info[key] = {}
-                            name_to_info[key]['return_type'] = node.text.decode('utf-8')
-                            break
-                        parent = parent.parent
+        source_lines = _SourceLines(source_code)
         
         # 构建最终的definitions
+        # 同类型同名的定义只保留第一个
         definitions = {}
-        for def_node_id, (def_type, name, def_node) in def_to_name.items():
+        for def_type, name, def_node, params, return_type in def_entries:
             if def_type not in definitions:
                 definitions[def_type] = {}
             
             if name not in definitions[def_type]:
-                key = (def_type, name)
-                info = name_to_info.get(key, {})
-                
                 definitions[def_type][name] = {
                     'name': name,
                     'node': def_node,
                     'line': def_node.start_point[0],
                     'end_line': def_node.end_point[0],
-                    'params': info.get('params'),
-                    'return_type': info.get('return_type')
+                    'params': params,
+                    'return_type': return_type
                 }
         
+        # 转换前先按行号排序一次（稳定排序，同行保持原有顺序），之后按序生成ASTNode
+        ordered_items = [
+            (info['line'], def_type, name, info)
+            for def_type, items in definitions.items()
+            for name, info in items.items()
+        ]
+        ordered_items.sort(key=itemgetter(0))
+        
         # 转换为ASTNode
-        for def_type, items in definitions.items():
-            for name, info in items.items():
-                line_num = info['line'] + 1  # tree-sitter从0开始
-                end_line = info.get('end_line', line_num) + 1
-                
-                # 获取第一行内容
-                if line_num - 1 < len(source_lines):
-                    line_content = source_lines[line_num - 1].strip()
+        for _, def_type, name, info in ordered_items:
+            line_num = info['line'] + 1  # tree-sitter从0开始
+            end_line = info.get('end_line', line_num) + 1
+            
+            # 获取第一行内容：直接按定义节点的起始字节截取到行尾
+            def_start = info['node'].start_byte
+            head_end = source_code.find(b'\n', def_start)
+            if head_end == -1:
+                head_end = len(source_code)
+            line_content = source_code[def_start:head_end].decode('utf-8', errors='replace').strip()
+            
+            # 提取文档字符串（如果有）
+            docstring = self._extract_docstring(
+                source_lines, line_num, language
+            )
+            
+            nodes.append(ASTNode(
+                name=name,
+                type=def_type,
+                line_number=line_num,
+                end_line=end_line,
+                line_content=line_content,
+                file_path=filepath,
+                params=info.get('params'),
+                return_type=info.get('return_type'),
+                docstring=docstring
+            ))
+        
+        return nodes
+    
+    def _definitions_from_matches(
+        self,
+        matches,
+        pattern_captures: List[Tuple[str, str, str, str, str]],
+        language: str
+    ) -> List[Tuple[str, str, Any, Optional[List[str]], Optional[str]]]:
+        """从Query.matches的分组结果提取定义
+        
+        Returns:
+            [(def_type, name, def_node, params, return_type)]，按匹配顺序
+        """
+        entries = []
+        for pattern_index, captures in matches:
+            if pattern_index >= len(pattern_captures):
+                continue
+            def_type, def_capture, name_capture, params_capture, return_capture = pattern_captures[pattern_index]
+            def_node = self._first_node(captures.get(def_capture))
+            name_node = self._first_node(captures.get(name_capture))
+            if def_node is None or name_node is None:
+                continue
+            
+            params_node = self._first_node(captures.get(params_capture))
+            return_node = self._first_node(captures.get(return_capture))
+            entries.append((
+                def_type,
+                name_node.text.decode('utf-8'),
+                def_node,
+                self._extract_params(params_node, language) if params_node is not None else None,
+                return_node.text.decode('utf-8') if return_node is not None else None,
+            ))
+        return entries
+    
+    @staticmethod
+    def _first_node(captured):
+        """matches中同名捕获可能是节点列表，取第一个"""
+        if isinstance(captured, list):
+            return captured[0] if captured else None
+        return captured
+    
+    def _definitions_from_captures(
+        self,
+        captures,
+        root,
+        language: str
+    ) -> List[Tuple[str, str, Any, Optional[List[str]], Optional[str]]]:
+        """从扁平的captures列表还原定义（不支持Query.matches时使用）
+        
+        Returns:
+            [(def_type, name, def_node, params, return_type)]，按定义登记顺序
+        """
+        # 按捕获名分桶：{(def_type, tag): [节点, ...]}，后续各阶段只处理对应的桶，
+        # 与tree-sitter返回捕获的顺序无关
+        by_tag: Dict[Tuple[str, str], List[Any]] = {}
+        for node, capture_name in captures:
+            def_type, _, tag = capture_name.partition('.')
+            by_tag.setdefault((def_type, tag), []).append(node)
+        
+        # 第一步：登记所有.def定义节点
+        # 注意：tree-sitter每次访问parent都会返回新的Python包装对象，不能用id()标识节点，
+        # 这里以(起止字节, 节点类型)作为节点键
+        def_nodes = {}  # {节点键: (def_type, def_node)}
+        for (def_type, tag), tag_nodes in by_tag.items():
+            if tag == 'def':
+                for node in tag_nodes:
+                    def_nodes[self._node_key(node)] = (def_type, node)
+        
+        # 第二步：一次遍历求出每个name/params/return捕获的最近祖先定义
+        # 名称归属于最近的同类型定义节点，参数/返回类型归属于最近的定义节点
+        target_keys = {
+            self._node_key(node)
+            for (_, tag), tag_nodes in by_tag.items() if tag in ('name', 'params', 'return')
+            for node in tag_nodes
+        }
+        owners = self._map_owner_defs(root, def_nodes, target_keys)
+        
+        def_names = {}  # {定义节点键: 名称}
+        def_extras = {}  # {定义节点键: {params, return_type}}
+        for (def_type, tag), tag_nodes in by_tag.items():
+            if tag != 'name':
+                continue
+            for node in tag_nodes:
+                owner_key = owners.get(self._node_key(node), (None, {}))[1].get(def_type)
+                if owner_key is not None:
+                    def_names.setdefault(owner_key, node.text.decode('utf-8'))
+        
+        for (_, tag), tag_nodes in by_tag.items():
+            if tag not in ('params', 'return'):
+                continue
+            for node in tag_nodes:
+                owner_key = owners.get(self._node_key(node), (None, {}))[0]
+                if owner_key is None:
+                    continue
+                if tag == 'params':
+                    def_extras.setdefault(owner_key, {})['params'] = self._extract_params(node, language)
                 else:
-                    line_content = ""
-                
-                # 提取文档字符串（如果有）
-                docstring = self._extract_docstring(
-                    source_lines, line_num, language
-                )
-                
-                nodes.append(ASTNode(
-                    name=name,
-                    type=def_type,
-                    line_number=line_num,
-                    end_line=end_line,
-                    line_content=line_content,
-                    file_path=filepath,
-                    params=info.get('params'),
-                    return_type=info.get('return_type'),
-                    docstring=docstring
-                ))
-        
-        return sorted(nodes, key=lambda x: x.line_number)
-    
-    def _find_parent_name(self, node, captures) -> Optional[str]:
-        """查找父节点的名称"""
-        # 简化实现：向上查找最近的定义名称
-        parent = node.parent
-        while parent:
-            for n, capture_name in captures:
-                if n == parent and '.name' in capture_name:
-                    return n.text.decode('utf-8')
-            parent = parent.parent
-        return None
+                    def_extras.setdefault(owner_key, {})['return_type'] = node.text.decode('utf-8')
+        
+        entries = []
+        for def_key, (def_type, def_node) in def_nodes.items():
+            name = def_names.get(def_key)
+            if name is None:
+                continue
+            extras = def_extras.get(def_key, {})
+            entries.append((def_type, name, def_node, extras.get('params'), extras.get('return_type')))
+        return entries
     
     def _extract_params(self, param_node, language: str) -> List[str]:
-        """提取参数列表"""
-        params = []
-        param_text = param_node.text.decode('utf-8')
+        """提取参数列表
         
-        # 简单解析（去除括号和类型注解）
-        if language == 'python':
-            # Python: (self, name: str, age: int = 0)
-            param_text = param_text.strip('()')
-            for param in param_text.split(','):
-                param = param.strip()
-                if ':' in param:
-                    param = param.split(':')[0].strip()
-                if '=' in param:
-                    param = param.split('=')[0].strip()
-                if param and param != 'self':
-                    params.append(param)
+        直接在参数节点的字节上扫描一遍：按顶层逗号切分（跳过嵌套括号和字符串字面量内的逗号），
+        Python/JS/TS在原位截掉类型注解和默认值，只解码最终的参数名
+        """
+        text = param_node.text
+        cut_annotation = language in ('python', 'javascript', 'typescript')
+        if language in _ANGLE_GENERIC_LANGUAGES:
+            open_bytes, close_bytes = _GENERIC_PARAM_OPEN, _GENERIC_PARAM_CLOSE
+        else:
+            open_bytes, close_bytes = _PARAM_OPEN, _PARAM_CLOSE
         
-        elif language in ['javascript', 'typescript']:
-            # JS/TS: (name, age = 0)
-            param_text = param_text.strip('()')
-            for param in param_text.split(','):
-                param = param.strip()
-                if ':' in param:
-                    param = param.split(':')[0].strip()
-                if '=' in param:
-                    param = param.split('=')[0].strip()
-                if param:
-                    params.append(param)
+        # 去除外层括号，如 (self, name: str, age: int = 0)
+        lo, hi = 0, len(text)
+        while lo < hi and text[lo] == _LPAREN:
+            lo += 1
+        while hi > lo and text[hi - 1] == _RPAREN:
+            hi -= 1
         
-        else:
-            # 其他语言：简单分割
-            param_text = param_text.strip('()')
-            params = [p.strip() for p in param_text.split(',') if p.strip()]
+        # 记录顶层逗号分隔出的 (start, end) 切片
+        slices = []
+        depth = 0
+        quote = None
+        seg_start = lo
+        i = lo
+        while i < hi:
+            byte = text[i]
+            if quote is not None:
+                # 字符串内：跳过转义字符，遇到同种引号结束
+                if byte == _BACKSLASH:
+                    i += 1
+                elif byte == quote:
+                    quote = None
+            elif byte in _PARAM_QUOTES:
+                quote = byte
+            elif byte in open_bytes:
+                depth += 1
+            elif byte in close_bytes:
+                if depth > 0:
+                    depth -= 1
+            elif byte == _COMMA and depth == 0:
+                slices.append((seg_start, i))
+                seg_start = i + 1
+            i += 1
+        slices.append((seg_start, hi))
+        
+        params = []
+        for start, end in slices:
+            if cut_annotation:
+                # Python: name: str = 0 / JS/TS: name = 0，截掉第一个 : 或 = 之后的内容
+                colon = text.find(b':', start, end)
+                equal = text.find(b'=', start, end)
+                if colon != -1:
+                    end = colon
+                if equal != -1 and equal < end:
+                    end = equal
+            while start < end and text[start] in _PARAM_WS:
+                start += 1
+            while end > start and text[end - 1] in _PARAM_WS:
+                end -= 1
+            if start == end:
+                continue
+            param = text[start:end].decode('utf-8', errors='replace')
+            if language == 'python' and param == 'self':
+                continue
+            params.append(param)
         
         return params
     
     def _extract_docstring(
         self, 
-        lines: List[str], 
+        lines: "_SourceLines", 
         line_num: int, 
         language: str
     ) -> Optional[str]:
-        """提取文档字符串"""
+        """提取文档字符串
+        
+        逐行按字节比较引号/注释标记，遇到结束标记立即返回，只在最后解码一次
+        """
         if language == 'python':
             # Python docstring：函数下一行的三引号字符串
             if line_num < len(lines):
-                next_line = lines[line_num].strip()
-                if next_line.startswith('"""') or next_line.startswith("'''"):
+                next_line = lines.raw(line_num).strip()
+                if next_line.startswith((b'"""', b"'''")):
                     # 单行docstring
-                    if next_line.endswith('"""') or next_line.endswith("'''"):
-                        return next_line.strip('"\' ')
+                    if next_line.endswith((b'"""', b"'''")):
+                        return next_line.strip(b'"\' ').decode('utf-8', errors='replace')
                     # 多行docstring
-                    docstring_lines = [next_line.strip('"\' ')]
+                    docstring_lines = [next_line.strip(b'"\' ')]
                     for i in range(line_num + 1, min(line_num + 10, len(lines))):
-                        line = lines[i].strip()
-                        if line.endswith('"""') or line.endswith("'''"):
-                            docstring_lines.append(line.strip('"\' '))
+                        line = lines.raw(i).strip()
+                        if line.endswith((b'"""', b"'''")):
+                            docstring_lines.append(line.strip(b'"\' '))
                             break
                         docstring_lines.append(line)
-                    return ' '.join(docstring_lines)
+                    return b' '.join(docstring_lines).decode('utf-8', errors='replace')
         
         elif language in ['javascript', 'typescript']:
-            # JSDoc: 函数上方的 /** */ 注释
+            # JSDoc: 函数上方的 /** */ 注释，从定义上一行向上扫描
             if line_num >= 2:
-                prev_line = lines[line_num - 2].strip()
-                if prev_line.startswith('/**'):
+                prev_line = lines.raw(line_num - 2).strip()
+                if prev_line.startswith(b'/**'):
                     doc_lines = []
                     for i in range(line_num - 2, max(0, line_num - 12), -1):
-                        line = lines[i].strip()
-                        if line.startswith('/**'):
+                        line = lines.raw(i).strip()
+                        if line.startswith(b'/**'):
                             break
-                        if line.startswith('*'):
-                            doc_lines.insert(0, line.lstrip('* '))
-                    return ' '.join(doc_lines) if doc_lines else None
+                        if line.startswith(b'*'):
+                            doc_lines.append(line.lstrip(b'* '))
+                    doc_lines.reverse()
+                    return b' '.join(doc_lines).decode('utf-8', errors='replace') if doc_lines else None
         
         return None
     
+    def parse_file_columns(self, filepath: str, signatures_only: bool = False) -> ASTNodeTable:
+        """解析文件并以列式表返回所有定义（参数同parse_file）"""
+        return ASTNodeTable.from_nodes(self.parse_file(filepath, signatures_only=signatures_only))
+    
     def parse_directory(
         self, 
         directory: str, 
-        max_files: int = 100
+        max_files: int = 100,
+        signatures_only: bool = False
     ) -> Dict[str, List[ASTNode]]:
         """
         解析目录中的所有文件
@@ -488,67 +950,117 @@ class ASTParser:
         Args:
             directory: 目录路径
             max_files: 最大文件数
+            signatures_only: 仅提取签名（见parse_file）
             
         Returns:
             {文件路径: [AST节点列表]}
         """
         results = {}
-        count = 0
+        # 文件列表按目录mtime复用；文件内容是否变化由AST缓存按内容哈希判断
+        candidates = iter([
+            os.path.join(directory, relpath) for relpath in self._list_source_files(directory)
+        ])
+        
+        # 文件解析相互独立，用线程池并行（tree-sitter解析在C层执行）；
+        # 按批提交，凑够max_files个有结果的文件即停止，结果保持遍历顺序
+        max_workers = os.cpu_count() or 1
+        parse = partial(self.parse_file, signatures_only=signatures_only)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while len(results) < max_files:
+                batch = list(islice(candidates, max(max_files - len(results), max_workers)))
+                if not batch:
+                    break
+                for filepath, nodes in zip(batch, executor.map(parse, batch)):
+                    if nodes and len(results) < max_files:
+                        results[os.path.relpath(filepath, directory)] = nodes
         
-        for root, dirs, files in os.walk(directory):
+        return results
+    
+    def _list_source_files(self, directory: str) -> List[str]:
+        """列出目录下支持解析的源文件（相对路径，按os.walk顺序），目录结构未变化时复用缓存"""
+        abs_directory = os.path.abspath(directory)
+        with ASTParser._dir_listing_lock:
+            cached = ASTParser._dir_listing_cache.get(abs_directory)
+        if cached is not None and self._dir_mtimes_unchanged(cached[0]):
+            return cached[1]
+        
+        dir_mtimes = {}
+        relpaths = []
+        for root, dirs, files in os.walk(abs_directory):
             # 过滤忽略目录
             dirs[:] = [d for d in dirs if d not in {
                 'node_modules', '__pycache__', '.git', 'venv', 
                 'dist', 'build', 'target'
             }]
+            try:
+                dir_mtimes[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                continue
             
             for file in files:
-                if count >= max_files:
-                    break
-                
                 filepath = os.path.join(root, file)
                 if self.get_language_from_file(filepath):
-                    nodes = self.parse_file(filepath)
-                    if nodes:
-                        rel_path = os.path.relpath(filepath, directory)
-                        results[rel_path] = nodes
-                        count += 1
+                    relpaths.append(os.path.relpath(filepath, abs_directory))
         
-        return results
+        with ASTParser._dir_listing_lock:
+            ASTParser._dir_listing_cache[abs_directory] = (dir_mtimes, relpaths)
+        return relpaths
+    
+    @staticmethod
+    def _dir_mtimes_unchanged(dir_mtimes: Dict[str, int]) -> bool:
+        """检查缓存时记录的各目录mtime是否都未变化"""
+        for path, mtime_ns in dir_mtimes.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
     
     def generate_llm_context(
         self, 
-        nodes: List[ASTNode], 
+        nodes: Union[List[ASTNode], ASTNodeTable], 
         include_docstring: bool = True
     ) -> str:
         """
         生成适合LLM理解的上下文摘要
         
         Args:
-            nodes: AST节点列表
+            nodes: AST节点列表或列式表
             include_docstring: 是否包含文档字符串
             
         Returns:
             格式化的上下文字符串
         """
+        table = nodes if isinstance(nodes, ASTNodeTable) else ASTNodeTable.from_nodes(nodes)
         lines = []
         current_class = None
         
-        for node in nodes:
+        # 按列遍历，摘要格式与ASTNode.to_summary一致
+        for node_type, name, params, return_type, parent, docstring in zip(
+            table.types, table.names, table.params,
+            table.return_types, table.parents, table.docstrings
+        ):
             # 类定义
-            if node.type in ['class', 'interface', 'struct']:
-                current_class = node.name
-                lines.append(f"\n{node.type.upper()} {node.name}:")
-                if include_docstring and node.docstring:
-                    lines.append(f"  Doc: {node.docstring}")
+            if node_type in ('class', 'interface', 'struct'):
+                current_class = name
+                lines.append(f"\n{node_type.upper()} {name}:")
+                if include_docstring and docstring:
+                    lines.append(f"  Doc: {docstring}")
             
             # 函数/方法
-            elif node.type in ['function', 'method']:
+            elif node_type in ('function', 'method'):
                 indent = "  " if current_class else ""
-                summary = node.to_summary()
+                summary = f"{node_type} {name}"
+                if params:
+                    summary += f"({', '.join(params)})"
+                if return_type:
+                    summary += f" -> {return_type}"
+                if parent:
+                    summary += f" [in {parent}]"
                 lines.append(f"{indent}{summary}")
-                if include_docstring and node.docstring:
-                    lines.append(f"{indent}  Doc: {node.docstring}")
+                if include_docstring and docstring:
+                    lines.append(f"{indent}  Doc: {docstring}")
         
         return "\n".join(lines)
 
@@ -565,10 +1077,10 @@ class CodeParser:
             from .code_parser import CodeParser as RegexCodeParser
             self.regex_parser = RegexCodeParser()
     
-    def parse_file(self, filepath: str):
-        """解析文件（优先AST）"""
+    def parse_file(self, filepath: str, signatures_only: bool = False):
+        """解析文件（优先AST；正则版本本身只匹配签名行，忽略signatures_only）"""
         if self.ast_parser.available:
-            nodes = self.ast_parser.parse_file(filepath)
+            nodes = self.ast_parser.parse_file(filepath, signatures_only=signatures_only)
             # 转换为旧格式（向后兼容）
             from .code_parser import CodeDefinition
             return [
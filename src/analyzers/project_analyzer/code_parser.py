@@ -1,8 +1,17 @@
 import re
+import threading
+from bisect import bisect_right
 from pathlib import Path
 from typing import List, Tuple, Optional, Set, Dict
 from dataclasses import dataclass
 
+# Hyperscan多模式扫描（可选依赖）
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
 @dataclass
 class CodeDefinition:
     """代码定义信息"""
@@ -103,24 +112,236 @@ class CodeParser:
         
         definitions = []
         try:
+            # 一次读取全文，直接在整个文本上匹配，不再切分为行列表
             with open(filepath, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+                content = f.read()
         except (UnicodeDecodeError, FileNotFoundError):
             return []
         
-        patterns = self.PATTERNS[language]
+        union_pattern, group_info = _UNION_PATTERNS[language]
+        
+        # Hyperscan可用时只在预筛选出的行首尝试匹配，否则按模式开头的关键字预筛选，
+        # 两者都不可用时对全文finditer一遍；
+        # 合并模式锚定行首且不跨行，命中的分组即为该行按顺序第一个匹配的模式
+        candidate_starts = _hyperscan_candidate_starts(language, content)
+        if candidate_starts is None:
+            candidate_starts = _keyword_candidate_starts(language, content)
+        if candidate_starts is None:
+            matches = union_pattern.finditer(content)
+        else:
+            matches = filter(None, (union_pattern.match(content, pos) for pos in candidate_starts))
         
-        for line_num, line in enumerate(lines, 1):
-            for pattern, def_type in patterns:
-                match = re.search(pattern, line)
-                if match:
-                    definitions.append(CodeDefinition(
-                        name=match.group(1),
-                        type=def_type,
-                        line_number=line_num,
-                        line_content=line.strip(),
-                        file_path=filepath
-                    ))
-                    break
+        # 匹配按位置递增，行号增量统计换行数
+        line_num = 1
+        counted_pos = 0
+        for match in matches:
+            line_start = match.start()
+            line_num += content.count('\n', counted_pos, line_start)
+            counted_pos = line_start
+            line_end = content.find('\n', line_start)
+            if line_end == -1:
+                line_end = len(content)
+            
+            name_group, def_type = group_info[match.lastgroup]
+            definitions.append(CodeDefinition(
+                name=match.group(name_group),
+                type=def_type,
+                line_number=line_num,
+                line_content=content[line_start:line_end].strip(),
+                file_path=filepath
+            ))
         
         return definitions
+
+
+def _line_local(pattern: str) -> str:
+    """把按单行编写的模式改写为不会跨越换行的形式
+    
+    在整个文本上匹配时 \\s 和 [^...] 可能匹配换行符，这里分别改为不含换行的等价写法
+    """
+    out = []
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            escape = pattern[i:i + 2]
+            if escape == r'\s':
+                out.append(r' \t\r\f\v' if in_class else r'[^\S\n]')
+            else:
+                out.append(escape)
+            i += 2
+            continue
+        if not in_class and char == '[':
+            in_class = True
+            if pattern.startswith('[^', i):
+                out.append(r'[^\n')
+                i += 2
+                continue
+        elif in_class and char == ']':
+            in_class = False
+        out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+def _build_union_pattern(patterns: List[Tuple[str, str]]) -> Tuple[re.Pattern, Dict[str, Tuple[int, str]]]:
+    """将一种语言的全部定义模式合并为一个预编译正则
+    
+    每个模式去掉行首的^后包在命名分组 g{i} 中按原顺序交替，外层统一以(?m)^锚定行首：
+    同一行首上交替按顺序尝试，因此命中结果与逐个re.search取第一个匹配一致；
+    ^只在外层检查一次，finditer扫描全文时非行首位置可以快速跳过。
+    
+    Returns:
+        (合并后的正则, {分组名: (名称所在分组序号, 定义类型)})
+    """
+    alternatives = []
+    for i, (pattern, _) in enumerate(patterns):
+        if not pattern.startswith('^'):
+            raise ValueError(f"定义模式必须以^锚定行首: {pattern}")
+        alternatives.append(f'(?P<g{i}>{_line_local(pattern[1:])})')
+    union_pattern = re.compile('(?m)^(?:' + '|'.join(alternatives) + ')')
+    group_info = {}
+    for i, (_, def_type) in enumerate(patterns):
+        # 原模式的第一个捕获组（定义名）紧跟在外层命名分组之后
+        group_info[f'g{i}'] = (union_pattern.groupindex[f'g{i}'] + 1, def_type)
+    return union_pattern, group_info
+
+
+# 各语言的合并模式（模块加载时编译一次）
+_UNION_PATTERNS = {
+    language: _build_union_pattern(patterns)
+    for language, patterns in CodeParser.PATTERNS.items()
+}
+
+
+# 模式开头的字面关键字：^ 后可选的 \s+ / \s* 缩进，紧跟一个不带量词的关键字
+_KEYWORD_PREFIX_RE = re.compile(r'\^(\\s[+*])?([A-Za-z_]\w*)(?![\w?*+{])')
+
+
+def _build_keyword_prefilter(patterns: List[Tuple[str, str]]) -> Optional[Tuple[Set[str], Set[str]]]:
+    """提取一种语言全部模式的开头关键字，用于正则匹配前的快速预筛选
+    
+    只有每个模式都以字面关键字开头时才能预筛选（如C++的 ^\w+ 函数模式则不行）。
+    
+    Returns:
+        (可位于行首的关键字, 可位于缩进之后的关键字)，无法预筛选时返回None
+    """
+    col0_keywords, indented_keywords = set(), set()
+    for pattern, _ in patterns:
+        if '|' in pattern:
+            return None
+        match = _KEYWORD_PREFIX_RE.match(pattern)
+        if not match:
+            return None
+        indent, keyword = match.groups()
+        if indent != r'\s+':
+            col0_keywords.add(keyword)
+        if indent:
+            indented_keywords.add(keyword)
+    return col0_keywords, indented_keywords
+
+
+# 各语言的关键字预筛选表（None表示该语言不做预筛选）
+_KEYWORD_PREFILTERS = {
+    language: _build_keyword_prefilter(patterns)
+    for language, patterns in CodeParser.PATTERNS.items()
+}
+
+
+def _keyword_candidate_starts(language: str, content: str) -> Optional[List[int]]:
+    """按模式开头的关键字预筛选可能存在定义的行的起始位置（升序）
+    
+    关键字出现在行首（或仅有空白缩进之后）是模式匹配的必要条件，用str.find在C层查找关键字，
+    不在每个行首运行正则；最终仍由合并正则确认。该语言无法预筛选时返回None。
+    """
+    prefilter = _KEYWORD_PREFILTERS.get(language)
+    if prefilter is None:
+        return None
+    col0_keywords, indented_keywords = prefilter
+    
+    find = content.find
+    rfind = content.rfind
+    starts = set()
+    for keyword in col0_keywords | indented_keywords:
+        at_col0 = keyword in col0_keywords
+        after_indent = keyword in indented_keywords
+        pos = find(keyword)
+        while pos != -1:
+            line_start = rfind('\n', 0, pos) + 1
+            if line_start == pos:
+                if at_col0:
+                    starts.add(line_start)
+            elif after_indent and content[line_start:pos].isspace():
+                starts.add(line_start)
+            pos = find(keyword, pos + 1)
+    return sorted(starts)
+
+
+# Hyperscan数据库（按语言懒编译；编译失败的语言记为None，回退到关键字预筛选或全文正则）
+_HYPERSCAN_DBS: Dict[str, Optional[Tuple[object, threading.Lock]]] = {}
+
+
+def _get_hyperscan_db(language: str):
+    """获取指定语言的Hyperscan数据库及其扫描锁（同一数据库的scratch不能并发使用）"""
+    if language not in _HYPERSCAN_DBS:
+        patterns = CodeParser.PATTERNS[language]
+        try:
+            db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+            # 不使用HS_FLAG_SOM_LEFTMOST：它与UTF8|UCP组合时较大的模式集（java/cpp/csharp）
+            # 会报"Pattern is too large"；命中所在行由结束位置确定
+            flags = hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+            # 与合并正则一样使用不跨行的写法：否则 \s 可以匹配换行，
+            # 命中会跨到定义行之后，按结束位置换算出的行号不再是定义所在的行
+            db.compile(
+                expressions=[('^' + _line_local(pattern[1:])).encode('utf-8') for pattern, _ in patterns],
+                ids=list(range(len(patterns))),
+                elements=len(patterns),
+                flags=[flags] * len(patterns),
+            )
+            _HYPERSCAN_DBS[language] = (db, threading.Lock())
+        except Exception as e:
+            print(f"[代码解析] ⚠️ Hyperscan编译 {language} 模式失败，改用关键字预筛选或全文正则匹配: {e}")
+            _HYPERSCAN_DBS[language] = None
+    return _HYPERSCAN_DBS[language]
+
+
+def _offsets_after(text, newline) -> List[int]:
+    """返回每一行的起始偏移（第0行为0，其后为每个换行符之后的位置）"""
+    starts = [0]
+    find = text.find
+    pos = find(newline)
+    while pos != -1:
+        starts.append(pos + 1)
+        pos = find(newline, pos + 1)
+    return starts
+
+
+def _hyperscan_candidate_starts(language: str, content: str) -> Optional[List[int]]:
+    """用Hyperscan整文件扫描一遍，返回可能存在定义的行的起始位置（字符偏移，升序）
+    
+    Hyperscan只作为预筛选：所有模式都以^锚定行首且只在单行内匹配、不会匹配空串，
+    命中的最后一个字节（end - 1）一定落在定义所在的行；
+    最终仍由合并正则在这些行首确认，结果与全文匹配完全一致。
+    Hyperscan不可用时返回None。
+    """
+    if not HYPERSCAN_AVAILABLE:
+        return None
+    db_entry = _get_hyperscan_db(language)
+    if db_entry is None:
+        return None
+    db, scan_lock = db_entry
+    
+    # Hyperscan按UTF-8字节报告位置，借助行号在字节偏移与字符偏移之间换算
+    encoded = content.encode('utf-8')
+    byte_starts = _offsets_after(encoded, b'\n')
+    hit_lines = set()
+    
+    def on_match(pattern_id, start, end, flags, context):
+        hit_lines.add(bisect_right(byte_starts, end - 1) - 1)
+    
+    with scan_lock:
+        db.scan(encoded, match_event_handler=on_match)
+    
+    char_starts = _offsets_after(content, '\n')
+    return [char_starts[line_index] for line_index in sorted(hit_lines)]
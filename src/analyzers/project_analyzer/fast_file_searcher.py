@@ -5,13 +5,36 @@
 
 import os
 import re
+import asyncio
+import fnmatch
+import functools
 import subprocess
 import json
-from typing import List, Tuple, Optional, Set, Dict
+import multiprocessing
+import threading
+from typing import Callable, Iterable, List, Literal, Tuple, Optional, Set, Dict, Union
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from .file_enumerator import iter_files
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from itertools import repeat
 import time
 import shutil
+import atexit
+import tempfile
+from collections import OrderedDict
+
+# 正则语法解析器（用于提取必需的字面量；Python 3.11起模块名为re._parser）
+try:
+    from re import _parser as _sre_parse
+except ImportError:
+    import sre_parse as _sre_parse
+
+# 高性能JSON解析（可选依赖，用于解析ripgrep的JSON输出）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 DEFAULT_IGNORE_DIRS = {
     "node_modules", "__pycache__", ".git", ".venv", "venv", "env",
@@ -19,6 +42,485 @@ DEFAULT_IGNORE_DIRS = {
     "vendor", ".pytest_cache", ".mypy_cache", "coverage"
 }
 
+
+@functools.lru_cache(maxsize=256)
+def _compile(regex: str, flags: int = 0) -> re.Pattern:
+    """编译正则（LRU缓存，批量搜索反复使用相同模式时不重复编译）"""
+    return re.compile(regex, flags)
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_file_filter(file_pattern: str) -> Optional[Callable[[str], bool]]:
+    """把逗号分隔的文件模式编译为一个文件名过滤函数，每个文件只需判断一次；"*"返回None表示不过滤
+    
+    全部是"*.ext"形式时直接用str.endswith判断后缀，否则合并为一个正则。
+    """
+    if file_pattern == "*":
+        return None
+    patterns = [pat.strip() for pat in file_pattern.split(',')]
+    suffixes = tuple(pat[1:] for pat in patterns)
+    if all(pat.startswith('*') for pat in patterns) and not any(
+        char in suffix for suffix in suffixes for char in '*?['
+    ):
+        return lambda name: name.endswith(suffixes)
+    regex = re.compile('|'.join(fnmatch.translate(pat) for pat in patterns))
+    return lambda name: regex.match(name) is not None
+
+
+@functools.lru_cache(maxsize=256)
+def _required_literal(regex: str) -> Optional[str]:
+    """提取正则的任何匹配都必须包含的最长字面量子串
+    
+    文件中找不到该子串时正则不可能命中，可以用str的子串查找（C实现）先跳过整个文件。
+    忽略大小写、无法解析或没有必需字面量时返回None。
+    """
+    try:
+        parsed = _sre_parse.parse(regex)
+    except Exception:
+        return None
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    
+    runs = []
+    _collect_literal_runs(parsed, runs)
+    return max(runs, key=len, default='') or None
+
+
+def _collect_literal_runs(items, runs: List[str]):
+    """收集顺序上必须出现的连续字面量（分支、可选重复、断言内的内容不是必需的）"""
+    current = []
+    for op, av in items:
+        if op is _sre_parse.LITERAL:
+            current.append(chr(av))
+            continue
+        runs.append(''.join(current))
+        current = []
+        if op is _sre_parse.SUBPATTERN:
+            _, add_flags, _, sub_pattern = av
+            if not add_flags & re.IGNORECASE:
+                _collect_literal_runs(sub_pattern, runs)
+        elif op in (_sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT) and av[0] >= 1:
+            _collect_literal_runs(av[2], runs)
+    runs.append(''.join(current))
+
+
+# 字符类中不会匹配换行符 / 一定匹配换行符的类别（\d \w \S 与 \D \s \W）
+_NEWLINE_FREE_CATEGORIES = frozenset({
+    _sre_parse.CATEGORY_DIGIT, _sre_parse.CATEGORY_WORD, _sre_parse.CATEGORY_NOT_SPACE,
+})
+_NEWLINE_CATEGORIES = frozenset({
+    _sre_parse.CATEGORY_NOT_DIGIT, _sre_parse.CATEGORY_NOT_WORD, _sre_parse.CATEGORY_SPACE,
+})
+
+# 只在单行内判断、与整串边界无关的位置断言（^ $ \b \B）；\A \Z 依赖整串边界
+_LINE_LOCAL_AT_CODES = frozenset({
+    _sre_parse.AT_BEGINNING, _sre_parse.AT_BEGINNING_LINE, _sre_parse.AT_END,
+    _sre_parse.AT_END_LINE, _sre_parse.AT_BOUNDARY, _sre_parse.AT_NON_BOUNDARY,
+})
+
+# 子模式列表位于av[2]的重复节点（POSSESSIVE_REPEAT为Python 3.11新增）
+_REPEAT_OPS = tuple(
+    op for op in (
+        _sre_parse.MAX_REPEAT, _sre_parse.MIN_REPEAT, getattr(_sre_parse, 'POSSESSIVE_REPEAT', None),
+    ) if op is not None
+)
+_ATOMIC_GROUP = getattr(_sre_parse, 'ATOMIC_GROUP', None)
+
+
+@functools.lru_cache(maxsize=256)
+def _is_line_local(regex: str) -> bool:
+    """判断正则是否只会在单行内匹配（可以安全地在全文上搜索）
+    
+    按解析后的语法树判断：任何可能匹配换行符的节点（含DOTALL下的.、包含\n的字符类/范围、
+    取反字符）或依赖整串边界的断言都视为跨行；无法解析或遇到不认识的节点时同样按跨行处理，
+    退回逐行匹配
+    """
+    try:
+        parsed = _sre_parse.parse(regex)
+    except Exception:
+        return False
+    return _items_line_local(parsed, bool(parsed.state.flags & re.DOTALL))
+
+
+def _items_line_local(items, dotall: bool) -> bool:
+    """递归检查语法树节点是否都不会匹配换行符"""
+    for op, av in items:
+        if op is _sre_parse.LITERAL:
+            if av == 0x0A:
+                return False
+        elif op is _sre_parse.NOT_LITERAL:
+            if av != 0x0A:
+                return False
+        elif op is _sre_parse.ANY:
+            if dotall:
+                return False
+        elif op is _sre_parse.IN:
+            if _class_matches_newline(av) is not False:
+                return False
+        elif op is _sre_parse.AT:
+            if av not in _LINE_LOCAL_AT_CODES:
+                return False
+        elif op is _sre_parse.SUBPATTERN:
+            _, add_flags, del_flags, sub_pattern = av
+            sub_dotall = (dotall or bool(add_flags & re.DOTALL)) and not del_flags & re.DOTALL
+            if not _items_line_local(sub_pattern, sub_dotall):
+                return False
+        elif op in _REPEAT_OPS:
+            if not _items_line_local(av[2], dotall):
+                return False
+        elif op is _sre_parse.BRANCH:
+            if not all(_items_line_local(branch, dotall) for branch in av[1]):
+                return False
+        elif op in (_sre_parse.ASSERT, _sre_parse.ASSERT_NOT):
+            if not _items_line_local(av[1], dotall):
+                return False
+        elif op is _sre_parse.GROUPREF_EXISTS:
+            _, yes_branch, no_branch = av
+            if not _items_line_local(yes_branch, dotall):
+                return False
+            if no_branch is not None and not _items_line_local(no_branch, dotall):
+                return False
+        elif _ATOMIC_GROUP is not None and op is _ATOMIC_GROUP:
+            if not _items_line_local(av, dotall):
+                return False
+        elif op is not _sre_parse.GROUPREF:
+            # 反向引用的内容已在对应分组中检查；其余不认识的节点按跨行处理
+            return False
+    return True
+
+
+def _class_matches_newline(items) -> Optional[bool]:
+    """判断字符类是否匹配换行符，遇到无法判断的成员时返回None"""
+    negate = False
+    hit = False
+    for op, av in items:
+        if op is _sre_parse.NEGATE:
+            negate = True
+        elif op is _sre_parse.LITERAL:
+            hit = hit or av == 0x0A
+        elif op is _sre_parse.RANGE:
+            hit = hit or av[0] <= 0x0A <= av[1]
+        elif op is _sre_parse.CATEGORY and av in _NEWLINE_CATEGORIES:
+            hit = True
+        elif op is not _sre_parse.CATEGORY or av not in _NEWLINE_FREE_CATEGORIES:
+            return None
+    return hit != negate
+
+
+def _build_match(lines_before: List[str], line: str, lines_after: List[str], line_number: int) -> Dict:
+    """构造一条匹配结果"""
+    return {
+        'line_number': line_number,
+        'line': line,
+        'text': line,
+        'before': lines_before,
+        'after': lines_after
+    }
+
+
+def _match_lines(content: str, regex: str, limit: int, context_lines: int) -> List[Dict]:
+    """查找文件文本中的匹配行，结果与逐行 pattern.search(line) 一致
+    
+    只会在单行内匹配的正则直接在全文上搜索（^/$按行匹配），命中后按换行符定位
+    所在行和上下文，不切分行列表；其余正则只对包含必需字面量的行逐行匹配，
+    没有必需字面量时才按行切分全文。每行最多记一次匹配。
+    
+    Returns:
+        匹配项列表（最多limit个）
+    """
+    # 必需的字面量不在文件中时直接跳过，不运行正则
+    literal = _required_literal(regex)
+    if literal is not None and literal not in content:
+        return []
+    
+    if not _is_line_local(regex):
+        if literal is not None:
+            return _match_literal_lines(content, _compile(regex), literal, limit, context_lines)
+        return _match_lines_per_line(content, _compile(regex), limit, context_lines)
+    
+    pattern = _compile(regex, re.MULTILINE)
+    matches = []
+    length = len(content)
+    pos = 0
+    line_num = 1
+    counted_pos = 0
+    
+    while len(matches) < limit and pos < length:
+        match = pattern.search(content, pos)
+        if match is None:
+            break
+        
+        # 定位命中位置所在的行 [line_start, line_end)
+        start = match.start()
+        line_start = content.rfind('\n', 0, start) + 1
+        if line_start >= length:
+            break  # 文件末尾换行之后不再有行
+        line_end = content.find('\n', start)
+        if line_end == -1:
+            line_end = length
+        
+        line_num += content.count('\n', counted_pos, line_start)
+        counted_pos = line_start
+        
+        matches.append(_build_line_match(content, line_start, line_end, line_num, context_lines))
+        pos = line_end + 1
+    
+    return matches
+
+
+def _match_literal_lines(
+    content: str,
+    pattern: re.Pattern,
+    literal: str,
+    limit: int,
+    context_lines: int
+) -> List[Dict]:
+    """逐行匹配，但只检查包含必需字面量的行（用子串查找定位候选行，不切分全文）"""
+    matches = []
+    length = len(content)
+    pos = 0
+    line_num = 1
+    counted_pos = 0
+    
+    while len(matches) < limit:
+        hit = content.find(literal, pos)
+        if hit == -1:
+            break
+        
+        # 候选行 [line_start, line_end)，逐行匹配时行保留换行符（与readlines一致）
+        line_start = content.rfind('\n', 0, hit) + 1
+        line_end = content.find('\n', hit)
+        if line_end == -1:
+            line_end = length
+        
+        if pattern.search(content[line_start:line_end + 1]):
+            line_num += content.count('\n', counted_pos, line_start)
+            counted_pos = line_start
+            matches.append(_build_line_match(content, line_start, line_end, line_num, context_lines))
+        pos = line_end + 1
+    
+    return matches
+
+
+def _build_line_match(content: str, line_start: int, line_end: int, line_num: int, context_lines: int) -> Dict:
+    """按换行符向前后查找上下文行，构造 [line_start, line_end) 这一行的匹配结果"""
+    length = len(content)
+    
+    before = []
+    before_end = line_start - 1
+    while len(before) < context_lines and before_end >= 0:
+        before_start = content.rfind('\n', 0, before_end) + 1
+        before.append(content[before_start:before_end].rstrip())
+        before_end = before_start - 1
+    before.reverse()
+    
+    after = []
+    after_start = line_end + 1
+    while len(after) < context_lines and after_start < length:
+        after_end = content.find('\n', after_start)
+        if after_end == -1:
+            after_end = length
+        after.append(content[after_start:after_end].rstrip())
+        after_start = after_end + 1
+    
+    return _build_match(before, content[line_start:line_end].rstrip(), after, line_num)
+
+
+def _match_lines_per_line(content: str, pattern: re.Pattern, limit: int, context_lines: int) -> List[Dict]:
+    """逐行匹配（行保留换行符，与readlines一致）"""
+    parts = content.split('\n')
+    lines = [part + '\n' for part in parts[:-1]]
+    if parts[-1]:
+        lines.append(parts[-1])
+    matches = []
+    for i, line in enumerate(lines):
+        if pattern.search(line):
+            before = lines[max(0, i - context_lines):i]
+            after = lines[i + 1:i + 1 + context_lines]
+            matches.append(_build_match(
+                [l.rstrip() for l in before], line.rstrip(), [l.rstrip() for l in after], i + 1
+            ))
+            if len(matches) >= limit:
+                break
+    return matches
+
+
+# 反向引用在合并成一个正则后组号会错位
+_BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_union(regexes: Tuple[str, ...]) -> Optional[re.Pattern]:
+    """把同一组的多个正则合并成一个交替正则，用于整文件预筛
+    
+    只有全部正则都只在单行内匹配时，全文上搜不到合并正则才能说明每个正则都无匹配；
+    否则（或只有一个正则、含反向引用、合并后编译失败）返回None表示不预筛
+    """
+    if len(regexes) < 2:
+        return None
+    if not all(_is_line_local(regex) and not _BACKREFERENCE.search(regex) for regex in regexes):
+        return None
+    try:
+        return re.compile('|'.join(f'(?:{regex})' for regex in regexes), re.MULTILINE)
+    except re.error:
+        return None
+
+
+# 二进制文件检测：只检查开头这么多字节中是否有NUL（与ripgrep的启发式相同）
+_BINARY_SNIFF_BYTES = 8192
+
+
+def _read_text(filepath: str) -> Optional[str]:
+    """读取文件全文，二进制文件或无法按UTF-8读取时返回None
+    
+    按字节读取：开头含NUL字节的文件视为二进制，不再读取剩余内容和解码；
+    换行符与文本模式读取一样统一为\\n。
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            head = f.read(_BINARY_SNIFF_BYTES)
+            if b'\x00' in head:
+                return None
+            text = (head + f.read()).decode('utf-8')
+    except (UnicodeDecodeError, FileNotFoundError, PermissionError):
+        return None
+    
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _scan_files(
+    filepaths: List[str],
+    regexes: Tuple[str, ...],
+    limit: int,
+    context_lines: int,
+    read: Callable[[str], Optional[str]] = _read_text
+) -> List[Tuple[str, List[List[Dict]]]]:
+    """依次扫描一批文件，每个文件只读取一次并对同组的所有正则查找匹配行
+    
+    也是ProcessPoolExecutor的工作函数。每个正则的匹配总数各自最多limit个，
+    全部凑够后停止扫描。
+    
+    Returns:
+        [(文件路径, 按regexes顺序的匹配项列表)]，按输入顺序，只包含有匹配的文件
+    """
+    union = _compile_union(regexes)
+    counts = [0] * len(regexes)
+    results = []
+    for filepath in filepaths:
+        if min(counts) >= limit:
+            break
+        
+        content = read(filepath)
+        if content is None:
+            continue
+        # 合并正则在全文上都搜不到时，整个文件对所有正则都无匹配
+        if union is not None and union.search(content) is None:
+            continue
+        
+        per_regex = []
+        for i, regex in enumerate(regexes):
+            matches = _match_lines(content, regex, limit - counts[i], context_lines) if counts[i] < limit else []
+            counts[i] += len(matches)
+            per_regex.append(matches)
+        if any(per_regex):
+            results.append((filepath, per_regex))
+    return results
+
+
+def _limit_reached(scanned: List[Tuple[str, List[List[Dict]]]], regex_count: int, limit: int) -> bool:
+    """_scan_files的结果中是否每个正则都已凑够limit个匹配"""
+    counts = [0] * regex_count
+    for _, per_regex in scanned:
+        for i, matches in enumerate(per_regex):
+            counts[i] += len(matches)
+    return min(counts, default=0) >= limit
+
+
+_ripgrep_ignore_path: Optional[str] = None
+_ripgrep_ignore_lock = threading.Lock()
+
+
+def _ripgrep_ignore_file() -> str:
+    """把默认忽略目录写成gitignore格式的文件（进程内只写一次），所有ripgrep调用共用"""
+    global _ripgrep_ignore_path
+    with _ripgrep_ignore_lock:
+        if _ripgrep_ignore_path is None:
+            fd, path = tempfile.mkstemp(prefix='prmanger_', suffix='.rgignore')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(''.join(f'{ignore_dir}/\n' for ignore_dir in sorted(DEFAULT_IGNORE_DIRS)))
+            atexit.register(_remove_ripgrep_ignore_file, path)
+            _ripgrep_ignore_path = path
+        return _ripgrep_ignore_path
+
+
+def _remove_ripgrep_ignore_file(path: str):
+    """进程退出时删除忽略文件"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+@functools.lru_cache(maxsize=64)
+def _ripgrep_filter_args(file_pattern: str) -> Tuple[str, ...]:
+    """ripgrep的文件过滤参数：文件大小、文件模式和忽略目录（按文件模式缓存，批量搜索时共用）"""
+    args = [
+        '--no-config',  # 不读取用户的ripgrep配置文件，结果只由这里的参数决定
+        '--no-ignore-parent',  # 搜索目录即项目根目录，不向上读取父目录中的.gitignore
+        '--max-filesize', '1M',  # 最大文件大小
+        '--ignore-file', _ripgrep_ignore_file(),  # 忽略目录（任意层级）
+    ]
+    
+    # 添加文件模式过滤
+    if file_pattern and file_pattern != "*":
+        # 支持多个文件模式（逗号分隔）
+        for pattern in file_pattern.split(','):
+            args.extend(['--glob', pattern.strip()])
+    return tuple(args)
+
+
+# 候选文件总字节数达到该值时才考虑用进程池扫描：启动forkserver进程池（含导入主模块）
+# 需要秒级时间，小仓库顺序扫描只需几毫秒到几十毫秒
+_PROCESS_SCAN_MIN_BYTES = 32 * 1024 * 1024
+
+# 使用进程池前先顺序扫描开头这么多字节的文件：常见正则在这里就能凑够max_results，
+# 顺序扫描会提前停止，而进程池各分片都要扫描到各自的上限
+_SERIAL_PROBE_BYTES = 4 * 1024 * 1024
+
+# 进程池在进程内共享，首次使用时创建
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """懒加载共享的进程池
+    
+    创建时进程中已有多个线程（并发任务、日志写出线程等），fork出的子进程可能继承被其他线程
+    持有的锁而死锁，因此用forkserver（不支持时用spawn）启动工作进程；进程退出时关闭进程池
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _process_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context(start_method)
+            )
+            atexit.register(_shutdown_process_pool)
+        return _process_pool
+
+
+def _shutdown_process_pool():
+    """关闭共享的进程池（不等待未开始的分片）"""
+    global _process_pool
+    with _process_pool_lock:
+        pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
 class FastFileSearcher:
     """
     高性能文件搜索工具
@@ -30,9 +532,15 @@ class FastFileSearcher:
         self.context_lines = 2
         self.max_file_size = 1_000_000  # 1MB
         self.min_file_size = 1
+        self.rg_path = None  # ripgrep可执行文件路径（检测时解析一次，避免每次搜索查找PATH）
         self.ripgrep_available = self._check_ripgrep()
-        self.file_cache = {}  # 文件内容缓存
+        self.file_cache: "OrderedDict[str, str]" = OrderedDict()  # 文件内容缓存（LRU）
         self.cache_max_size = 100  # 最多缓存100个文件
+        self.cache_max_bytes = 200_000_000  # 缓存内容总量上限（字符数）
+        self._cache_bytes = 0
+        self._cache_lock = threading.Lock()  # 批量搜索时多个线程共享文件缓存
+        self.file_bad: Dict[str, None] = {}  # 无法读取/解码的文件（负缓存，按插入顺序淘汰）
+        self.file_bad_max_size = 10_000
         
     def _check_ripgrep(self) -> bool:
         """检查ripgrep是否可用"""
@@ -50,6 +558,7 @@ class FastFileSearcher:
             )
             
             if result.returncode == 0:
+                self.rg_path = rg_path
                 version = result.stdout.split('\n')[0]
                 print(f"[搜索引擎] ✓ ripgrep 可用 ({version})")
                 return True
@@ -65,8 +574,9 @@ class FastFileSearcher:
         self, 
         directory: str, 
         regex: str, 
-        file_pattern: str = "*"
-    ) -> Dict[str, List[Dict]]:
+        file_pattern: str = "*",
+        mode: Literal["full", "files", "count"] = "full"
+    ) -> Union[Dict[str, List[Dict]], List[str], Dict[str, int]]:
         """
         搜索文件
         
@@ -74,15 +584,28 @@ class FastFileSearcher:
             directory: 搜索目录
             regex: 正则表达式
             file_pattern: 文件模式（支持多个，用逗号分隔）
+            mode: "full"返回匹配行和上下文；"files"只返回有匹配的文件；
+                "count"只返回每个文件的匹配行数（后两种不受max_results限制）
             
         Returns:
-            {文件路径: [匹配项列表]}
+            full: {文件路径: [匹配项列表]}
+            files: [文件路径]
+            count: {文件路径: 匹配行数}
         """
+        if mode != "full":
+            if self.ripgrep_available:
+                return self._summarize_with_ripgrep(directory, regex, file_pattern, mode)
+            return self._summarize_with_python(directory, regex, file_pattern, mode)
+        
         if self.ripgrep_available:
             return self._search_with_ripgrep(directory, regex, file_pattern)
         else:
             return self._search_with_python(directory, regex, file_pattern)
     
+    def search_files_only(self, directory: str, regex: str, file_pattern: str = "*") -> List[str]:
+        """只返回包含匹配的文件路径（不收集匹配行和上下文，输出量只与文件数有关）"""
+        return self.search(directory, regex, file_pattern, mode="files")
+    
     def batch_search(
         self,
         directory: str,
@@ -99,42 +622,80 @@ class FastFileSearcher:
             {pattern_key: {文件路径: [匹配项列表]}}
         """
         results = {}
+        groups = self._group_patterns(patterns)
         
-        if self.ripgrep_available:
-            # 使用并发ripgrep搜索
-            with ThreadPoolExecutor(max_workers=min(4, len(patterns))) as executor:
-                future_to_pattern = {
-                    executor.submit(
-                        self._search_with_ripgrep, 
-                        directory, 
-                        regex, 
-                        file_pattern
-                    ): (regex, file_pattern)
-                    for regex, file_pattern in patterns
-                }
-                
-                for future in as_completed(future_to_pattern):
-                    regex, file_pattern = future_to_pattern[future]
-                    pattern_key = f"{regex}|{file_pattern}"
-                    try:
-                        results[pattern_key] = future.result()
-                    except Exception as e:
-                        print(f"[批量搜索] ⚠️ 搜索出错 ({pattern_key}): {e}")
-                        results[pattern_key] = {}
-        else:
-            # Python模式：顺序搜索（避免并发读取文件冲突）
-            for regex, file_pattern in patterns:
-                pattern_key = f"{regex}|{file_pattern}"
+        # 组之间并发搜索；Python模式下大目录的文件扫描再交给进程池
+        search_group = self._search_group_with_ripgrep if self.ripgrep_available else self._search_group_with_python
+        with ThreadPoolExecutor(max_workers=max(1, min(4, len(groups)))) as executor:
+            future_to_group = {
+                executor.submit(
+                    search_group,
+                    directory,
+                    regexes,
+                    file_pattern
+                ): (regexes, file_pattern)
+                for file_pattern, regexes in groups.items()
+            }
+            
+            for future in as_completed(future_to_group):
+                regexes, file_pattern = future_to_group[future]
                 try:
-                    results[pattern_key] = self._search_with_python(
-                        directory, regex, file_pattern
-                    )
+                    group_results = future.result()
                 except Exception as e:
-                    print(f"[批量搜索] ⚠️ 搜索出错 ({pattern_key}): {e}")
-                    results[pattern_key] = {}
+                    print(f"[批量搜索] ⚠️ 搜索出错 ({file_pattern}): {e}")
+                    group_results = [{} for _ in regexes]
+                for regex, regex_results in zip(regexes, group_results):
+                    results[f"{regex}|{file_pattern}"] = regex_results
+        
+        return results
+    
+    async def batch_search_async(
+        self,
+        directory: str,
+        patterns: List[Tuple[str, str]]  # [(regex, file_pattern), ...]
+    ) -> Dict[str, Dict[str, List[Dict]]]:
+        """
+        批量搜索多个模式（异步，结果与batch_search相同）
+        
+        ripgrep模式下各组的ripgrep进程由事件循环并发等待，不为每个进程占用一个线程；
+        Python模式下整个批量搜索放到线程中执行。
+        
+        Args:
+            directory: 搜索目录
+            patterns: [(regex, file_pattern), ...] 列表
+            
+        Returns:
+            {pattern_key: {文件路径: [匹配项列表]}}
+        """
+        if not self.ripgrep_available:
+            return await asyncio.to_thread(self.batch_search, directory, patterns)
+        
+        results = {}
+        groups = self._group_patterns(patterns)
+        outcomes = await asyncio.gather(*(
+            self._search_group_with_ripgrep_async(directory, regexes, file_pattern)
+            for file_pattern, regexes in groups.items()
+        ), return_exceptions=True)
+        
+        for (file_pattern, regexes), group_results in zip(groups.items(), outcomes):
+            if isinstance(group_results, BaseException):
+                print(f"[批量搜索] ⚠️ 搜索出错 ({file_pattern}): {group_results}")
+                group_results = [{} for _ in regexes]
+            for regex, regex_results in zip(regexes, group_results):
+                results[f"{regex}|{file_pattern}"] = regex_results
         
         return results
     
+    @staticmethod
+    def _group_patterns(patterns: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+        """文件模式相同的正则合为一组（保持顺序并去重），每组只遍历目录、读取文件一次"""
+        groups: Dict[str, List[str]] = {}
+        for regex, file_pattern in patterns:
+            group = groups.setdefault(file_pattern, [])
+            if regex not in group:
+                group.append(regex)
+        return groups
+    
     def _search_with_ripgrep(
         self,
         directory: str,
@@ -142,121 +703,284 @@ class FastFileSearcher:
         file_pattern: str = "*"
     ) -> Dict[str, List[Dict]]:
         """使用ripgrep进行搜索（高性能）"""
+        return self._search_group_with_ripgrep(directory, [regex], file_pattern)[0]
+    
+    def _search_group_with_ripgrep(
+        self,
+        directory: str,
+        regexes: List[str],
+        file_pattern: str = "*"
+    ) -> List[Dict[str, List[Dict]]]:
+        """用一次ripgrep调用（多个 -e）搜索同组的所有正则
+        
+        ripgrep只遍历一次目录，返回命中任一正则的行；再用Python正则逐行判断
+        每个匹配行属于哪些正则。有正则无法被Python编译时退回逐个正则调用。
+        
+        Returns:
+            按regexes顺序的 {文件路径: [匹配项列表]}
+        """
         try:
-            # 构建ripgrep命令
-            cmd = [
-                'rg',
-                '--json',  # JSON输出
-                '-e', regex,  # 搜索模式
-                '--context', str(self.context_lines),  # 上下文行数
-                '--max-count', str(self.max_results),  # 最大结果数
-                '--max-filesize', '1M',  # 最大文件大小
-            ]
-            
-            # 添加文件模式过滤
-            if file_pattern and file_pattern != "*":
-                # 支持多个文件模式（逗号分隔）
-                for pattern in file_pattern.split(','):
-                    cmd.extend(['--glob', pattern.strip()])
-            
-            # 添加忽略目录
-            for ignore_dir in DEFAULT_IGNORE_DIRS:
-                cmd.extend(['--glob', f'!{ignore_dir}/**'])
-            
-            cmd.append(directory)
+            routers = self._ripgrep_routers(regexes)
+        except re.error:
+            return [self._search_group_with_ripgrep(directory, [regex], file_pattern)[0] for regex in regexes]
+        
+        try:
+            # 执行搜索（边输出边解析）
+            cmd = self._ripgrep_json_cmd(directory, regexes, file_pattern)
+            returncode, parsed, stderr = self._run_ripgrep(cmd, directory, timeout=300)  # 300秒超时
             
-            # 执行搜索
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=300  # 300秒超时
+            # ripgrep返回码：0=找到，1=未找到，2=错误
+            if returncode not in [0, 1]:
+                print(f"[ripgrep] ⚠️ 搜索失败: {stderr.decode('utf-8', errors='replace')}")
+                return [{} for _ in regexes]
+            return self._route_ripgrep_matches(regexes, routers, parsed)
+                
+        except subprocess.TimeoutExpired:
+            print(f"[ripgrep] ⚠️ 搜索超时，切换到Python模式")
+            return self._search_group_with_python(directory, regexes, file_pattern)
+        except Exception as e:
+            print(f"[ripgrep] ⚠️ 搜索错误: {e}，切换到Python模式")
+            return self._search_group_with_python(directory, regexes, file_pattern)
+    
+    async def _search_group_with_ripgrep_async(
+        self,
+        directory: str,
+        regexes: List[str],
+        file_pattern: str = "*"
+    ) -> List[Dict[str, List[Dict]]]:
+        """_search_group_with_ripgrep的异步版本：用asyncio子进程运行ripgrep，JSON解析放到线程中"""
+        try:
+            routers = self._ripgrep_routers(regexes)
+        except re.error:
+            outcomes = await asyncio.gather(*(
+                self._search_group_with_ripgrep_async(directory, [regex], file_pattern) for regex in regexes
+            ))
+            return [outcome[0] for outcome in outcomes]
+        
+        try:
+            cmd = self._ripgrep_json_cmd(directory, regexes, file_pattern)
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
+            try:
+                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=300)  # 300秒超时
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise
             
             # ripgrep返回码：0=找到，1=未找到，2=错误
-            if result.returncode in [0, 1]:
-                return self._parse_ripgrep_json(result.stdout, directory)
-            else:
-                print(f"[ripgrep] ⚠️ 搜索失败: {result.stderr}")
-                return {}
-                
+            if proc.returncode not in [0, 1]:
+                print(f"[ripgrep] ⚠️ 搜索失败: {stderr.decode('utf-8', errors='replace')}")
+                return [{} for _ in regexes]
+            parsed = await asyncio.to_thread(self._parse_ripgrep_json, stdout.split(b'\n'), directory)
+            return self._route_ripgrep_matches(regexes, routers, parsed)
+        
+        except asyncio.TimeoutError:
+            print(f"[ripgrep] ⚠️ 搜索超时，切换到Python模式")
+        except Exception as e:
+            print(f"[ripgrep] ⚠️ 搜索错误: {e}，切换到Python模式")
+        return await asyncio.to_thread(self._search_group_with_python, directory, regexes, file_pattern)
+    
+    @staticmethod
+    def _ripgrep_routers(regexes: List[str]) -> Optional[List[re.Pattern]]:
+        """编译用于把匹配行分配给各正则的Python正则；只有一个正则时不需要分配，返回None
+        
+        Raises:
+            re.error: 有正则无法被Python编译
+        """
+        if len(regexes) < 2:
+            return None
+        return [_compile(regex) for regex in regexes]
+    
+    def _ripgrep_json_cmd(self, directory: str, regexes: List[str], file_pattern: str) -> List[str]:
+        """构建ripgrep命令（JSON输出，带上下文）"""
+        cmd = [
+            self.rg_path or 'rg',
+            '--json',  # JSON输出
+        ]
+        for regex in regexes:
+            cmd.extend(['-e', regex])  # 搜索模式
+        cmd.extend([
+            '--context', str(self.context_lines),  # 上下文行数
+            '--max-count', str(self.max_results),  # 最大结果数
+        ])
+        cmd.extend(_ripgrep_filter_args(file_pattern))
+        cmd.append(directory)
+        return cmd
+    
+    def _route_ripgrep_matches(
+        self,
+        regexes: List[str],
+        routers: Optional[List[re.Pattern]],
+        parsed: Dict[str, Tuple[List[int], Dict[int, str]]]
+    ) -> List[Dict[str, List[Dict]]]:
+        """把ripgrep的匹配行分配给命中它的正则，返回按regexes顺序的 {文件路径: [匹配项列表]}"""
+        results = [{} for _ in regexes]
+        for filepath, (match_numbers, lines) in parsed.items():
+            for line_num in match_numbers:
+                if routers is None:
+                    owners = range(len(regexes))
+                else:
+                    owners = [i for i, router in enumerate(routers) if router.search(lines[line_num])]
+                for i in owners:
+                    results[i].setdefault(filepath, []).append(
+                        self._build_ripgrep_match(line_num, lines)
+                    )
+        return results
+    
+    def _summarize_with_ripgrep(
+        self,
+        directory: str,
+        regex: str,
+        file_pattern: str,
+        mode: str
+    ) -> Union[List[str], Dict[str, int]]:
+        """用ripgrep只统计文件列表（-l）或每个文件的匹配行数（--count），输出为纯文本，不解析JSON"""
+        cmd = [self.rg_path or 'rg']
+        cmd.extend(['--files-with-matches'] if mode == "files" else ['--count', '--with-filename'])
+        cmd.extend(['-e', regex])
+        cmd.extend(_ripgrep_filter_args(file_pattern))
+        cmd.append(directory)
+        
+        try:
+            result = subprocess.run(cmd, capture_output=True, timeout=300)
         except subprocess.TimeoutExpired:
             print(f"[ripgrep] ⚠️ 搜索超时，切换到Python模式")
-            return self._search_with_python(directory, regex, file_pattern)
+            return self._summarize_with_python(directory, regex, file_pattern, mode)
         except Exception as e:
             print(f"[ripgrep] ⚠️ 搜索错误: {e}，切换到Python模式")
-            return self._search_with_python(directory, regex, file_pattern)
+            return self._summarize_with_python(directory, regex, file_pattern, mode)
+        
+        # ripgrep返回码：0=找到，1=未找到，2=错误
+        if result.returncode not in [0, 1]:
+            print(f"[ripgrep] ⚠️ 搜索失败: {result.stderr.decode('utf-8', errors='replace')}")
+            return [] if mode == "files" else {}
+        
+        lines = result.stdout.decode('utf-8', errors='replace').splitlines()
+        if mode == "files":
+            return [os.path.relpath(line, directory) for line in lines if line]
+        
+        counts = {}
+        for line in lines:
+            # 输出格式为"路径:行数"，路径本身可能含冒号
+            path, sep, count = line.rpartition(':')
+            if sep and count.isdigit():
+                counts[os.path.relpath(path, directory)] = int(count)
+        return counts
+    
+    def _run_ripgrep(
+        self,
+        cmd: List[str],
+        base_dir: str,
+        timeout: float
+    ) -> Tuple[int, Dict[str, Tuple[List[int], Dict[int, str]]], bytes]:
+        """运行ripgrep并从管道逐行解析stdout，不缓存完整输出
+        
+        stderr在后台线程中读取，避免管道写满后ripgrep阻塞；超时后终止进程。
+        
+        Returns:
+            (返回码, 解析结果, stderr)
+        
+        Raises:
+            subprocess.TimeoutExpired: 超时
+        """
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=1024 * 1024
+        )
+        stderr_chunks = []
+        stderr_reader = threading.Thread(
+            target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True
+        )
+        stderr_reader.start()
+        
+        timed_out = threading.Event()
+        
+        def _kill():
+            timed_out.set()
+            proc.kill()
+        
+        timer = threading.Timer(timeout, _kill)
+        timer.start()
+        try:
+            with proc.stdout:
+                parsed = self._parse_ripgrep_json(proc.stdout, base_dir)
+            returncode = proc.wait()
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            stderr_reader.join()
+        
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        return returncode, parsed, b''.join(stderr_chunks)
+    
+    def _build_ripgrep_match(self, line_num: int, lines: Dict[int, str]) -> Dict:
+        """根据ripgrep输出的行（匹配行和上下文行）构造一条匹配结果"""
+        before = [
+            lines[n].rstrip() for n in range(line_num - self.context_lines, line_num) if n in lines
+        ]
+        after = [
+            lines[n].rstrip() for n in range(line_num + 1, line_num + self.context_lines + 1) if n in lines
+        ]
+        return _build_match(before, lines[line_num].rstrip(), after, line_num)
     
     def _parse_ripgrep_json(
         self,
-        output: str,
+        output: Iterable[bytes],
         base_dir: str
-    ) -> Dict[str, List[Dict]]:
-        """解析ripgrep的JSON输出"""
+    ) -> Dict[str, Tuple[List[int], Dict[int, str]]]:
+        """解析ripgrep的JSON输出（每行一个JSON对象，优先使用orjson）
+        
+        Args:
+            output: 逐行产出的字节串，可以直接是ripgrep的stdout管道
+        
+        Returns:
+            {文件路径: (匹配行号列表, {行号: 行文本（含换行符）})}，行文本包括匹配行和上下文行
+        """
         results = {}
-        current_file = None
-        current_matches = []
+        current = None
+        loads = orjson.loads if ORJSON_AVAILABLE else json.loads
         
-        for line in output.strip().split('\n'):
-            if not line:
+        for line in output:
+            # 统计信息行不参与结果，跳过解析
+            if not line or line.startswith(b'{"type":"summary"'):
                 continue
             
             try:
-                data = json.loads(line)
+                data = loads(line)
                 msg_type = data.get('type')
                 
                 if msg_type == 'begin':
                     # 新文件开始
                     path_data = data.get('data', {}).get('path', {})
                     file_path = path_data.get('text', '')
+                    current = None
                     if file_path:
-                        current_file = os.path.relpath(file_path, base_dir)
-                        current_matches = []
-                
-                elif msg_type == 'match':
-                    # 匹配行
-                    if current_file:
-                        match_data = data['data']
-                        line_num = match_data.get('line_number', 0)
-                        line_text = match_data.get('lines', {}).get('text', '').rstrip()
-                        
-                        # 收集上下文
-                        current_matches.append({
-                            'line_number': line_num,
-                            'line': line_text,
-                            'text': line_text,
-                            'before': [],
-                            'after': []
-                        })
+                        current = ([], {})
+                        results[os.path.relpath(file_path, base_dir)] = current
                 
-                elif msg_type == 'context':
-                    # 上下文行
-                    if current_file and current_matches:
-                        context_data = data['data']
-                        context_line_num = context_data.get('line_number', 0)
-                        context_text = context_data.get('lines', {}).get('text', '').rstrip()
+                elif msg_type in ('match', 'context'):
+                    # 匹配行 / 上下文行
+                    if current is not None:
+                        line_data = data['data']
+                        line_num = line_data.get('line_number', 0)
+                        current[1][line_num] = line_data.get('lines', {}).get('text', '')
+                        if msg_type == 'match':
+                            current[0].append(line_num)
                         
-                        last_match = current_matches[-1]
-                        if context_line_num < last_match['line_number']:
-                            last_match['before'].append(context_text)
-                        else:
-                            last_match['after'].append(context_text)
-                
-                elif msg_type == 'end':
-                    # 文件结束
-                    if current_file and current_matches:
-                        results[current_file] = current_matches
-                        current_file = None
-                        current_matches = []
-                        
-            except json.JSONDecodeError:
+            except ValueError:
                 continue
         
-        # 处理最后一个文件
-        if current_file and current_matches:
-            results[current_file] = current_matches
-        
-        return results
+        # 没有匹配行的文件不出现在结果中
+        return {filepath: parsed for filepath, parsed in results.items() if parsed[0]}
     
     def _search_with_python(
         self,
@@ -265,91 +989,198 @@ class FastFileSearcher:
         file_pattern: str = "*"
     ) -> Dict[str, List[Dict]]:
         """使用Python进行搜索（备选方案）"""
-        pattern = re.compile(regex)
-        results = {}
-        count = 0
+        return self._search_group_with_python(directory, [regex], file_pattern)[0]
+    
+    def _search_group_with_python(
+        self,
+        directory: str,
+        regexes: List[str],
+        file_pattern: str = "*"
+    ) -> List[Dict[str, List[Dict]]]:
+        """用Python一次扫描搜索同组的所有正则
         
-        # 解析文件模式
-        file_patterns = [p.strip() for p in file_pattern.split(',')]
+        先遍历目录收集候选文件，在当前线程中借助文件缓存顺序扫描；候选文件总量很大、
+        且开头一部分文件扫描完仍未凑够max_results时，剩余文件分片交给进程池并行扫描（绕过GIL）。
+        每个文件只读取一次。
         
-        for root, dirs, files in os.walk(directory):
-            # 过滤忽略目录
-            dirs[:] = [d for d in dirs if d not in DEFAULT_IGNORE_DIRS]
-            
-            for file in files:
+        Returns:
+            按regexes顺序的 {文件路径: [匹配项列表]}
+        """
+        if len(regexes) == 1:
+            _compile(regexes[0])  # 先编译一次，正则无效时在遍历文件前报错
+            valid = tuple(regexes)
+        else:
+            # 同组中无效的正则单独报错并返回空结果，不影响其他正则
+            valid = []
+            for regex in regexes:
+                try:
+                    _compile(regex)
+                    valid.append(regex)
+                except re.error as e:
+                    print(f"[批量搜索] ⚠️ 搜索出错 ({regex}|{file_pattern}): {e}")
+            valid = tuple(valid)
+        if not valid:
+            return [{} for _ in regexes]
+        
+        candidates, sizes = self._collect_candidate_files(directory, file_pattern)
+        
+        remaining = candidates
+        scanned = []
+        if sum(sizes) >= _PROCESS_SCAN_MIN_BYTES and (os.cpu_count() or 1) > 1:
+            # 先顺序扫描开头的文件，已凑够max_results时不再启动进程池
+            probe_end = 0
+            probe_bytes = 0
+            while probe_end < len(sizes) and probe_bytes < _SERIAL_PROBE_BYTES:
+                probe_bytes += sizes[probe_end]
+                probe_end += 1
+            scanned = _scan_files(
+                candidates[:probe_end], valid, self.max_results, self.context_lines, read=self._get_file_content
+            )
+            remaining = candidates[probe_end:]
+            if _limit_reached(scanned, len(valid), self.max_results):
+                remaining = []
+            elif remaining:
+                pooled = self._scan_in_processes(remaining, valid)
+                if pooled is not None:
+                    scanned.extend(pooled)
+                    remaining = []
+        if remaining:
+            scanned.extend(_scan_files(
+                remaining, valid, self.max_results, self.context_lines, read=self._get_file_content
+            ))
+        
+        # 每个正则按遍历顺序合并，总匹配数不超过max_results
+        valid_results = {}
+        for i, regex in enumerate(valid):
+            results = {}
+            count = 0
+            for filepath, per_regex in scanned:
                 if count >= self.max_results:
                     break
-                
-                # 文件模式匹配
-                if file_pattern != "*":
-                    import fnmatch
-                    if not any(fnmatch.fnmatch(file, pat) for pat in file_patterns):
-                        continue
-                
-                filepath = os.path.join(root, file)
-                rel_path = os.path.relpath(filepath, directory)
-                
-                # 性能优化：跳过过大或过小的文件
-                try:
-                    file_size = os.path.getsize(filepath)
-                    if file_size > self.max_file_size or file_size < self.min_file_size:
-                        continue
-                except OSError:
-                    continue
-                
-                # 使用缓存读取文件
-                lines = self._get_file_content(filepath)
-                if lines is None:
-                    continue
-                
-                for i, line in enumerate(lines):
-                    if pattern.search(line):
-                        count += 1
-                        if rel_path not in results:
-                            results[rel_path] = []
-                        
-                        before = lines[max(0, i-self.context_lines):i]
-                        after = lines[i+1:i+1+self.context_lines]
-                        
-                        results[rel_path].append({
-                            'line_number': i + 1,
-                            'line': line.rstrip(),
-                            'text': line.rstrip(),
-                            'before': [l.rstrip() for l in before],
-                            'after': [l.rstrip() for l in after]
-                        })
-                        
-                        if count >= self.max_results:
-                            break
+                matches = per_regex[i][:self.max_results - count]
+                if matches:
+                    results[os.path.relpath(filepath, directory)] = matches
+                    count += len(matches)
+            valid_results[regex] = results
         
-        return results
+        return [valid_results.get(regex, {}) for regex in regexes]
     
-    def _get_file_content(self, filepath: str) -> Optional[List[str]]:
-        """获取文件内容（带缓存）"""
-        # 检查缓存
-        if filepath in self.file_cache:
-            return self.file_cache[filepath]
-        
-        # 读取文件
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+    def _summarize_with_python(
+        self,
+        directory: str,
+        regex: str,
+        file_pattern: str,
+        mode: str
+    ) -> Union[List[str], Dict[str, int]]:
+        """用Python只统计文件列表或每个文件的匹配行数（文件列表模式每个文件找到一处匹配即停）"""
+        _compile(regex)  # 先编译一次，正则无效时在遍历文件前报错
+        files = []
+        counts = {}
+        filepaths, _ = self._collect_candidate_files(directory, file_pattern)
+        for filepath in filepaths:
+            content = self._get_file_content(filepath)
+            if content is None:
+                continue
             
-            # 缓存管理：先进先出
-            if len(self.file_cache) >= self.cache_max_size:
-                # 移除最早的缓存
-                first_key = next(iter(self.file_cache))
-                del self.file_cache[first_key]
+            if mode == "files":
+                if _match_lines(content, regex, 1, 0):
+                    files.append(os.path.relpath(filepath, directory))
+            else:
+                count = len(_match_lines(content, regex, len(content) + 1, 0))
+                if count:
+                    counts[os.path.relpath(filepath, directory)] = count
+        return files if mode == "files" else counts
+    
+    def _collect_candidate_files(self, directory: str, file_pattern: str) -> Tuple[List[str], List[int]]:
+        """遍历目录，收集符合文件模式和大小限制的文件路径（与os.walk顺序一致）
+        
+        Returns:
+            (文件路径列表, 对应的文件字节数列表)
+        """
+        file_filter = _compile_file_filter(file_pattern)
+        candidates = []
+        sizes = []
+        
+        # 忽略目录在进入前跳过；文件大小取自DirEntry缓存的stat
+        for entry in iter_files(directory, DEFAULT_IGNORE_DIRS):
+            # 文件模式匹配
+            if file_filter is not None and not file_filter(entry.name):
+                continue
             
-            self.file_cache[filepath] = lines
-            return lines
+            # 性能优化：跳过过大或过小的文件
+            try:
+                file_size = entry.stat().st_size
+                if file_size > self.max_file_size or file_size < self.min_file_size:
+                    continue
+            except OSError:
+                continue
             
-        except (UnicodeDecodeError, FileNotFoundError, PermissionError):
+            candidates.append(entry.path)
+            sizes.append(file_size)
+        
+        return candidates, sizes
+    
+    def _scan_in_processes(
+        self,
+        candidates: List[str],
+        regexes: Tuple[str, ...]
+    ) -> Optional[List[Tuple[str, List[List[Dict]]]]]:
+        """把候选文件按顺序分片交给进程池扫描，进程池不可用时返回None"""
+        workers = os.cpu_count() or 1
+        chunk_size = (len(candidates) + workers - 1) // workers
+        chunks = [candidates[i:i + chunk_size] for i in range(0, len(candidates), chunk_size)]
+        try:
+            pool = _get_process_pool()
+            scanned = []
+            for chunk_result in pool.map(
+                _scan_files, chunks, repeat(regexes), repeat(self.max_results), repeat(self.context_lines)
+            ):
+                scanned.extend(chunk_result)
+            return scanned
+        except Exception as e:
+            print(f"[搜索引擎] ⚠️ 进程池扫描失败，改为顺序扫描: {e}")
             return None
     
+    def _get_file_content(self, filepath: str) -> Optional[str]:
+        """获取文件全文（带缓存）"""
+        # 检查缓存（命中后移到末尾，标记为最近使用）
+        with self._cache_lock:
+            content = self.file_cache.get(filepath)
+            if content is not None:
+                self.file_cache.move_to_end(filepath)
+                return content
+            if filepath in self.file_bad:
+                return None
+        
+        # 读取文件（整体读取，不切分行列表；二进制文件只读开头一小段）
+        content = _read_text(filepath)
+        
+        with self._cache_lock:
+            if content is None:
+                # 记住读取失败的文件，后续搜索（包括同批次的其他模式）不再重复打开
+                self.file_bad[filepath] = None
+                while len(self.file_bad) > self.file_bad_max_size:
+                    del self.file_bad[next(iter(self.file_bad))]
+                return None
+            
+            # 缓存管理：LRU，同时限制文件数和内容总量，从最久未使用的一端淘汰
+            if filepath not in self.file_cache:
+                self.file_cache[filepath] = content
+                self._cache_bytes += len(content)
+            while self.file_cache and (
+                len(self.file_cache) > self.cache_max_size
+                or self._cache_bytes > self.cache_max_bytes
+            ):
+                _, evicted = self.file_cache.popitem(last=False)
+                self._cache_bytes -= len(evicted)
+        return content
+    
     def clear_cache(self):
         """清除文件缓存"""
-        self.file_cache.clear()
+        with self._cache_lock:
+            self.file_cache.clear()
+            self._cache_bytes = 0
+            self.file_bad.clear()
         print("[搜索引擎] 🗑️ 缓存已清除")
 
 
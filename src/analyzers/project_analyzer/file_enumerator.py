@@ -1,5 +1,5 @@
 import os
-from typing import List, Tuple, Optional, Set, Dict
+from typing import Iterator, List, Tuple, Optional, Set, Dict
 from collections import deque
 
 DEFAULT_IGNORE_DIRS = {
@@ -8,6 +8,39 @@ DEFAULT_IGNORE_DIRS = {
     "vendor", ".pytest_cache", ".mypy_cache", "coverage"
 }
 
+
+def iter_files(directory: str, ignore_dirs: Set[str] = DEFAULT_IGNORE_DIRS) -> Iterator[os.DirEntry]:
+    """遍历目录下的所有文件，顺序与os.walk一致（先当前目录的文件，再依次深入子目录）
+    
+    基于os.scandir：目录判断使用读目录时返回的类型信息，DirEntry.stat()结果会被缓存；
+    忽略目录在进入之前就被跳过，不会对其scandir。与os.walk一样不进入符号链接目录。
+    """
+    stack = [directory]
+    while stack:
+        current_dir = stack.pop()
+        try:
+            with os.scandir(current_dir) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            
+            if is_dir:
+                if entry.name not in ignore_dirs and not entry.is_symlink():
+                    subdirs.append(entry.path)
+            else:
+                yield entry
+        
+        # 逆序入栈，保证按目录顺序依次深入
+        stack.extend(reversed(subdirs))
+
+
 class FileEnumerator:
     """文件列举工具"""
     
@@ -23,21 +56,21 @@ class FileEnumerator:
         return False
     
     def list_files_recursive(self, directory: str, limit: int = 200) -> Tuple[List[str], bool]:
-        """递归列举文件（广度优先）"""
+        """递归列举文件（广度优先）
+        
+        符号链接目录只列出、不进入，因此不会重复访问目录，不需要visited集合。
+        """
         results = []
-        queue = deque([directory])
-        visited = set()
+        queue = deque([(directory, '')])  # (目录路径, 相对路径前缀)
         hit_limit = False
         
         while queue and len(results) < limit:
-            current_dir = queue.popleft()
-            
-            if current_dir in visited:
-                continue
-            visited.add(current_dir)
+            current_dir, rel_prefix = queue.popleft()
             
+            # scandir返回的条目自带类型信息，判断目录不需要额外stat
             try:
-                entries = sorted(os.listdir(current_dir))
+                with os.scandir(current_dir) as it:
+                    entries = sorted(it, key=lambda e: e.name)
             except (PermissionError, FileNotFoundError):
                 continue
             
@@ -46,16 +79,16 @@ class FileEnumerator:
                     hit_limit = True
                     break
                 
-                full_path = os.path.join(current_dir, entry)
-                rel_path = os.path.relpath(full_path, directory)
-                
-                if self.should_ignore(entry):
+                if self.should_ignore(entry.name):
                     continue
                 
-                if os.path.isdir(full_path):
+                rel_path = rel_prefix + entry.name
+                if entry.is_dir():
                     results.append(rel_path + '/')
-                    queue.append(full_path)
+                    # 达到上限后不再入队（不会再被访问）
+                    if len(results) < limit and not entry.is_symlink():
+                        queue.append((entry.path, rel_path + '/'))
                 else:
                     results.append(rel_path)
         
-        return results, hit_limit
\ No newline at end of file
+        return results, hit_limit
@@ -1,6 +1,9 @@
 import os
 import re
+import fnmatch
+import functools
 from typing import List, Tuple, Optional, Set, Dict
+from .file_enumerator import iter_files
 
 DEFAULT_IGNORE_DIRS = {
     "node_modules", "__pycache__", ".git", ".venv", "venv", "env",
@@ -8,6 +11,13 @@ DEFAULT_IGNORE_DIRS = {
     "vendor", ".pytest_cache", ".mypy_cache", "coverage"
 }
 
+
+@functools.lru_cache(maxsize=256)
+def _compile(regex: str, flags: int = 0) -> re.Pattern:
+    """编译正则（LRU缓存，重复搜索相同模式时不重复编译）"""
+    return re.compile(regex, flags)
+
+
 class FileSearcher:
     """文件搜索工具"""
     
@@ -19,61 +29,57 @@ class FileSearcher:
     
     def search(self, directory: str, regex: str, file_pattern: str = "*") -> Dict[str, List[Dict]]:
         """搜索文件"""
-        pattern = re.compile(regex)
+        pattern = _compile(regex)
+        file_filter = _compile(fnmatch.translate(file_pattern)) if file_pattern != "*" else None
         results = {}
         count = 0
         
-        for root, dirs, files in os.walk(directory):
-            # 过滤忽略目录
-            dirs[:] = [d for d in dirs if d not in DEFAULT_IGNORE_DIRS]
+        # 忽略目录在进入前跳过；文件大小取自DirEntry缓存的stat
+        for entry in iter_files(directory, DEFAULT_IGNORE_DIRS):
+            if count >= self.max_results:
+                break
+            
+            # 文件模式匹配
+            if file_filter is not None and not file_filter.match(entry.name):
+                continue
+            
+            filepath = entry.path
+            rel_path = os.path.relpath(filepath, directory)
+            
+            # 性能优化：跳过过大或过小的文件
+            try:
+                file_size = entry.stat().st_size
+                if file_size > self.max_file_size:
+                    continue  # 跳过超大文件（如二进制、生成文件）
+                if file_size < self.min_file_size:
+                    continue  # 跳过空文件
+            except OSError:
+                continue
+            
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+            except (UnicodeDecodeError, FileNotFoundError, PermissionError):
+                continue
             
-            for file in files:
-                if count >= self.max_results:
-                    break
-                
-                # 文件模式匹配
-                if file_pattern != "*":
-                    import fnmatch
-                    if not fnmatch.fnmatch(file, file_pattern):
-                        continue
-                
-                filepath = os.path.join(root, file)
-                rel_path = os.path.relpath(filepath, directory)
-                
-                # 性能优化：跳过过大或过小的文件
-                try:
-                    file_size = os.path.getsize(filepath)
-                    if file_size > self.max_file_size:
-                        continue  # 跳过超大文件（如二进制、生成文件）
-                    if file_size < self.min_file_size:
-                        continue  # 跳过空文件
-                except OSError:
-                    continue
-                
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        lines = f.readlines()
-                except (UnicodeDecodeError, FileNotFoundError, PermissionError):
-                    continue
-                
-                for i, line in enumerate(lines):
-                    if pattern.search(line):
-                        count += 1
-                        if rel_path not in results:
-                            results[rel_path] = []
-                        
-                        before = lines[max(0, i-self.context_lines):i]
-                        after = lines[i+1:i+1+self.context_lines]
-                        
-                        results[rel_path].append({
-                            'line_number': i + 1,  # 修改字段名以匹配
-                            'line': line.rstrip(),
-                            'text': line.rstrip(),  # 保留兼容性
-                            'before': [l.rstrip() for l in before],
-                            'after': [l.rstrip() for l in after]
-                        })
-                        
-                        if count >= self.max_results:
-                            break
+            for i, line in enumerate(lines):
+                if pattern.search(line):
+                    count += 1
+                    if rel_path not in results:
+                        results[rel_path] = []
+                    
+                    before = lines[max(0, i-self.context_lines):i]
+                    after = lines[i+1:i+1+self.context_lines]
+                    
+                    results[rel_path].append({
+                        'line_number': i + 1,  # 修改字段名以匹配
+                        'line': line.rstrip(),
+                        'text': line.rstrip(),  # 保留兼容性
+                        'before': [l.rstrip() for l in before],
+                        'after': [l.rstrip() for l in after]
+                    })
+                    
+                    if count >= self.max_results:
+                        break
         
         return results
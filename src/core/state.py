@@ -2,11 +2,151 @@
 PR审查系统状态定义
 """
 
-from typing import TypedDict, List, Dict
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, TypedDict, List, Dict, Optional
+
+
+_MISSING = object()  # pop未传default的标记
+
+
+class ASTCache(OrderedDict):
+    """文件路径 -> AST节点列表的LRU缓存
+    
+    按节点数估算占用字节数，超过max_bytes时从最久未使用的一端淘汰
+    （至少保留最近写入的一项）。读取（[]和get）和写入都会把条目标记为最近使用。
+    每个条目的估算字节数单独记录，OrderedDict中不经过__delitem__的删除方法
+    （pop/popitem/clear）都需要同步扣减。
+    __getitem__会调整顺序，遍历键再逐个取值会在遍历中修改字典，批量复制条目时一律遍历items()。
+    """
+    
+    AVG_NODE_BYTES = 1024  # 每个AST节点（含行内容、参数、文档字符串）的估算字节数
+    
+    def __init__(self, *args, max_bytes: int = 100_000_000, **kwargs):
+        self.max_bytes = max_bytes
+        self._sizes = {}  # {路径: 写入时估算的字节数}
+        self._bytes = 0
+        super().__init__()
+        self.update(*args, **kwargs)
+    
+    def _estimate(self, nodes: Any) -> int:
+        """估算一个文件的节点列表占用的字节数"""
+        return len(nodes) * self.AVG_NODE_BYTES
+    
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+    
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+    
+    def update(self, other=(), /, **kwargs):
+        # OrderedDict.update按keys()遍历再逐个取值，源对象是ASTCache时取值会调整其顺序
+        if isinstance(other, Mapping):
+            items = list(other.items())
+        elif hasattr(other, 'keys'):
+            items = [(key, other[key]) for key in list(other.keys())]
+        else:
+            items = other
+        for key, nodes in items:
+            self[key] = nodes
+        for key, nodes in kwargs.items():
+            self[key] = nodes
+    
+    def __or__(self, other):
+        if not isinstance(other, dict):
+            return NotImplemented
+        new = self.copy()
+        new.update(other)
+        return new
+    
+    def __ror__(self, other):
+        if not isinstance(other, dict):
+            return NotImplemented
+        new = type(self)(other, max_bytes=self.max_bytes)
+        new.update(self)
+        return new
+    
+    def __ior__(self, other):
+        self.update(other)
+        return self
+    
+    def __setitem__(self, key, nodes):
+        if key in self:
+            del self[key]
+        size = self._estimate(nodes)
+        super().__setitem__(key, nodes)
+        self._sizes[key] = size
+        self._bytes += size
+        while self._bytes > self.max_bytes and len(self) > 1:
+            del self[next(iter(self))]
+    
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._bytes -= self._sizes.pop(key)
+    
+    def pop(self, key, default=_MISSING):
+        if key in self:
+            value = super().__getitem__(key)
+            del self[key]
+            return value
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+    
+    def popitem(self, last: bool = True):
+        if not self:
+            raise KeyError('dictionary is empty')
+        key = next(reversed(self)) if last else next(iter(self))
+        return key, self.pop(key)
+    
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return default
+    
+    def clear(self):
+        super().clear()
+        self._sizes.clear()
+        self._bytes = 0
+    
+    def copy(self) -> "ASTCache":
+        return type(self)(self.items(), max_bytes=self.max_bytes)
+    
+    def __reduce__(self):
+        # 按条目重建（copy/deepcopy/pickle），字节数在逐项写入时重新计算，不复制_sizes/_bytes
+        return _rebuild_ast_cache, (type(self), list(self.items()), self.max_bytes)
+    
+    @property
+    def estimated_bytes(self) -> int:
+        """当前估算的总字节数"""
+        return self._bytes
+
+
+def _rebuild_ast_cache(cls, items: List, max_bytes: int) -> ASTCache:
+    """ASTCache.__reduce__的重建函数"""
+    return cls(items, max_bytes=max_bytes)
+
+
+def as_ast_cache(cache: Optional[Dict[str, List]]) -> ASTCache:
+    """把状态中的ast_cache转换为ASTCache（已是ASTCache时原样返回，不复制）"""
+    if isinstance(cache, ASTCache):
+        return cache
+    return ASTCache(cache or {})
 
 
 class PRReviewState(TypedDict):
-    """分支合并审查流程状态（原生Git模式）"""
+    """分支合并审查流程状态（原生Git模式）
+    
+    状态字段在节点之间、主图与子图之间按引用传递，节点拿到的是同一个对象；
+    主图的checkpointer（InMemorySaver）每一步只保存本步返回的字段。
+    pr_diff、all_collected_context等大字段在节点内只读，不要整体深拷贝，
+    没有变化时也不要写回状态。
+    """
     # 飞书相关
     feishu_user_id: str
     feishu_user_name: str
@@ -57,4 +197,4 @@ class PRReviewState(TypedDict):
     parent_pr_id: str  # 父PR标识（用于子PR）
     
     # AST缓存字段
-    ast_cache: Dict[str, List]  # 文件路径 -> AST节点列表的缓存
+    ast_cache: ASTCache  # 文件路径 -> AST节点列表的缓存（有大小上限的LRU）
@@ -1,7 +1,11 @@
+import asyncio
+
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import InMemorySaver
 
 from .state import PRReviewState
+from src.utils.config import CONFIG
+from src.utils.helpers import count_diff_lines
 from src.agents.listener_agent import feishu_listener_node
 from src.agents.splitter_agent import pr_splitter_node
 from src.agents.git_review_agent import git_review_node
@@ -32,6 +36,21 @@ def get_pr_review_subgraph():
     return _SUBGRAPH_SINGLETON
 
 
+# 子图内部路由表：当前阶段 -> 下一个节点，未列出的阶段（含feishu_feedback，子图完成）退出子图
+_SUBGRAPH_ROUTES = {
+    "code_analysis": "code_analyzer",
+    "context_collection": "context_collector",
+    "analysis_complete": "decision",
+    "decision": "decision",
+    "feishu_feedback": END,
+}
+
+
+def subgraph_routing(state: PRReviewState) -> str:
+    """子图内部路由逻辑"""
+    return _SUBGRAPH_ROUTES.get(state.get("current_stage", ""), END)
+
+
 def _build_single_pr_review_subgraph():
     """
     内部方法：构建单个PR审查子图
@@ -45,23 +64,6 @@ def _build_single_pr_review_subgraph():
     builder.add_node("context_collector", context_collector_node)
     builder.add_node("decision", decision_node)
     
-    # 定义子图内部路由
-    def subgraph_routing(state: PRReviewState) -> str:
-        """子图内部路由逻辑"""
-        current_stage = state.get("current_stage", "")
-        
-        if current_stage == "code_analysis":
-            return "code_analyzer"
-        elif current_stage == "context_collection":
-            return "context_collector"
-        elif current_stage in ["analysis_complete", "decision"]:
-            return "decision"
-        elif current_stage == "feishu_feedback":
-            # 子图完成，准备退出
-            return END
-        else:
-            return END
-    
     # 构建子图流程
     builder.add_edge(START, "git_review")
     
@@ -99,24 +101,24 @@ def _build_single_pr_review_subgraph():
 # 主图路由函数
 # ============================================================================
 
+# 主图路由表：当前阶段 -> 下一个节点（模块级常量，不在每次路由时重建）
+_MAIN_ROUTES = {
+    "pr_split": "pr_splitter",
+    "single_pr_review": "single_pr_processor",  # 单个PR处理
+    "sub_pr_review": "sub_pr_processor",        # 子PR批量处理
+    "aggregation": "pr_aggregator",
+    "feishu_feedback": "feishu_feedback",
+    "completed": END,
+    # 错误处理
+    "feishu_listener_failed": "feishu_feedback",
+    "splitter_failed": "feishu_feedback",
+    "aggregator_failed": "feishu_feedback",
+}
+
+
 def main_routing_func(state: PRReviewState) -> str:
     """主图路由函数 - 简化的路由逻辑"""
-    current_stage = state.get("current_stage", "")
-    
-    routing_map = {
-        "pr_split": "pr_splitter",
-        "single_pr_review": "single_pr_processor",  # 单个PR处理
-        "sub_pr_review": "sub_pr_processor",        # 子PR批量处理
-        "aggregation": "pr_aggregator",
-        "feishu_feedback": "feishu_feedback",
-        "completed": END,
-        # 错误处理
-        "feishu_listener_failed": "feishu_feedback",
-        "splitter_failed": "feishu_feedback",
-        "aggregator_failed": "feishu_feedback",
-    }
-    
-    return routing_map.get(current_stage, END)
+    return _MAIN_ROUTES.get(state.get("current_stage", ""), END)
 
 
 # ============================================================================
@@ -192,80 +194,25 @@ async def sub_pr_processor_node(state: PRReviewState) -> PRReviewState:
             "sub_pr_results": []
         }
     
-    print(f"[批量处理] 开始依次处理 {len(sub_prs)} 个子PR...")
+    # 子PR之间相互独立，并发执行子图以重叠LLM调用的网络等待；用信号量限制并发数
+    concurrency = max(1, CONFIG.get('llm', {}).get('concurrency', 2))
+    print(f"[批量处理] 开始并发处理 {len(sub_prs)} 个子PR（并发数: {concurrency}）...")
     
     # 获取预编译的子图单例（所有子PR共享，避免重复构建）
     subgraph = get_pr_review_subgraph()
     
-    # 顺序处理每个子PR
-    sub_pr_results = []
-    for i, sub_pr in enumerate(sub_prs, 1):
-        print(f"\n[子PR {i}/{len(sub_prs)}] {sub_pr.get('title', f'SubPR-{i}')}")
-        
-        try:
-            # 准备子PR的独立状态
-            sub_pr_diff = sub_pr.get("diff", "")
-            sub_pr_files = sub_pr.get("files", [])
-            
-            # 计算子PR统计信息
-            lines_added = sum(1 for line in sub_pr_diff.split('\n') 
-                            if line.startswith('+') and not line.startswith('+++'))
-            lines_deleted = sum(1 for line in sub_pr_diff.split('\n') 
-                              if line.startswith('-') and not line.startswith('---'))
-            
-            subgraph_input = {
-                "pr_diff": sub_pr_diff,
-                "pr_files": sub_pr_files,
-                "pr_size": "small",
-                "pr_stats": {
-                    "files_count": len(sub_pr_files),
-                    "additions": lines_added,
-                    "deletions": lines_deleted,
-                    "lines_changed": lines_added + lines_deleted,
-                    "diff_size": len(sub_pr_diff)
-                },
-                "is_sub_pr": True,
-                "parent_pr_id": state.get("parent_pr_id", ""),
-                "source_branch": state.get("source_branch", ""),
-                "target_branch": state.get("target_branch", ""),
-                "repo_name": state.get("repo_name", ""),
-                "feishu_user_id": state.get("feishu_user_id", "未知"),  # 传递飞书用户ID
-                "feishu_user_name": state.get("feishu_user_name", "未知"),  # 传递飞书用户名
-                "current_stage": "code_analysis",
-            }
-            
-            # 执行子图
-            print(f"[子PR {i}/{len(sub_prs)}] 进入审查子图...")
-            result = await subgraph.ainvoke(subgraph_input)
-            
-            # 收集子PR结果
-            sub_pr_result = {
-                "title": sub_pr.get("title", f"SubPR-{i}"),
-                "module": sub_pr.get("module", "unknown"),
-                "final_decision": result.get("final_decision", "unknown"),
-                "issues": result.get("code_issues", []) + result.get("rule_violations", []),
-                # 详细信息
-                "pr_diff": result.get("pr_diff", ""),
-                "pr_stats": result.get("pr_stats", {}),
-                "changed_files": result.get("changed_files", []),
-                "changed_definitions": result.get("changed_definitions", []),
-                "analysis_conclusion": result.get("analysis_conclusion", {}),
-                "all_collected_context": result.get("all_collected_context", {}),
-                "impact_chain": result.get("impact_chain", []),
-                "code_check_passed": result.get("code_check_passed", False),
-            }
-            
-            sub_pr_results.append(sub_pr_result)
-            print(f"[子PR {i}/{len(sub_prs)}] ✓ 处理完成，决策: {sub_pr_result['final_decision']}")
-            
-        except Exception as e:
-            print(f"[子PR {i}/{len(sub_prs)}] ✗ 处理失败: {str(e)[:100]}")
-            sub_pr_results.append({
-                "title": sub_pr.get('title', f'SubPR-{i}'),
-                "module": sub_pr.get("module", "unknown"),
-                "final_decision": "error",
-                "issues": [f"处理异常: {str(e)[:200]}"]
-            })
+    # 信号量需绑定当前事件循环（每个任务在独立线程的事件循环中运行），因此在节点内创建
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    # gather按提交顺序返回结果，与子PR顺序一致；单个子PR未捕获的异常不影响其他子PR
+    outcomes = await asyncio.gather(*(
+        _process_sub_pr(state, subgraph, sub_pr, i, len(sub_prs), semaphore)
+        for i, sub_pr in enumerate(sub_prs, 1)
+    ), return_exceptions=True)
+    sub_pr_results = [
+        _sub_pr_error_result(sub_pr, i, outcome) if isinstance(outcome, BaseException) else outcome
+        for i, (sub_pr, outcome) in enumerate(zip(sub_prs, outcomes), 1)
+    ]
     
     print(f"\n[批量处理完成] {len(sub_pr_results)} 个子PR已完成审查")
     print("="*60 + "\n")
@@ -276,6 +223,80 @@ async def sub_pr_processor_node(state: PRReviewState) -> PRReviewState:
     }
 
 
+async def _process_sub_pr(state: PRReviewState, subgraph, sub_pr: dict, i: int, total: int,
+                          semaphore: asyncio.Semaphore) -> dict:
+    """处理单个子PR：构建子PR独立状态并执行审查子图，异常时返回error结果"""
+    print(f"\n[子PR {i}/{total}] {sub_pr.get('title', f'SubPR-{i}')}")
+    
+    try:
+        # 准备子PR的独立状态
+        sub_pr_diff = sub_pr.get("diff", "")
+        sub_pr_files = sub_pr.get("files", [])
+        
+        # 计算子PR统计信息
+        lines_added, lines_deleted = count_diff_lines(sub_pr_diff)
+        
+        subgraph_input = {
+            "pr_diff": sub_pr_diff,
+            "pr_files": sub_pr_files,
+            "pr_size": "small",
+            "pr_stats": {
+                "files_count": len(sub_pr_files),
+                "additions": lines_added,
+                "deletions": lines_deleted,
+                "lines_changed": lines_added + lines_deleted,
+                "diff_size": len(sub_pr_diff)
+            },
+            "is_sub_pr": True,
+            "parent_pr_id": state.get("parent_pr_id", ""),
+            "source_branch": state.get("source_branch", ""),
+            "target_branch": state.get("target_branch", ""),
+            "repo_name": state.get("repo_name", ""),
+            "feishu_user_id": state.get("feishu_user_id", "未知"),  # 传递飞书用户ID
+            "feishu_user_name": state.get("feishu_user_name", "未知"),  # 传递飞书用户名
+            "current_stage": "code_analysis",
+        }
+        
+        # 执行子图
+        async with semaphore:
+            print(f"[子PR {i}/{total}] 进入审查子图...")
+            result = await subgraph.ainvoke(subgraph_input)
+        
+        # 收集子PR结果
+        sub_pr_result = {
+            "title": sub_pr.get("title", f"SubPR-{i}"),
+            "module": sub_pr.get("module", "unknown"),
+            "final_decision": result.get("final_decision", "unknown"),
+            "issues": result.get("code_issues", []) + result.get("rule_violations", []),
+            # 详细信息
+            "pr_diff": result.get("pr_diff", ""),
+            "pr_stats": result.get("pr_stats", {}),
+            "changed_files": result.get("changed_files", []),
+            "changed_definitions": result.get("changed_definitions", []),
+            "analysis_conclusion": result.get("analysis_conclusion", {}),
+            "all_collected_context": result.get("all_collected_context", {}),
+            "impact_chain": result.get("impact_chain", []),
+            "code_check_passed": result.get("code_check_passed", False),
+        }
+        
+        print(f"[子PR {i}/{total}] ✓ 处理完成，决策: {sub_pr_result['final_decision']}")
+        return sub_pr_result
+        
+    except Exception as e:
+        print(f"[子PR {i}/{total}] ✗ 处理失败: {str(e)[:100]}")
+        return _sub_pr_error_result(sub_pr, i, e)
+
+
+def _sub_pr_error_result(sub_pr: dict, i: int, error: BaseException) -> dict:
+    """子PR处理失败时的结果"""
+    return {
+        "title": sub_pr.get('title', f'SubPR-{i}'),
+        "module": sub_pr.get("module", "unknown"),
+        "final_decision": "error",
+        "issues": [f"处理异常: {str(error)[:200]}"]
+    }
+
+
 # ============================================================================
 # 构建主工作流图
 # ============================================================================
@@ -0,0 +1,119 @@
+"""
+结果缓存工具
+
+用于缓存确定性计算（依赖分析、LLM规范检查等）的结果：
+内存LRU + 可选的磁盘持久化（diskcache），支持过期时间和命中统计
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# 磁盘缓存（可选依赖，用于跨进程复用结果）
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+
+# 缓存目录位于项目根目录下
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+CACHE_ROOT = os.path.join(_PROJECT_ROOT, '.prmanger_cache')
+
+
+class ResultCache:
+    """线程安全的结果缓存
+
+    每个审查任务在独立线程中运行，因此内存缓存使用线程锁保护；
+    diskcache可用时同时写入磁盘，进程重启后仍可命中。
+    """
+
+    def __init__(self, name: str, maxsize: int = 64, ttl: Optional[float] = None):
+        """
+        Args:
+            name: 缓存名称（同时作为磁盘缓存子目录名）
+            maxsize: 内存中最多保留的条目数
+            ttl: 过期时间（秒），None表示不过期
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._memory: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_initialized = False
+        self.hits = 0
+        self.misses = 0
+
+    def _get_disk(self):
+        """懒加载磁盘缓存（diskcache未安装或初始化失败时返回None）"""
+        if not DISKCACHE_AVAILABLE:
+            return None
+        with self._lock:
+            if not self._disk_initialized:
+                self._disk_initialized = True
+                try:
+                    self._disk = diskcache.Cache(os.path.join(CACHE_ROOT, self.name))
+                except Exception as e:
+                    print(f"[缓存] ⚠️ 磁盘缓存 {self.name} 初始化失败，仅使用内存缓存: {e}")
+                    self._disk = None
+            return self._disk
+
+    def get(self, key: Hashable) -> Any:
+        """读取缓存，未命中或已过期返回None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expire_at = entry
+                if expire_at is None or expire_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+        disk = self._get_disk()
+        if disk is not None:
+            try:
+                value = disk.get(key)
+            except Exception:
+                value = None
+            if value is not None:
+                self._remember(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: Hashable, value: Any):
+        """写入缓存（None值不缓存）"""
+        if value is None:
+            return
+        self._remember(key, value)
+
+        disk = self._get_disk()
+        if disk is not None:
+            try:
+                disk.set(key, value, expire=self.ttl)
+            except Exception:
+                pass
+
+    def _remember(self, key: Hashable, value: Any):
+        """写入内存LRU，超出容量时淘汰最久未使用的条目"""
+        expire_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._memory[key] = (value, expire_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """返回命中统计"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -4,15 +4,42 @@
 """
 
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from queue import Queue, Full
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
 from threading import Lock
 from datetime import datetime
 from typing import Callable, Any, Optional
 from .config import CONFIG
+from .helpers import PR_SIZE_PRIORITY
 from .thread_safe_logger import log_info, log_error, log_warning, set_task_context, clear_task_context
 
 
+# 一次合并分发的最大任务数
+MAX_SUBMIT_BATCH = 128
+
+# 最低优先级（最大PR规模）；未给出优先级的任务按最低优先级排队
+_LOWEST_PRIORITY = max(PR_SIZE_PRIORITY.values())
+
+
+class _WorkerStats:
+    """单个队列处理线程的计数器
+    
+    每个计数器只由所属线程写入，读取时再汇总所有线程，写入路径上没有共享对象和锁
+    """
+    
+    __slots__ = ('started', 'finished', 'processed', 'stolen', 'current')
+    
+    def __init__(self):
+        self.started = 0    # 开始处理数
+        self.finished = 0   # 结束数（含执行异常）
+        self.processed = 0  # 处理完成数
+        self.stolen = 0     # 从其他线程队列窃取的任务数
+        self.current = None  # 正在执行的任务 (开始时间, 任务ID)，空闲时为None；整体替换，读取方无需加锁
+
+
 class ConcurrencyManager:
     """并发控制管理器"""
     
@@ -23,103 +50,232 @@ class ConcurrencyManager:
         self.enabled = concurrency_config.get('enabled', True)
         self.max_workers = concurrency_config.get('max_workers', 4)
         self.max_queue_size = concurrency_config.get('max_queue_size', 10)
+        # 最低优先级任务最多比同时提交的最高优先级任务多等待的时间（秒），防止大PR饿死
+        self.max_delay = concurrency_config.get('max_delay', 600)
+        # 队列已满时提交方最多等待空位的时间（秒），超时才拒绝
+        self.admission_timeout = concurrency_config.get('admission_timeout', 1.0)
+        # 单个任务执行超过该时间（秒）即视为卡住并告警
+        self.watchdog_threshold = concurrency_config.get('watchdog_threshold', 1800)
         
-        # 线程池
-        self.executor = ThreadPoolExecutor(
-            max_workers=self.max_workers,
-            thread_name_prefix="PR_Review_Worker"
-        )
+        # 工作线程：队列处理线程直接执行任务，不再经过额外的线程池
+        self._worker_threads = []
         
-        # 任务队列
-        self.task_queue = Queue(maxsize=self.max_queue_size)
-        
-        # 统计信息
-        self.stats_lock = Lock()
-        self.stats = {
-            'total_received': 0,      # 总接收请求数
-            'total_processed': 0,     # 总处理完成数
-            'total_rejected': 0,      # 总拒绝数（队列满）
-            'current_processing': 0,   # 当前正在处理数
-            'current_queued': 0,       # 当前队列中数量
-        }
+        # 任务队列：每个队列处理线程一个最小堆（各自加锁），提交时轮流分配，避免所有线程争用同一把队列锁。
+        # 堆元素为 (截止时间, 提交序号, 任务)，截止时间 = 提交时间 + max_delay * 优先级 / 最低优先级：
+        # 小PR排在先提交的大PR前面，但大PR最多多等max_delay秒；线程每次取所有堆中截止时间最早的任务
+        self._worker_heaps = [[] for _ in range(self.max_workers)]
+        self._heap_locks = [Lock() for _ in range(self.max_workers)]
+        self._submit_seq = itertools.count()
+        self._wakeup_events = [threading.Event() for _ in range(self.max_workers)]
+        self._idle_workers = [False] * self.max_workers
+        self._rr_counter = itertools.count()  # next()在GIL下是原子操作
+        # 提交暂存区：提交线程只追加任务，由抢到_flush_lock的线程把暂存任务一次性分发到各队列
+        self._staging = deque()  # append/popleft是线程安全的
+        self._flush_lock = Lock()
+        self._stopping = False
+        
+        # 统计信息：全部是只增的计数器，读取时不加锁。提交方的计数器可能被多个线程同时递增，
+        # 用一把小锁保护（提交本身会在准入信号量上等待，不是热点路径）；
+        # 处理方的计数器按线程分片（_WorkerStats）。
+        # 当前排队数 = 已入队 - 已开始，当前处理数 = 已开始 - 已结束
+        self._submit_stats_lock = Lock()
+        self._received = 0   # 总接收请求数
+        self._accepted = 0   # 总入队数
+        self._rejected = 0   # 总拒绝数（队列满）
+        self._worker_stats = [_WorkerStats() for _ in range(self.max_workers)]
+        # 准入信号量：名额 = 排队容量 + 处理线程数，提交时占用，任务执行结束后释放。
+        # 队列满时提交方阻塞等待名额（最多admission_timeout秒），吸收短时突发而不是立即拒绝
+        self._admission = threading.BoundedSemaphore(self.max_queue_size + self.max_workers)
+        
+        # 看门狗：定期检查各线程正在执行的任务，只由看门狗线程写入
+        self._stuck_tasks = 0     # 累计发现的卡住任务数
+        self._current_stuck = 0   # 当前仍卡住的任务数
+        self._watchdog_stop = threading.Event()
         
         # 启动队列处理线程
         if self.enabled:
             self._start_queue_processor()
+            self._start_watchdog()
             log_info(f"[并发控制] 已启用 - 最大并发: {self.max_workers}, 队列容量: {self.max_queue_size}")
         else:
             log_warning("[并发控制] 已禁用 - 无并发限制")
     
     def _start_queue_processor(self):
-        """启动队列处理线程"""
-        def process_queue():
-            """持续处理队列中的任务"""
-            while True:
-                try:
-                    # 从队列获取任务（阻塞等待）
-                    task_info = self.task_queue.get()
-                    
-                    if task_info is None:  # 停止信号
-                        break
-                    
-                    task_func, args, task_id = task_info
-                    
-                    # 更新统计
-                    with self.stats_lock:
-                        self.stats['current_queued'] -= 1
-                        self.stats['current_processing'] += 1
-                    
-                    log_info(f"[并发控制] 开始处理任务 {task_id} (活跃: {self.stats['current_processing']}, 队列: {self.stats['current_queued']})")
-                    
-                    try:
-                        # 设置任务上下文（用于日志前缀）
-                        set_task_context(task_id, task_id.split('_')[0])
-                        
-                        # 提交到线程池执行
-                        future = self.executor.submit(task_func, *args)
-                        future.result()  # 等待完成
-                        
-                        with self.stats_lock:
-                            self.stats['total_processed'] += 1
-                        
-                        log_info(f"[并发控制] 任务 {task_id} 完成")
-                        
-                    except Exception as e:
-                        log_error(f"[并发控制] 任务 {task_id} 执行异常: {str(e)}")
-                        import traceback
-                        traceback.print_exc()
-                    
-                    finally:
-                        # 清除任务上下文
-                        clear_task_context()
-                        
-                        # 更新统计
-                        with self.stats_lock:
-                            self.stats['current_processing'] -= 1
-                        
-                        # 标记任务完成
-                        self.task_queue.task_done()
-                        
-                except Exception as e:
-                    log_error(f"[并发控制] 队列处理异常: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
-        
-        # 使用固定数量的队列处理线程（等于max_workers）
-        import threading
+        """启动队列处理线程（数量等于max_workers，每个线程拥有一个任务队列并直接执行任务）"""
         for i in range(self.max_workers):
             thread = threading.Thread(
-                target=process_queue,
-                name=f"Queue_Processor_{i}",
+                target=self._process_queue,
+                args=(i,),
+                name=f"PR_Review_Worker_{i}",
                 daemon=True
             )
             thread.start()
+            self._worker_threads.append(thread)
+    
+    def _start_watchdog(self):
+        """启动看门狗线程"""
+        thread = threading.Thread(target=self._watchdog_loop, name="Concurrency_Watchdog", daemon=True)
+        thread.start()
+    
+    def _watchdog_loop(self):
+        """定期扫描各线程正在执行的任务，执行时间超过watchdog_threshold的任务告警一次"""
+        interval = min(60, max(1, self.watchdog_threshold / 10))
+        warned = set()  # 已告警的 (线程序号, 开始时间)
+        while not self._watchdog_stop.wait(interval):
+            now = time.monotonic()
+            running = set()
+            current_stuck = 0
+            for index, worker_stats in enumerate(self._worker_stats):
+                current = worker_stats.current
+                if current is None:
+                    continue
+                start, task_id = current
+                key = (index, start)
+                running.add(key)
+                elapsed = now - start
+                if elapsed <= self.watchdog_threshold:
+                    continue
+                current_stuck += 1
+                if key not in warned:
+                    warned.add(key)
+                    self._stuck_tasks += 1
+                    log_warning(f"[并发控制] ⚠️ 任务 {task_id} 已执行 {elapsed:.0f} 秒，可能卡住（线程 {index}）")
+            warned &= running
+            self._current_stuck = current_stuck
+    
+    def _process_queue(self, index: int):
+        """持续处理任务：先取自己队列中的任务，为空时窃取其他队列的任务，都没有时等待唤醒"""
+        wakeup = self._wakeup_events[index]
+        while True:
+            try:
+                task_info = self._take_task(index)
+                if task_info is None:
+                    # 先标记为空闲再检查一遍，保证提交方看到非空闲时任务一定能被这次检查取到
+                    self._idle_workers[index] = True
+                    task_info = self._take_task(index)
+                    if task_info is None:
+                        if self._stopping:  # 停止信号：队列已清空
+                            break
+                        wakeup.wait()
+                        wakeup.clear()
+                    self._idle_workers[index] = False
+                    if task_info is None:
+                        continue
+                
+                self._run_task(task_info, self._worker_stats[index])
+                
+            except Exception as e:
+                log_error(f"[并发控制] 队列处理异常: {str(e)}", exc_info=True)
+    
+    def _take_task(self, index: int) -> Optional[tuple]:
+        """取所有队列中截止时间最早的任务（截止时间相同时优先取自己队列的），取自其他线程队列时记为窃取"""
+        count = self.max_workers
+        while True:
+            best_key = None
+            victim = None
+            for offset in range(count):
+                candidate = (index + offset) % count
+                with self._heap_locks[candidate]:
+                    heap = self._worker_heaps[candidate]
+                    if heap and (best_key is None or heap[0][:2] < best_key):
+                        best_key = heap[0][:2]
+                        victim = candidate
+            if victim is None:
+                return None
+            
+            with self._heap_locks[victim]:
+                heap = self._worker_heaps[victim]
+                # 扫描后堆顶可能已被其他线程取走，此时重新扫描
+                if not heap or heap[0][:2] != best_key:
+                    continue
+                task_info = heapq.heappop(heap)[2]
+            break
+        
+        if victim != index:
+            self._worker_stats[index].stolen += 1
+        return task_info
+    
+    def _run_task(self, task_info: tuple, worker_stats: _WorkerStats):
+        """执行一个任务并更新当前线程的统计"""
+        task_func, args, task_id = task_info
+        
+        # 更新统计
+        worker_stats.started += 1
+        stats = self.get_stats()
+        log_info(f"[并发控制] 开始处理任务 {task_id} (活跃: {stats['current_processing']}, 队列: {stats['current_queued']})")
+        
+        try:
+            # 设置任务上下文（用于日志前缀）
+            set_task_context(task_id, task_id.split('_')[0])
+            
+            # 在当前线程中直接执行（记录开始时间供看门狗检查）
+            worker_stats.current = (time.monotonic(), task_id)
+            task_func(*args)
+            
+            worker_stats.processed += 1
+            
+            log_info(f"[并发控制] 任务 {task_id} 完成")
+            
+        except Exception as e:
+            log_error(f"[并发控制] 任务 {task_id} 执行异常: {str(e)}", exc_info=True)
+        
+        finally:
+            # 清除任务上下文
+            worker_stats.current = None
+            clear_task_context()
+            
+            # 更新统计
+            worker_stats.finished += 1
+            
+            # 归还准入名额
+            self._admission.release()
+    
+    def _enqueue(self, task_info: tuple, priority: int):
+        """把任务放入暂存区并合并分发
+        
+        没有其他线程在分发时立即分发（批大小为1）；有线程正在分发时直接返回，
+        任务由该线程在同一批中分发，提交密集时批自然变大（最多MAX_SUBMIT_BATCH）
+        """
+        deadline = time.monotonic() + self.max_delay * priority / _LOWEST_PRIORITY
+        self._staging.append((deadline, next(self._submit_seq), task_info))
+        
+        # 释放锁后再检查一次暂存区，保证分发期间追加进来的任务不会被遗漏
+        while self._staging and self._flush_lock.acquire(blocking=False):
+            try:
+                self._flush_staging()
+            finally:
+                self._flush_lock.release()
+    
+    def _flush_staging(self):
+        """把暂存区中的任务轮流分到各线程队列：每个队列只加一次锁，每个线程只唤醒一次；
+        收到任务的线程忙碌时再唤醒一个空闲线程来窃取"""
+        batches = {}
+        for _ in range(MAX_SUBMIT_BATCH):
+            try:
+                entry = self._staging.popleft()
+            except IndexError:
+                break
+            index = next(self._rr_counter) % self.max_workers
+            batches.setdefault(index, []).append(entry)
+        
+        for index, entries in batches.items():
+            with self._heap_locks[index]:
+                heap = self._worker_heaps[index]
+                for entry in entries:
+                    heapq.heappush(heap, entry)
+        
+        idle_candidates = [i for i, idle in enumerate(self._idle_workers) if idle and i not in batches]
+        for index in batches:
+            self._wakeup_events[index].set()
+            if not self._idle_workers[index] and idle_candidates:
+                self._wakeup_events[idle_candidates.pop()].set()
     
     def submit_task(
         self,
         task_func: Callable,
         *args,
-        task_name: str = "unnamed_task"
+        task_name: str = "unnamed_task",
+        task_priority: Optional[int] = None
     ) -> tuple[bool, str]:
         """
         提交任务到队列
@@ -128,15 +284,16 @@ class ConcurrencyManager:
             task_func: 任务函数
             *args: 任务函数的参数
             task_name: 任务名称（用于日志）
+            task_priority: 调度优先级（见helpers.PR_SIZE_PRIORITY，small=0 ... xlarge=3），
+                数值越小越先处理；None表示规模未知，按最低优先级排队
         
         Returns:
             (成功标志, 消息)
             - (True, "任务已提交") - 成功
-            - (False, "队列已满") - 队列满
+            - (False, "队列已满") - 队列满且等待admission_timeout秒后仍无空位
         """
         # 如果未启用并发控制，直接在新线程中执行
         if not self.enabled:
-            import threading
             thread = threading.Thread(target=task_func, args=args)
             thread.start()
             return True, "任务已提交（无并发限制）"
@@ -145,36 +302,51 @@ class ConcurrencyManager:
         task_id = f"{task_name}_{datetime.now().strftime('%H%M%S_%f')}"
         
         # 更新统计
-        with self.stats_lock:
-            self.stats['total_received'] += 1
+        with self._submit_stats_lock:
+            self._received += 1
         
-        # 尝试将任务加入队列
-        try:
-            self.task_queue.put_nowait((task_func, args, task_id))
-            
-            with self.stats_lock:
-                self.stats['current_queued'] += 1
-            
-            current_queue = self.stats['current_queued']
-            current_processing = self.stats['current_processing']
-            
-            log_info(f"[并发控制] 任务 {task_id} 已加入队列 (活跃: {current_processing}/{self.max_workers}, 队列: {current_queue}/{self.max_queue_size})")
-            
-            return True, f"任务已加入队列 (位置: {current_queue}/{self.max_queue_size})"
-            
-        except Full:
-            # 队列已满
-            with self.stats_lock:
-                self.stats['total_rejected'] += 1
-            
-            log_warning(f"[并发控制] 任务 {task_id} 被拒绝 - 队列已满")
+        # 申请准入名额：队列满时等待正在处理的任务结束，超时仍无名额才拒绝
+        if not self._admission.acquire(timeout=self.admission_timeout):
+            with self._submit_stats_lock:
+                self._rejected += 1
+            log_warning(f"[并发控制] 任务 {task_id} 被拒绝 - 队列已满（等待{self.admission_timeout}秒无空位）")
             
             return False, "系统繁忙，队列已满"
+        with self._submit_stats_lock:
+            self._accepted += 1
+        
+        if task_priority is None:
+            task_priority = _LOWEST_PRIORITY
+        task_priority = min(max(task_priority, 0), _LOWEST_PRIORITY)
+        self._enqueue((task_func, args, task_id), task_priority)
+        
+        stats = self.get_stats()
+        current_queue = stats['current_queued']
+        current_processing = stats['current_processing']
+        log_info(f"[并发控制] 任务 {task_id} 已加入队列 (优先级: {task_priority}, 活跃: {current_processing}/{self.max_workers}, 队列: {current_queue}/{self.max_queue_size})")
+        
+        return True, f"任务已加入队列 (位置: {current_queue}/{self.max_queue_size})"
     
     def get_stats(self) -> dict:
-        """获取统计信息"""
-        with self.stats_lock:
-            return self.stats.copy()
+        """获取统计信息（不加锁）
+        
+        先读后发生的计数器再读先发生的（结束 -> 开始 -> 入队），差值不会出现负数
+        """
+        worker_stats = self._worker_stats
+        finished = sum(stats.finished for stats in worker_stats)
+        processed = sum(stats.processed for stats in worker_stats)
+        started = sum(stats.started for stats in worker_stats)
+        accepted = self._accepted
+        return {
+            'total_received': self._received,
+            'total_processed': processed,
+            'total_rejected': self._rejected,
+            'total_stolen': sum(stats.stolen for stats in worker_stats),
+            'current_processing': started - finished,
+            'current_queued': accepted - started,
+            'stuck_tasks': self._stuck_tasks,
+            'current_stuck': self._current_stuck,
+        }
     
     def get_status_message(self) -> str:
         """获取状态消息（用于显示）"""
@@ -192,6 +364,7 @@ class ConcurrencyManager:
             f"📈 总接收: {stats['total_received']}\n"
             f"✅ 已完成: {stats['total_processed']}\n"
             f"❌ 已拒绝: {stats['total_rejected']}"
+            + (f"\n⚠️ 疑似卡住: {stats['current_stuck']}（超过{self.watchdog_threshold}秒）" if stats['current_stuck'] else "")
         )
     
     def shutdown(self, wait: bool = True):
@@ -199,12 +372,16 @@ class ConcurrencyManager:
         log_info("[并发控制] 正在关闭...")
         
         if self.enabled:
-            # 发送停止信号
-            for _ in range(self.max_workers):
-                self.task_queue.put(None)
+            # 发送停止信号：队列处理线程处理完剩余任务后退出
+            self._stopping = True
+            self._watchdog_stop.set()
+            for event in self._wakeup_events:
+                event.set()
         
-        # 关闭线程池
-        self.executor.shutdown(wait=wait)
+        # 等待队列处理线程处理完剩余任务
+        if wait:
+            for thread in self._worker_threads:
+                thread.join()
         log_info("[并发控制] 已关闭")
 
 
@@ -3,18 +3,49 @@
 """
 
 import os
+import threading
 import yaml
 
+# libyaml C解析器（可选，比纯Python的SafeLoader快数倍）
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+
+# 已解析的YAML文件：路径 -> (修改时间ns, 解析结果)
+_yaml_cache = {}
+_yaml_cache_lock = threading.Lock()
+
+
+def _load_yaml_cached(path: str):
+    """读取并解析YAML文件，文件修改时间未变时直接返回上次的解析结果
+    
+    返回的对象在调用方之间共享，调用方不要修改。
+    文件不存在时抛出FileNotFoundError。
+    """
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _yaml_cache_lock:
+        cached = _yaml_cache.get(path)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        data = yaml.load(f, Loader=_YamlLoader)
+    
+    with _yaml_cache_lock:
+        _yaml_cache[path] = (mtime_ns, data)
+    return data
+
 
 def load_config():
-    """从config.yaml加载配置"""
+    """从config.yaml加载配置（按文件修改时间缓存）"""
     # 配置文件在项目根目录的config文件夹中
     project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
     config_path = os.path.join(project_root, 'config', 'config.yaml')
     
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+        return _load_yaml_cached(config_path)
     except FileNotFoundError:
         print(f"[ERROR] 配置文件未找到: {config_path}")
         raise
@@ -24,14 +55,13 @@ def load_config():
 
 
 def load_code_rules():
-    """从YAML配置文件加载代码规范"""
+    """从YAML配置文件加载代码规范（按文件修改时间缓存）"""
     project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
     config_path = os.path.join(project_root, 'config', 'code_rules.yaml')
     
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-            return config.get('规范列表', [])
+        config = _load_yaml_cached(config_path)
+        return config.get('规范列表', [])
     except FileNotFoundError:
         print(f"[WARNING] 未找到代码规范配置文件: {config_path}")
         return []
@@ -16,34 +16,48 @@ def _get_pr_size_thresholds() -> Dict:
     })
 
 
-def calculate_pr_size(pr_diff: str, pr_files: List[Dict]) -> Tuple[str, Dict]:
-    """计算PR规模（从配置读取阈值）"""
-    files_count = len(pr_files) if isinstance(pr_files, list) else 0
-    diff_size = len(pr_diff) if pr_diff else 0
-    
-    lines_added = 0
-    lines_deleted = 0
-    if pr_diff:
-        for line in pr_diff.split('\n'):
-            if line.startswith('+') and not line.startswith('+++'):
-                lines_added += 1
-            elif line.startswith('-') and not line.startswith('---'):
-                lines_deleted += 1
-    
-    lines_changed = lines_added + lines_deleted
+# PR规模对应的调度优先级（数值越小越先处理）
+PR_SIZE_PRIORITY = {'small': 0, 'medium': 1, 'large': 2, 'xlarge': 3}
+
+
+def classify_pr_size(files_count: int, lines_changed: int, diff_size: int = 0) -> str:
+    """按配置阈值把PR归入 small/medium/large/xlarge
     
-    # 从配置读取阈值
+    diff_size未知时传0，只按文件数和修改行数判断
+    """
     pr_size_thresholds = _get_pr_size_thresholds()
     
-    pr_size = 'xlarge'
-    
     for size_name in ['small', 'medium', 'large']:
         thresholds = pr_size_thresholds.get(size_name, {})
         if (files_count <= thresholds.get('files', 0) and 
             lines_changed <= thresholds.get('lines', 0) and 
             diff_size <= thresholds.get('diff_size', 0)):
-            pr_size = size_name
-            break
+            return size_name
+    
+    return 'xlarge'
+
+
+def count_diff_lines(diff: str) -> Tuple[int, int]:
+    """统计diff的新增行数和删除行数（不计 +++/--- 文件头）
+    
+    行首即字符串开头或换行符之后，因此"以+开头的行数"等于开头是否为+加上"\\n+"的出现次数；
+    用str.count在C层完成统计，不切分行列表
+    """
+    lines_added = (diff.count('\n+') + diff.startswith('+')) - (diff.count('\n+++') + diff.startswith('+++'))
+    lines_deleted = (diff.count('\n-') + diff.startswith('-')) - (diff.count('\n---') + diff.startswith('---'))
+    return lines_added, lines_deleted
+
+
+def calculate_pr_size(pr_diff: str, pr_files: List[Dict]) -> Tuple[str, Dict]:
+    """计算PR规模（从配置读取阈值）"""
+    files_count = len(pr_files) if isinstance(pr_files, list) else 0
+    diff_size = len(pr_diff) if pr_diff else 0
+    
+    lines_added, lines_deleted = count_diff_lines(pr_diff) if pr_diff else (0, 0)
+    
+    lines_changed = lines_added + lines_deleted
+    
+    pr_size = classify_pr_size(files_count, lines_changed, diff_size)
     
     pr_stats = {
         'files_count': files_count,
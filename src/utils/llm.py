@@ -7,10 +7,20 @@ from langchain_core.messages import SystemMessage, HumanMessage
 from .config import CONFIG
 import json
 import asyncio
+import itertools
+import threading
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 import os
 
+# 高性能JSON解析（可选依赖）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 
 # LLM配置
 OLLAMA_MODEL = CONFIG['llm']['model']
@@ -38,13 +48,62 @@ if DEBUG_SHOW_LLM_RESPONSE:
 
 llm = ChatOllama(**llm_kwargs)
 
+# Ollama并行槽位数（应与服务端 OLLAMA_NUM_PARALLEL 保持一致）
+LLM_NUM_PARALLEL = max(1, int(CONFIG['llm'].get('num_parallel', 4)))
+
+
+class LLMDispatcher:
+    """进程级LLM请求分发器
+
+    每个审查任务在独立线程的事件循环中运行。所有LLM请求统一交给一个专用分发线程，
+    在它的事件循环里通过 llm.ainvoke 异步发送：整个进程只有一个异步HTTP客户端，
+    各审查任务和重试之间复用已建立的连接，也不再为每次调用占用一个线程。
+    同时在途的请求数不超过并行槽位数，恰好填满Ollama的并行批处理，其余请求在本地按FIFO排队；
+    调用方超时后请求被取消，排队中的请求不再发送，已发送的请求断开连接。
+    """
+
+    def __init__(self, max_parallel: int):
+        self.max_parallel = max_parallel
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        """懒加载分发线程及其事件循环"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(self.max_parallel)
+                thread = threading.Thread(target=loop.run_forever, name="LLM_Dispatcher", daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    async def _invoke(self, conversation: List):
+        """在分发线程的事件循环中执行，占用一个并行槽位发送请求"""
+        async with self._semaphore:
+            return await llm.ainvoke(conversation)
+
+    async def submit(self, conversation: List, timeout: float):
+        """提交一次LLM调用并等待结果，超时抛出asyncio.TimeoutError"""
+        # 传入对话快照，避免调用方在超时后追加消息影响仍在执行的请求
+        future = asyncio.run_coroutine_threadsafe(self._invoke(list(conversation)), self._get_loop())
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+
+
+llm_dispatcher = LLMDispatcher(LLM_NUM_PARALLEL)
+
 
 class LLMResponseParser:
     """LLM响应解析器"""
     
-    # 添加调用追踪，防止重复日志输出
-    _call_tracking = {}
-    _lock = asyncio.Lock()
+    # 添加调用追踪，防止重复日志输出：键 -> 上次打印时间，超出容量时淘汰最久未打印的键
+    _call_tracking: "OrderedDict[str, float]" = OrderedDict()
+    _MAX_TRACK = 256
+    # 各审查任务运行在不同线程的事件循环中，使用线程锁而不是asyncio.Lock
+    _lock = threading.Lock()
+    # 调用ID计数器（next()在GIL下是原子操作）
+    _id_counter = itertools.count()
     
     @staticmethod
     async def parse_json_with_retry(
@@ -71,34 +130,35 @@ class LLMResponseParser:
         """
         
         # 生成唯一的调用ID来追踪
-        import hashlib
-        call_id = hashlib.md5(f"{parser_name}_{id(conversation)}_{datetime.now().timestamp()}".encode()).hexdigest()[:8]
+        call_id = format(next(LLMResponseParser._id_counter) & 0xFFFFFFFF, '08x')
+        
+        # 必需字段集合和字段列表文本只构建一次，各次重试复用
+        expected_keys = frozenset(expected_schema)
+        expected_keys_text = str(list(expected_schema))
         
         for attempt in range(max_retries):
             try:
-                # 使用锁防止并发打印
-                async with LLMResponseParser._lock:
-                    # 检查是否最近已经打印过（1秒内）
-                    now = datetime.now().timestamp()
-                    last_print_key = f"{parser_name}_{attempt}"
-                    last_print_time = LLMResponseParser._call_tracking.get(last_print_key, 0)
-                    
-                    # 只有距离上次打印超过1秒才打印
-                    if now - last_print_time > 1.0:
-                        print(f"[{parser_name}] 🔄 尝试 {attempt + 1}/{max_retries}，请求LLM中... (ID:{call_id})")
-                        LLMResponseParser._call_tracking[last_print_key] = now
+                # 使用锁防止并发打印；锁被占用说明其他调用正在打印，直接跳过而不排队等待
+                if LLMResponseParser._lock.acquire(blocking=False):
+                    try:
+                        # 检查是否最近已经打印过（1秒内）
+                        tracking = LLMResponseParser._call_tracking
+                        now = datetime.now().timestamp()
+                        last_print_key = f"{parser_name}_{attempt}"
+                        last_print_time = tracking.get(last_print_key, 0)
                         
-                        # 清理过期的追踪记录（超过10秒）
-                        LLMResponseParser._call_tracking = {
-                            k: v for k, v in LLMResponseParser._call_tracking.items()
-                            if now - v < 10
-                        }
+                        # 只有距离上次打印超过1秒才打印
+                        if now - last_print_time > 1.0:
+                            print(f"[{parser_name}] 🔄 尝试 {attempt + 1}/{max_retries}，请求LLM中... (ID:{call_id})")
+                            tracking[last_print_key] = now
+                            tracking.move_to_end(last_print_key)
+                            while len(tracking) > LLMResponseParser._MAX_TRACK:
+                                tracking.popitem(last=False)
+                    finally:
+                        LLMResponseParser._lock.release()
                 
-                # 调用LLM（使用JSON格式），添加超时处理
-                response = await asyncio.wait_for(
-                    asyncio.to_thread(llm.invoke, conversation),
-                    timeout=timeout
-                )
+                # 调用LLM（使用JSON格式），经共享分发器排队并添加超时处理
+                response = await llm_dispatcher.submit(conversation, timeout=timeout)
                 response_text = response.content
                 
                 # 提取token使用信息
@@ -147,7 +207,7 @@ class LLMResponseParser:
                 
                 # 尝试解析JSON
                 try:
-                    result = json.loads(response_text)
+                    result = LLMResponseParser._loads_json(response_text)
                     print(f"[{parser_name}] 📝 JSON解析成功，验证schema中...")
                     
                     # 验证schema - 优先使用自定义验证器
@@ -159,16 +219,16 @@ class LLMResponseParser:
                             print(f"[{parser_name}] ⚠️ 自定义验证失败")
                             print(f"[{parser_name}] 实际字段: {list(result.keys())}")
                             error_msg = "JSON结构不符合自定义验证规则"
-                    elif LLMResponseParser._validate_schema(result, expected_schema):
+                    elif LLMResponseParser._validate_schema(result, expected_keys):
                         print(f"[{parser_name}] ✅ Schema验证通过，解析完成！")
                         return result
                     else:
                         print(f"[{parser_name}] ⚠️ Schema验证失败")
-                        print(f"[{parser_name}] 期望字段: {list(expected_schema.keys())}")
-                        print(f"[{parser_name}] 实际字段: {list(result.keys())}")
+                        print(f"[{parser_name}] 期望字段: {expected_keys_text}")
+                        print(f"[{parser_name}] 实际字段: {list(result) if isinstance(result, dict) else type(result).__name__}")
                         error_msg = "JSON结构不符合预期schema"
                         
-                except json.JSONDecodeError as e:
+                except ValueError as e:
                     print(f"[{parser_name}] ⚠️ JSON解析失败: {str(e)}")
                     print(f"[{parser_name}] 响应前200字符: {response_text[:200]}...")
                     error_msg = f"JSON格式错误: {str(e)}"
@@ -193,7 +253,7 @@ class LLMResponseParser:
 1. 只输出纯JSON，不要添加任何解释文字
 2. 不要使用markdown代码块标记（如 ```json）
 3. 确保JSON格式完全正确（双引号、逗号、括号匹配）
-4. 必须包含以下字段：{list(expected_schema.keys())}
+4. 必须包含以下字段：{expected_keys_text}
 
 请重新输出：
 """))
@@ -230,14 +290,47 @@ class LLMResponseParser:
         return None
     
     @staticmethod
-    def _validate_schema(data: Dict[str, Any], schema: Dict[str, Any]) -> bool:
-        """验证JSON是否符合schema"""
-        # 简单验证：检查必需字段是否存在
-        for key in schema.keys():
-            if key not in data:
-                print(f"缺少字段: {key}")
-                return False
-        return True
+    def _loads_json(text: str) -> Any:
+        """解析JSON（优先使用orjson）
+        
+        直接解析失败时，先去掉markdown代码块标记（```json ... ```）再解析一次，
+        避免因格式包装触发完整的LLM重试。解析失败抛出ValueError。
+        """
+        loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+        try:
+            return loads(text)
+        except ValueError:
+            stripped = LLMResponseParser._strip_code_fence(text)
+            if stripped == text:
+                raise
+            return loads(stripped)
+    
+    @staticmethod
+    def _strip_code_fence(text: str) -> str:
+        """去掉响应首尾的markdown代码块标记"""
+        stripped = text.strip()
+        if not stripped.startswith('```'):
+            return text
+        # 去掉首行的 ``` 或 ```json
+        first_newline = stripped.find('\n')
+        if first_newline == -1:
+            return text
+        stripped = stripped[first_newline + 1:]
+        if stripped.rstrip().endswith('```'):
+            stripped = stripped.rstrip()[:-3]
+        return stripped.strip()
+    
+    @staticmethod
+    def _validate_schema(data: Dict[str, Any], expected_keys: frozenset) -> bool:
+        """验证JSON是否包含全部必需字段"""
+        # 简单验证：必需字段是否为顶层字段的子集（集合运算在C层完成）
+        if not isinstance(data, dict):
+            print(f"JSON顶层不是对象: {type(data).__name__}")
+            return False
+        if expected_keys <= data.keys():
+            return True
+        print(f"缺少字段: {', '.join(sorted(expected_keys - data.keys()))}")
+        return False
     
     @staticmethod
     def _log_parse_failure(
@@ -4,6 +4,7 @@
 """
 
 import threading
+import traceback
 from typing import Optional
 from datetime import datetime
 import sys
@@ -14,8 +15,8 @@ class ThreadSafeLogger:
     
     def __init__(self):
         """初始化线程安全日志记录器"""
-        self._lock = threading.Lock()
-        self._task_contexts = {}  # {thread_id: task_info}
+        self._lock = threading.Lock()  # 只保护写出和刷新
+        self._tls = threading.local()  # 每个线程自己的任务上下文
         
     def set_task_context(self, task_id: str, task_name: str):
         """
@@ -25,52 +26,70 @@ class ThreadSafeLogger:
             task_id: 任务ID
             task_name: 任务名称
         """
-        thread_id = threading.get_ident()
-        self._task_contexts[thread_id] = {
-            'task_id': task_id,
-            'task_name': task_name,
-            'start_time': datetime.now()
-        }
+        tls = self._tls
+        tls.task_id = task_id
+        tls.task_name = task_name
+        tls.start_time = datetime.now()
+        tls.prefix = f"[{task_name}]"  # 预先格式化，输出日志时直接使用
     
     def clear_task_context(self):
         """清除当前线程的任务上下文"""
-        thread_id = threading.get_ident()
-        if thread_id in self._task_contexts:
-            del self._task_contexts[thread_id]
+        self._tls.__dict__.clear()
     
     def _get_task_prefix(self) -> str:
         """获取当前线程的任务前缀"""
-        thread_id = threading.get_ident()
-        if thread_id in self._task_contexts:
-            ctx = self._task_contexts[thread_id]
-            return f"[{ctx['task_name']}]"
-        return ""
+        return getattr(self._tls, 'prefix', '')
     
-    def log(self, *args, level: str = "INFO", sep: str = " ", end: str = "\n", **kwargs):
+    def _build_prefix(self) -> str:
+        """构建日志前缀：[时间] [线程名] [任务名]"""
+        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        thread_name = threading.current_thread().name
+        task_prefix = self._get_task_prefix()
+        
+        prefix_parts = [f"[{timestamp}]", f"[{thread_name}]"]
+        if task_prefix:
+            prefix_parts.append(task_prefix)
+        return " ".join(prefix_parts) + " "
+    
+    def _write(self, text: str, stream=None):
+        """整段写出并刷新（加锁保证不被其他线程的输出打断）
+        
+        在调用线程中同步写出：代码中大量直接print()到同一输出流，
+        同一线程的日志和print输出必须保持调用顺序
+        """
+        stream = stream or sys.stdout
+        with self._lock:
+            stream.write(text)
+            stream.flush()
+    
+    def log(
+        self,
+        *args,
+        level: str = "INFO",
+        sep: Optional[str] = " ",
+        end: Optional[str] = "\n",
+        file=None,
+        flush: bool = False,
+        exc_info: bool = False
+    ):
         """
         线程安全的日志输出
         
         Args:
             *args: 要打印的内容
             level: 日志级别
-            sep: 分隔符
-            end: 结束符
+            sep: 分隔符（同print）
+            end: 结束符（同print）
+            file: 输出流，默认sys.stdout（同print）
+            flush: 同print（每条日志写出后总会刷新输出流）
+            exc_info: 为True时在日志后附上当前正在处理的异常堆栈
         """
-        with self._lock:
-            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-            thread_name = threading.current_thread().name
-            task_prefix = self._get_task_prefix()
-            
-            # 构建前缀
-            prefix_parts = [f"[{timestamp}]", f"[{thread_name}]"]
-            if task_prefix:
-                prefix_parts.append(task_prefix)
-            prefix = " ".join(prefix_parts) + " "
-            
-            # 输出日志
-            message = sep.join(str(arg) for arg in args)
-            print(prefix + message, end=end, **kwargs)
-            sys.stdout.flush()
+        # 在锁外拼好整行，锁内只做写出
+        message = (" " if sep is None else sep).join(str(arg) for arg in args)
+        text = self._build_prefix() + message + ("\n" if end is None else end)
+        if exc_info:
+            text += traceback.format_exc()
+        self._write(text, file)
     
     def info(self, *args, **kwargs):
         """INFO级别日志"""
@@ -96,12 +115,11 @@ class ThreadSafeLogger:
             title: 标题
             width: 宽度
         """
-        with self._lock:
-            print("=" * width)
-            if title:
-                print(title.center(width))
-                print("=" * width)
-            sys.stdout.flush()
+        separator = "=" * width + "\n"
+        text = separator
+        if title:
+            text += title.center(width) + "\n" + separator
+        self._write(text)
     
     def print_multiline(self, *lines: str):
         """
@@ -110,19 +128,8 @@ class ThreadSafeLogger:
         Args:
             *lines: 多行文本
         """
-        with self._lock:
-            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-            thread_name = threading.current_thread().name
-            task_prefix = self._get_task_prefix()
-            
-            prefix_parts = [f"[{timestamp}]", f"[{thread_name}]"]
-            if task_prefix:
-                prefix_parts.append(task_prefix)
-            prefix = " ".join(prefix_parts) + " "
-            
-            for line in lines:
-                print(prefix + line)
-            sys.stdout.flush()
+        prefix = self._build_prefix()
+        self._write("".join(prefix + line + "\n" for line in lines))
 
 
 # 全局单例
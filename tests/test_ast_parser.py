@@ -0,0 +1,110 @@
+"""ASTParser 测试"""
+
+import pytest
+
+from src.analyzers.project_analyzer import ast_parser
+from src.analyzers.project_analyzer.ast_parser import ASTParser
+
+
+pytestmark = pytest.mark.skipif(not ast_parser.TREE_SITTER_AVAILABLE, reason='需要tree-sitter')
+
+
+# 各语言样例：函数体内的定义统一以nested开头，仅签名模式下应被跳过
+SAMPLES = {
+    'sample.py': (
+        "class Svc:\n"
+        "    def run(self, a):\n"
+        "        def nested_helper():\n"
+        "            pass\n"
+        "        return a\n"
+        "\n"
+        "def add(a, b):\n"
+        "    class nested_Local:\n"
+        "        pass\n"
+        "    return a + b\n"
+    ),
+    'sample.js': (
+        "class K {\n"
+        "  m(a) { function nested_inner() {} return a; }\n"
+        "}\n"
+        "function top(x) { return x; }\n"
+    ),
+    'sample.ts': (
+        "class Svc {\n"
+        "  constructor(private x: number) { this.x = x; }\n"
+        "  run(a: string): void { function nested_log() {} console.log(a); }\n"
+        "}\n"
+        "function add(a: number, b: number): number { return a + b; }\n"
+        "interface I { f(): void; }\n"
+    ),
+    'Sample.java': (
+        "class Svc {\n"
+        "  int run(int a) { class nested_Local {} return a; }\n"
+        "}\n"
+        "interface I { void f(); }\n"
+    ),
+    'sample.go': (
+        "package main\n"
+        "type Svc struct { x int }\n"
+        "func (s *Svc) Run(a int) int { return a }\n"
+        "func add(a int, b int) int { return a + b }\n"
+    ),
+    'sample.cpp': (
+        "class Svc { int x; };\n"
+        "struct P { int y; };\n"
+        "int add(int a, int b) { struct nested_T { int z; }; return a + b; }\n"
+    ),
+    'Sample.cs': (
+        "class Svc {\n"
+        "  int Run(int a) { return a; }\n"
+        "}\n"
+        "interface I { void F(); }\n"
+    ),
+}
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """每个测试使用独立的AST缓存文件"""
+    monkeypatch.setattr(ast_parser, '_ast_cache_db', ast_parser._ASTCacheDB(str(tmp_path / 'ast.sqlite')))
+
+
+@pytest.mark.parametrize('filename', sorted(SAMPLES))
+def test_signatures_only_keeps_top_level_definitions(tmp_path, filename):
+    """仅签名模式提取的定义 == 完整模式中不在函数体内的定义"""
+    source = tmp_path / filename
+    source.write_text(SAMPLES[filename], encoding='utf-8')
+    parser = ASTParser()
+
+    full = [(n.type, n.name, n.line_number) for n in parser.parse_file(str(source))]
+    signatures = [(n.type, n.name, n.line_number) for n in parser.parse_file(str(source), signatures_only=True)]
+
+    assert len(full) >= 2
+    assert signatures == [item for item in full if not item[1].startswith('nested')]
+
+
+@pytest.mark.parametrize('filename, source, expected', [
+    ('cmp.py', "def f(a=x<y, b=1, c=z>w):\n    pass\n", ['a', 'b', 'c']),
+    ('quoted.py', "def f(self, a, b: str = \"x,y\", c='(', d=None):\n    pass\n", ['a', 'b', 'c', 'd']),
+    ('quoted.js', "function f(a = 'x,y', b = `(${c})`, d) {}\n", ['a', 'b', 'd']),
+    ('Generic.java', "class G { void f(Map<String, Integer> m, String s) {} }\n", ['Map<String, Integer> m', 'String s']),
+    ('generic.ts', "function f(m: Map<string, number>, s = \"a,b\") {}\n", ['m', 's']),
+])
+def test_extract_params(tmp_path, filename, source, expected):
+    """参数按顶层逗号切分：只有泛型语言把<>当作括号，字符串内的逗号和括号不切分"""
+    path = tmp_path / filename
+    path.write_text(source, encoding='utf-8')
+    nodes = [n for n in ASTParser().parse_file(str(path)) if n.params is not None]
+    assert nodes[0].params == expected
+
+
+def test_cache_db_keeps_one_row_per_path(tmp_path):
+    """同一路径内容变化后只保留最新哈希的记录"""
+    db = ast_parser._ASTCacheDB(str(tmp_path / 'cache.sqlite'))
+    db.put('/repo/a.py', b'old', [{'name': 'f'}])
+    db.put('/repo/a.py', b'new', [{'name': 'g'}])
+    
+    assert db.get('/repo/a.py', b'old') is None
+    assert db.get('/repo/a.py', b'new') == [{'name': 'g'}]
+    rows = db._conn.execute(f"SELECT COUNT(*) FROM {db._table}").fetchone()[0]
+    assert rows == 1
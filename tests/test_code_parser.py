@@ -0,0 +1,96 @@
+"""CodeParser 测试"""
+
+from pathlib import Path
+
+import pytest
+
+from src.analyzers.project_analyzer import code_parser
+from src.analyzers.project_analyzer.code_parser import CodeParser
+
+
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+
+
+def _parse_all(files):
+    parser = CodeParser()
+    return [
+        (d.file_path, d.line_number, d.type, d.name, d.line_content)
+        for path in files
+        for d in parser.parse_file(str(path))
+    ]
+
+
+def test_hyperscan_prefilter_matches_plain_regex(monkeypatch):
+    """Hyperscan预筛选与不使用Hyperscan时的解析结果完全一致"""
+    pytest.importorskip('hyperscan')
+    files = sorted(SRC_DIR.rglob('*.py'))
+    
+    monkeypatch.setattr(code_parser, 'HYPERSCAN_AVAILABLE', True)
+    with_hyperscan = _parse_all(files)
+    monkeypatch.setattr(code_parser, 'HYPERSCAN_AVAILABLE', False)
+    without_hyperscan = _parse_all(files)
+    
+    assert with_hyperscan == without_hyperscan
+
+
+def test_method_after_blank_line(tmp_path, monkeypatch):
+    """空行之后的缩进方法定义不能被漏掉（\\s 不能跨行匹配）"""
+    source = tmp_path / 'sample.py'
+    source.write_text("class A:\n\n    def first(self):\n        pass\n\n\n    def second(self):\n        pass\n",
+                      encoding='utf-8')
+    
+    for available in (False, True):
+        if available:
+            pytest.importorskip('hyperscan')
+        monkeypatch.setattr(code_parser, 'HYPERSCAN_AVAILABLE', available)
+        names = [(d.name, d.line_number) for d in CodeParser().parse_file(str(source))]
+        assert names == [('A', 1), ('first', 3), ('second', 7)]
+
+
+def test_keyword_prefilter_matches_full_scan(monkeypatch):
+    """关键字预筛选与对全文finditer的解析结果完全一致"""
+    monkeypatch.setattr(code_parser, 'HYPERSCAN_AVAILABLE', False)
+    files = sorted(SRC_DIR.rglob('*.py'))
+    with_prefilter = _parse_all(files)
+    monkeypatch.setattr(code_parser, '_KEYWORD_PREFILTERS', {})
+    full_scan = _parse_all(files)
+    
+    assert with_prefilter == full_scan
+
+
+# 各语言样例（含空行、缩进、同一行多处可匹配等情况）
+LANGUAGE_SAMPLES = {
+    'python': ('sample.py', "class A:\n\n    def f(self):\n        pass\n\nasync def g():\n    pass\ndef h(): pass\n"),
+    'javascript': ('sample.js', "class A {}\n\nfunction f() {}\nconst g = (x) => x;\nexport function h() {}\nexport class B {}\n"),
+    'typescript': ('sample.ts', "interface I {}\ntype T = string;\n\nexport interface J {}\nconst g = (x) => x;\nclass C {}\n"),
+    'java': ('Sample.java', "public class A {\n\n    public void run() {\n    }\n    public int size(int n) { return n; }\n}\npublic interface I {}\n"),
+    'go': ('sample.go', "package main\n\ntype S struct {\n}\n\nfunc f() {}\nfunc (s *S) M() {}\n"),
+    'cpp': ('sample.cpp', "namespace ns {\ntemplate <typename T> class Box {};\nstruct P {};\nenum class E { A };\n"
+                          "int add(int a, int b) {\n  return a + b;\n}\nclass C {\n    int get(int x) const {\n    }\n};\n"),
+    'csharp': ('Sample.cs', "namespace App.Core\n{\n    public class Svc\n    {\n        public int Count { get; set; }\n\n"
+                            "        public async Task<int> Run(int a)\n        {\n        }\n    }\n    internal enum E { A }\n}\n"),
+}
+
+
+@pytest.mark.parametrize('language', sorted(CodeParser.PATTERNS))
+def test_hyperscan_database_compiles(language):
+    """每种语言的Hyperscan数据库都能编译（不能因模式集过大退回正则）"""
+    pytest.importorskip('hyperscan')
+    assert code_parser._get_hyperscan_db(language) is not None
+
+
+@pytest.mark.parametrize('language', sorted(CodeParser.PATTERNS))
+def test_hyperscan_matches_plain_regex_per_language(language, tmp_path, monkeypatch):
+    """各语言样例在Hyperscan预筛选与不使用Hyperscan时解析结果一致"""
+    pytest.importorskip('hyperscan')
+    filename, text = LANGUAGE_SAMPLES[language]
+    source = tmp_path / filename
+    source.write_text(text, encoding='utf-8')
+    
+    monkeypatch.setattr(code_parser, 'HYPERSCAN_AVAILABLE', True)
+    with_hyperscan = _parse_all([source])
+    monkeypatch.setattr(code_parser, 'HYPERSCAN_AVAILABLE', False)
+    without_hyperscan = _parse_all([source])
+    
+    assert with_hyperscan
+    assert with_hyperscan == without_hyperscan
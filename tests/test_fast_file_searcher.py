@@ -0,0 +1,47 @@
+"""FastFileSearcher 文本匹配测试"""
+
+import os
+import re
+from pathlib import Path
+
+import pytest
+
+from src.analyzers.project_analyzer import fast_file_searcher
+from src.analyzers.project_analyzer.fast_file_searcher import (
+    _compile_union, _is_line_local, _match_lines, _match_lines_per_line,
+)
+
+
+CONTENT = "def a():\n    x = 1\n\nclass B:\n  a b\n  y\tz = a\nb = 2\nend"
+
+REGEXES = [
+    r'(?ms)a.b', r'(?s:a.b)', r'a[\x00-\x20]b', r'a\sb', r'[^x]\n', r'1\W', r'\Aclass', r'end\Z',
+    r'a.b', r'^class \w+', r'x = \d$', r'\bB\b', r'[^\n]+:', r'(?x) y \t z',
+]
+
+
+@pytest.mark.parametrize('regex', REGEXES)
+def test_match_lines_equals_per_line(regex):
+    """全文匹配与逐行 pattern.search(line) 的结果一致"""
+    expected = _match_lines_per_line(CONTENT, re.compile(regex), 100, 1)
+    assert _match_lines(CONTENT, regex, 100, 1) == expected
+
+
+@pytest.mark.parametrize('regex', [r'(?ms)a.b', r'(?s:a.b)', r'a[\x00-\x20]b', r'[^x]', r'\N{LINE FEED}', r'(?'])
+def test_cross_line_regex_not_line_local(regex):
+    assert not _is_line_local(regex)
+    assert _compile_union((regex, 'def')) is None
+
+
+def test_small_tree_scans_without_process_pool(monkeypatch):
+    """候选文件总量小于阈值时直接顺序扫描，不启动进程池"""
+    def no_pool():
+        raise AssertionError('不应启动进程池')
+    
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+    monkeypatch.setattr(fast_file_searcher, '_get_process_pool', no_pool)
+    searcher = fast_file_searcher.FastFileSearcher()
+    src_dir = str(Path(__file__).resolve().parent.parent / 'src')
+    
+    results = searcher._search_group_with_python(src_dir, [r'def \w+', r'^import os$'], '*.py')
+    assert results[0] and results[1]
@@ -0,0 +1,20 @@
+"""Git审查智能体 diff截取测试"""
+
+from src.agents.git_review_agent import _salient_diff_slice
+
+
+DIFF = "diff --git a/x.py b/x.py\n@@ -1,2 +1,2 @@\n+名称 = 1\n+value = 2\n"
+
+
+def test_fallback_cuts_at_line_end_within_byte_limit():
+    """没有命中规则时只截取完整行，且UTF-8字节数不超过上限"""
+    for max_bytes in range(1, len(DIFF.encode('utf-8')) + 2):
+        sample = _salient_diff_slice(DIFF, max_bytes)
+        assert len(sample.encode('utf-8')) <= max_bytes
+        if '\n' in DIFF.encode('utf-8')[:max_bytes].decode('utf-8', errors='ignore'):
+            assert sample.endswith('\n')
+        assert DIFF.startswith(sample)
+
+
+def test_fallback_returns_whole_diff_when_it_fits():
+    assert _salient_diff_slice(DIFF, len(DIFF.encode('utf-8'))) == DIFF
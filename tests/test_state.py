@@ -0,0 +1,71 @@
+"""ASTCache 测试"""
+
+import copy
+import pickle
+
+from src.core.state import ASTCache
+
+
+def _cache():
+    cache = ASTCache(max_bytes=10_000)
+    cache['a'] = [None] * 3
+    cache['b'] = [None] * 4
+    return cache
+
+
+def test_copies_keep_entries_and_byte_count():
+    """copy/deepcopy/pickle 重建后条目和估算字节数与原缓存一致"""
+    cache = _cache()
+    for clone in (copy.copy(cache), copy.deepcopy(cache), pickle.loads(pickle.dumps(cache))):
+        assert list(clone) == ['a', 'b']
+        assert clone.estimated_bytes == cache.estimated_bytes == 7 * ASTCache.AVG_NODE_BYTES
+        assert clone.max_bytes == cache.max_bytes
+
+
+def test_removals_release_bytes():
+    """pop/popitem/clear 都会扣减估算字节数"""
+    cache = _cache()
+    assert cache.pop('a') == [None] * 3
+    assert cache.pop('missing', None) is None
+    assert cache.estimated_bytes == 4 * ASTCache.AVG_NODE_BYTES
+    
+    assert cache.popitem() == ('b', [None] * 4)
+    assert cache.estimated_bytes == 0
+    
+    cache['c'] = [None]
+    cache.clear()
+    assert cache.estimated_bytes == 0
+    
+    # 清空后重新写满不会因残留的字节数提前淘汰
+    cache['d'] = [None] * 5
+    cache['e'] = [None] * 4
+    assert list(cache) == ['d', 'e']
+
+
+def test_bulk_copies_from_another_cache():
+    """从ASTCache构造/update/合并时遍历items()，不会在遍历中调整源缓存的顺序"""
+    cache = _cache()
+    
+    assert list(ASTCache(cache).items()) == list(cache.items())
+    
+    target = ASTCache()
+    target.update(cache)
+    assert list(target) == ['a', 'b']
+    
+    merged = cache | {'c': [None]}
+    assert list(merged) == ['a', 'b', 'c']
+    assert merged.max_bytes == cache.max_bytes
+    assert merged.estimated_bytes == 8 * ASTCache.AVG_NODE_BYTES
+    
+    assert list({'z': [None]} | cache) == ['z', 'a', 'b']
+    
+    target |= {'d': [None]}
+    assert list(target) == ['a', 'b', 'd']
+    assert list(cache) == ['a', 'b']
+
+
+def test_get_marks_entry_recent():
+    cache = _cache()
+    assert cache.get('a') == [None] * 3
+    assert cache.get('missing') is None
+    assert list(cache) == ['b', 'a']
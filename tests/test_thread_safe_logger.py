@@ -0,0 +1,45 @@
+"""ThreadSafeLogger 测试"""
+
+import io
+
+import pytest
+
+from src.utils.thread_safe_logger import ThreadSafeLogger
+
+
+def test_exception_written_with_message():
+    """exc_info=True时堆栈紧跟在日志之后一起写出"""
+    logger = ThreadSafeLogger()
+    stream = io.StringIO()
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.error("任务失败", file=stream, exc_info=True, flush=True)
+    
+    text = stream.getvalue()
+    assert "任务失败\nTraceback (most recent call last):" in text
+    assert text.endswith("ValueError: boom\n")
+
+
+def test_print_kwargs():
+    logger = ThreadSafeLogger()
+    stream = io.StringIO()
+    logger.log("a", "b", sep="-", end="!", file=stream, flush=True)
+    assert stream.getvalue().endswith("] a-b!")
+
+
+def test_unsupported_kwargs_rejected():
+    with pytest.raises(TypeError):
+        ThreadSafeLogger().log("x", color="red")
+
+
+def test_log_and_print_keep_call_order(capsys):
+    """日志同步写出，与同一线程直接print()的输出保持调用顺序"""
+    logger = ThreadSafeLogger()
+    for i in range(50):
+        logger.info(f"log {i}")
+        print(f"print {i}")
+    
+    lines = capsys.readouterr().out.splitlines()
+    order = [line.rsplit(' ', 2)[-2] for line in lines]
+    assert order == ['log', 'print'] * 50